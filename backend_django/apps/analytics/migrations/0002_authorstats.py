@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='author_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('articles', models.PositiveIntegerField(default=0, verbose_name='Artigos publicados')),
+                ('reads', models.PositiveBigIntegerField(default=0, verbose_name='Leituras')),
+                ('followers', models.PositiveIntegerField(default=0, verbose_name='Seguidores')),
+                ('karma', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Estatísticas de Autor',
+                'verbose_name_plural': 'Estatísticas de Autores',
+            },
+        ),
+    ]
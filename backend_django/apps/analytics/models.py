@@ -1,3 +1,4 @@
+from django.contrib.auth.models import User
 from django.db import models
 from apps.articles.models import Article
 
@@ -54,3 +55,32 @@ class ArticleMetricMonthly(models.Model):
 
     def __str__(self):
         return f"{self.article.title} - Month {self.year_month}"
+
+
+class AuthorStats(models.Model):
+    """
+    Estatísticas agregadas de um autor (uma linha por autor), mantidas de forma
+    incremental pelos sinais e tarefas de analytics e reconciliadas
+    periodicamente (ver AuthorStatsService).
+    """
+    author = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='author_stats')
+    articles = models.PositiveIntegerField(default=0, verbose_name="Artigos publicados")
+    reads = models.PositiveBigIntegerField(default=0, verbose_name="Leituras")
+    followers = models.PositiveIntegerField(default=0, verbose_name="Seguidores")
+    karma = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Estatísticas de Autor"
+        verbose_name_plural = "Estatísticas de Autores"
+
+    def __str__(self):
+        return f"Estatísticas de {self.author.username}"
+
+    def as_dict(self):
+        return {
+            'articles': self.articles,
+            'reads': self.reads,
+            'followers': self.followers,
+            'karma': self.karma,
+        }
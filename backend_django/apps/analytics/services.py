@@ -77,6 +77,7 @@ class AnalyticsService:
             try:
                 # Increment core article counter
                 Article.objects.filter(id=article_id).update(views=F('views') + 1)
+                AuthorStatsService.add_reads(article_id, 1)
                 
                 # Update/Create Daily Metric
                 metric, created = ArticleMetricDaily.objects.get_or_create(
@@ -169,3 +170,101 @@ class AnalyticsService:
         channel = f"author_stats:{username}"
         message = {"type": event_type, "data": data, "timestamp": time.time()}
         redis_client.publish(channel, json.dumps(message))
+
+
+class AuthorStatsService:
+    """
+    Manutenção da tabela AuthorStats (artigos publicados, leituras,
+    seguidores e karma por autor):
+    - incremental: leituras nas tarefas de flush das visualizações, seguidores
+      e karma nos sinais, artigos/leituras recalculados ao publicar/apagar;
+    - reconcile(): recálculo completo periódico, que corrige qualquer desvio.
+    """
+
+    @staticmethod
+    def compute(author_ids=None):
+        """{author_id: {articles, reads, followers, karma}} por agregação (None: todos os autores)"""
+        from django.db.models import Count, Sum
+        from apps.articles.models import Article, AuthorFollower, Profile
+        from .models import AuthorStats
+
+        articles = Article.objects.filter(status='published')
+        followers = AuthorFollower.objects.all()
+        if author_ids is not None:
+            articles = articles.filter(author_id__in=author_ids)
+            followers = followers.filter(author_id__in=author_ids)
+
+        stats = {}
+
+        def row(author_id):
+            return stats.setdefault(author_id, {'articles': 0, 'reads': 0, 'followers': 0, 'karma': 0})
+
+        for author_id, count, reads in articles.values('author_id').annotate(
+            count=Count('id'), reads=Sum('views')
+        ).values_list('author_id', 'count', 'reads'):
+            row(author_id).update(articles=count, reads=reads or 0)
+        for author_id, count in followers.values('author_id').annotate(count=Count('id')).values_list('author_id', 'count'):
+            row(author_id)['followers'] = count
+
+        if author_ids is None:
+            # Autores que deixaram de ter artigos/seguidores voltam a zero
+            author_ids = set(stats) | set(AuthorStats.objects.values_list('author_id', flat=True))
+        for author_id in author_ids:
+            row(author_id)
+        for author_id, karma in Profile.objects.filter(user_id__in=list(stats)).values_list('user_id', 'karma'):
+            row(author_id)['karma'] = karma
+        return stats
+
+    @staticmethod
+    def refresh(author_id, create=True):
+        """
+        Recalcula a linha de um autor (publicação/remoção de artigos, linha em
+        falta). Com create=False só atualiza uma linha existente: os sinais não
+        a podem criar enquanto o próprio autor está a ser apagado (cascade).
+        """
+        from .models import AuthorStats
+        values = AuthorStatsService.compute([author_id])[author_id]
+        if not create:
+            AuthorStats.objects.filter(author_id=author_id).update(**values)
+            return None
+        stats, _ = AuthorStats.objects.update_or_create(author_id=author_id, defaults=values)
+        return stats
+
+    @staticmethod
+    def get(author):
+        """A linha do autor (select_related('author_stats') evita a consulta); criada se faltar"""
+        from .models import AuthorStats
+        try:
+            return author.author_stats
+        except AuthorStats.DoesNotExist:
+            return AuthorStatsService.refresh(author.id)
+
+    @staticmethod
+    def add_reads(article_id, delta):
+        """Soma `delta` leituras ao autor do artigo (só contam os artigos publicados)"""
+        from django.db.models import F
+        from .models import AuthorStats
+        AuthorStats.objects.filter(
+            author__articles__id=article_id, author__articles__status='published'
+        ).update(reads=F('reads') + delta)
+
+    @staticmethod
+    def set_followers(author_id, total):
+        from .models import AuthorStats
+        AuthorStats.objects.filter(author_id=author_id).update(followers=total)
+
+    @staticmethod
+    def set_karma(author_id, karma):
+        from .models import AuthorStats
+        AuthorStats.objects.filter(author_id=author_id).update(karma=karma)
+
+    @staticmethod
+    def reconcile():
+        """Recalcula todas as linhas num upsert em lote; devolve o nº de autores"""
+        from .models import AuthorStats
+        rows = [AuthorStats(author_id=author_id, **values) for author_id, values in AuthorStatsService.compute().items()]
+        AuthorStats.objects.bulk_create(
+            rows, batch_size=1000, update_conflicts=True, unique_fields=['author'],
+            update_fields=['articles', 'reads', 'followers', 'karma', 'updated_at'],
+        )
+        return len(rows)
@@ -1,7 +1,7 @@
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from apps.articles.models import Profile, AuthorFollower
-from .services import AnalyticsService
+from apps.articles.models import Article, Profile, AuthorFollower
+from .services import AnalyticsService, AuthorStatsService
 
 @receiver(post_save, sender=AuthorFollower)
 def author_follower_update(sender, instance, created, **kwargs):
@@ -11,6 +11,7 @@ def author_follower_update(sender, instance, created, **kwargs):
     if created:
         # Get total followers
         total_followers = AuthorFollower.objects.filter(author=instance.author).count()
+        AuthorStatsService.set_followers(instance.author_id, total_followers)
         AnalyticsService.publish_author_update(
             instance.author.username, 
             'follower', 
@@ -23,6 +24,7 @@ def author_follower_delete(sender, instance, **kwargs):
     Trigger real-time update when someone unfollows an author.
     """
     total_followers = AuthorFollower.objects.filter(author=instance.author).count()
+    AuthorStatsService.set_followers(instance.author_id, total_followers)
     AnalyticsService.publish_author_update(
         instance.author.username, 
         'follower', 
@@ -38,8 +40,21 @@ def profile_karma_update(sender, instance, **kwargs):
     # To check change, we need pre_save signal or comparison.
     # For MVP, just publishing is fine, frontend can ignore if same value.
     if instance.user:
+        AuthorStatsService.set_karma(instance.user_id, instance.karma)
         AnalyticsService.publish_author_update(
             instance.user.username,
             'karma',
             {'total': instance.karma}
         )
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+def author_stats_article_update(sender, instance, **kwargs):
+    """
+    Recalcula as estatísticas do autor quando um artigo é publicado,
+    alterado ou apagado (os incrementos de views/likes não contam aqui).
+    """
+    update_fields = kwargs.get('update_fields')
+    if update_fields and set(update_fields) <= {'views', 'likes'}:
+        return
+    AuthorStatsService.refresh(instance.author_id, create=False)
@@ -2,7 +2,7 @@ from celery import shared_task
 from django.db import transaction
 from django.utils import timezone
 from datetime import datetime, date
-from .services import AnalyticsService, redis_client
+from .services import AnalyticsService, AuthorStatsService, redis_client
 from .models import ArticleMetricDaily, ArticleMetricWeekly, ArticleMetricMonthly
 import logging
 
@@ -82,6 +82,13 @@ def rebuild_rankings_from_db():
         
     return "Rankings rebuilt"
 
+@shared_task
+def reconcile_author_stats():
+    """Recalcula a tabela AuthorStats (corrige desvios dos incrementos)"""
+    updated = AuthorStatsService.reconcile()
+    logger.info(f"Reconciled stats for {updated} authors")
+    return updated
+
 # Legacy flush for core 'views' counter (keeping for compatibility)
 @shared_task
 def flush_legacy_views():
@@ -96,5 +103,6 @@ def flush_legacy_views():
                     from apps.articles.models import Article
                     from django.db.models import F
                     Article.objects.filter(id=article_id).update(views=F('views') + int(delta))
+                    AuthorStatsService.add_reads(article_id, int(delta))
             except: pass
         if cursor == 0: break
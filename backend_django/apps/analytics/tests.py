@@ -1,7 +1,7 @@
 from django.test import TestCase, Client
 from django.urls import reverse
 from unittest.mock import patch
-from apps.analytics.services import AnalyticsService
+from apps.analytics.services import AnalyticsService, AuthorStatsService
 
 class AnalyticsTests(TestCase):
     def setUp(self):
@@ -32,3 +32,52 @@ class AnalyticsTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json()['views_delta'], 10)
         self.assertEqual(response.json()['reading_now'], 5)
+
+
+class AuthorStatsTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+        from apps.articles.models import Article
+        self.author = User.objects.create_user(username='autora', password='password')
+        self.article = Article.objects.create(
+            title='Ondas', content='Conteúdo', author=self.author, status='published', views=10
+        )
+        Article.objects.create(title='Rascunho', content='Conteúdo', author=self.author, status='draft', views=99)
+
+    def stats(self):
+        from apps.analytics.models import AuthorStats
+        return AuthorStats.objects.get(author=self.author).as_dict()
+
+    def test_author_page_reads_one_row(self):
+        self.client.get(f'/api/authors/{self.author.username}/')
+        # Autor, perfil e estatísticas numa consulta (anónimo: sem is_following)
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/authors/{self.author.username}/')
+        self.assertEqual(response.json()['stats'], {'articles': 1, 'reads': 10, 'followers': 0, 'karma': 0})
+
+    def test_incremental_updates(self):
+        from apps.articles.models import Article, AuthorFollower
+        AuthorStatsService.refresh(self.author.id)
+
+        Article.objects.create(title='Luz', content='Conteúdo', author=self.author, status='published', views=5)
+        follower = AuthorFollower.objects.create(author=self.author, follower_email='leitor@x.pt')
+        self.author.profile.karma = 50
+        self.author.profile.save()
+        AnalyticsService.record_view(self.article.id, 'leitor')
+        self.assertEqual(self.stats(), {'articles': 2, 'reads': 16, 'followers': 1, 'karma': 50})
+
+        follower.delete()
+        self.article.delete()
+        self.assertEqual(self.stats(), {'articles': 1, 'reads': 5, 'followers': 0, 'karma': 50})
+
+    def test_reconcile_fixes_drift(self):
+        from apps.analytics.models import AuthorStats
+        AuthorStats.objects.create(author=self.author, articles=7, reads=1)
+        self.assertEqual(AuthorStatsService.reconcile(), 1)
+        self.assertEqual(self.stats(), {'articles': 1, 'reads': 10, 'followers': 0, 'karma': 0})
+
+    def test_deleting_the_author_deletes_the_row(self):
+        from apps.analytics.models import AuthorStats
+        AuthorStatsService.refresh(self.author.id)
+        self.author.delete()
+        self.assertFalse(AuthorStats.objects.exists())
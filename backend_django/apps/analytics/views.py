@@ -91,7 +91,7 @@ class TrendingAPI(APIView):
             
             # Fetch objects preserving order
             # Note: order_by(Field) can be used, but manual sorting is often cleaner for ZSETs
-            articles = Article.objects.filter(id__in=ids).select_related('author', 'category').prefetch_related('tags')
+            articles = Article.objects.filter(id__in=ids).select_related('author', 'author__profile', 'category').prefetch_related('tags')
             
             # Re-sort to match ZSET order
             sorted_articles = sorted(articles, key=lambda a: scores.get(a.id, 0), reverse=True)
@@ -128,7 +128,7 @@ class TrendingAPI(APIView):
             metrics = ArticleMetricDaily.objects.filter(day=date.today()).order_by('-views')[:limit]
 
         ids = [m.article_id for m in metrics]
-        articles = Article.objects.filter(id__in=ids).select_related('author', 'category').prefetch_related('tags')
+        articles = Article.objects.filter(id__in=ids).select_related('author', 'author__profile', 'category').prefetch_related('tags')
         
         # Preserve order
         metric_map = {m.article_id: m.views for m in metrics}
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.utils.html import format_html, mark_safe
 from django.utils import timezone
-from .models import Article, Category, Comment, Footnote, Subscriber, Profile, AuthorMessage, AuthorFollower, ReviewRequest
+from .models import Article, Category, Comment, Footnote, Subscriber, Profile, AuthorMessage, AuthorFollower, ReviewRequest, AIResult
 from unfold.admin import ModelAdmin, TabularInline, StackedInline
 from unfold.contrib.filters.admin import DropdownFilter, ChoicesDropdownFilter, RelatedDropdownFilter
 from simple_history.admin import SimpleHistoryAdmin
@@ -199,7 +199,8 @@ class ArticleAdmin(SimpleHistoryAdmin, ModelAdmin):
         'send_to_review', 
         'archive_articles', 
         'mark_as_draft',
-        'generate_excerpt_ai'
+        'generate_excerpt_ai',
+        'invalidate_ai_results'
     ]
 
     def generate_excerpt_ai(self, request, queryset):
@@ -222,6 +223,14 @@ class ArticleAdmin(SimpleHistoryAdmin, ModelAdmin):
         if success_count:
             self.message_user(request, f"IA gerou com sucesso excertos para {success_count} artigo(s).", level='success')
     generate_excerpt_ai.short_description = "✨ Gerar Resumo AI (Gemini)"
+
+    def invalidate_ai_results(self, request, queryset):
+        """Apaga os insights, sumários e glossários em cache dos artigos selecionados"""
+        from .services.ai_result_cache import invalidate_article
+
+        deleted = sum(invalidate_article(article) for article in queryset)
+        self.message_user(request, f"{deleted} resultado(s) de IA invalidados.", level='info')
+    invalidate_ai_results.short_description = "Invalidar cache de IA (insight/sumário/glossário)"
     
     def get_queryset(self, request):
         qs = super().get_queryset(request)
@@ -429,4 +438,14 @@ class ReviewRequestAdmin(ModelAdmin):
             '</span>',
             color_class, label
         )
-    display_status.short_description = "Estado da Revisão"
\ No newline at end of file
+    display_status.short_description = "Estado da Revisão"
+
+@admin.register(AIResult)
+class AIResultAdmin(ModelAdmin):
+    list_display = ('kind', 'article', 'model', 'prompt_version', 'hits', 'created_at', 'last_used_at')
+    list_filter = ('kind', 'model', 'prompt_version')
+    search_fields = ('key', 'article__title')
+    readonly_fields = ('key', 'kind', 'article', 'model', 'prompt_version', 'result', 'hits', 'created_at', 'last_used_at')
+
+    def has_add_permission(self, request):
+        return False # Criados pela cache de resultados de IA
@@ -0,0 +1,167 @@
+"""
+Versões assíncronas das views de IA (ativas com AI_ASYNC_VIEWS=True).
+
+O DRF não suporta views async, por isso estas são views Django simples com
+`async def post`, com o mesmo contrato JSON das views síncronas. Autenticação,
+permissões e throttles são os da view DRF síncrona que cada uma substitui
+(`drf_view`), verificados antes de qualquer chamada ao Gemini. As chamadas
+são feitas pelo AsyncAIService (aiohttp), com a mesma cache de resultados e o
+mesmo single-flight do cliente síncrono, pelo que um worker ASGI (uvicorn)
+mantém centenas de pedidos em voo sem ocupar uma thread por pedido; o acesso
+à base de dados continua síncrono, via sync_to_async.
+"""
+import json
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from .models import Article
+from .serializers import ArticleListSerializer
+from .services import ai_result_cache
+from .services.async_ai_service import AsyncAIService
+from .services.search_service import SearchService
+from .views import AIGlossaryView, AIInsightView, AIRAGChatView, AISummaryView, SemanticSearchView
+
+
+def check_drf_policies(view_class, request, *args, **kwargs):
+    """
+    Aplica ao pedido a negociação, autenticação, permissões e throttles de
+    `view_class`, como o APIView.dispatch antes do handler (o CSRF das
+    sessões é verificado pela SessionAuthentication, como no DRF).
+    Devolve None, ou a resposta de erro do DRF (401/403/406/429) já renderizada.
+    """
+    view = view_class()
+    view.args, view.kwargs = args, kwargs
+    view.headers = view.default_response_headers
+    drf_request = view.initialize_request(request, *args, **kwargs)
+    view.request = drf_request
+    try:
+        view.initial(drf_request, *args, **kwargs)
+    except Exception as exc:
+        response = view.finalize_response(drf_request, view.handle_exception(exc), *args, **kwargs)
+        return response.render()
+    return None
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncAIView(View):
+    http_method_names = ['post', 'options']
+    # View DRF síncrona equivalente: fonte das políticas de acesso
+    drf_view = None
+
+    async def dispatch(self, request, *args, **kwargs):
+        denied = await sync_to_async(check_drf_policies)(self.drf_view, request, *args, **kwargs)
+        if denied is not None:
+            return denied
+        return await super().dispatch(request, *args, **kwargs)
+
+    @staticmethod
+    def parse_body(request):
+        """Corpo JSON (como o JSONParser do DRF) ou formulário"""
+        if request.content_type == 'application/json':
+            try:
+                data = json.loads(request.body or b'{}')
+            except ValueError:
+                return None
+            return data if isinstance(data, dict) else None
+        return request.POST
+
+    async def post(self, request):
+        data = self.parse_body(request)
+        if data is None:
+            return JsonResponse({'detail': 'JSON parse error'}, status=400)
+        return await self.handle(request, data, AsyncAIService())
+
+
+async def cached_result(kind, content, generate):
+    """ai_result_cache.cached_result com geração assíncrona (consulta/escrita via sync_to_async)"""
+    result = await sync_to_async(ai_result_cache.lookup)(kind, content)
+    if result is None:
+        result = await generate(content)
+        await sync_to_async(ai_result_cache.store)(kind, content, result)
+    return result
+
+
+class AsyncAIInsightView(AsyncAIView):
+    drf_view = AIInsightView
+
+    async def handle(self, request, data, ai_service):
+        insight = await cached_result('insight', data.get('content'), ai_service.generate_insight)
+        return JsonResponse({'insight': insight})
+
+
+class AsyncAISummaryView(AsyncAIView):
+    drf_view = AISummaryView
+
+    async def handle(self, request, data, ai_service):
+        summary = await cached_result('summary', data.get('content'), ai_service.generate_summary)
+        return JsonResponse({'summary': summary})
+
+
+class AsyncAIGlossaryView(AsyncAIView):
+    drf_view = AIGlossaryView
+
+    async def handle(self, request, data, ai_service):
+        terms = await cached_result('glossary', data.get('content'), ai_service.generate_glossary)
+        return JsonResponse(terms, safe=False)
+
+
+class AsyncSemanticSearchView(AsyncAIView):
+    drf_view = SemanticSearchView
+
+    async def handle(self, request, data, ai_service):
+        query = data.get('query')
+        if not query:
+            return JsonResponse({'error': 'Query is required'}, status=400)
+
+        query_vec = await ai_service.get_query_embedding(query)
+        return JsonResponse(await sync_to_async(self.search)(query_vec), safe=False)
+
+    @staticmethod
+    def search(query_vec):
+        ranked = SearchService().vector_ranking(query_vec, top_k=5)
+        articles = SearchService.hydrate_ranked_articles(
+            ranked, queryset=Article.objects.filter(status='published')
+        )
+        return ArticleListSerializer(articles, many=True).data
+
+
+class AsyncAIRAGChatView(AsyncAIView):
+    drf_view = AIRAGChatView
+
+    async def handle(self, request, data, ai_service):
+        message = data.get('message')
+        if not message:
+            return JsonResponse({'error': 'Message is required'}, status=400)
+
+        # 1. Retrieval
+        query_vec = await ai_service.get_query_embedding(message)
+        relevant_chunks = await sync_to_async(self.retrieve)(query_vec)
+
+        # 2. Generation (RAG)
+        if self.wants_stream(request, data):
+            return self.stream_response(ai_service.rag_chat_stream(message, relevant_chunks))
+        return JsonResponse(await ai_service.rag_chat(message, relevant_chunks))
+
+    @staticmethod
+    def retrieve(query_vec):
+        return SearchService.hydrate_chunks(SearchService(consumer='rag').vector_ranking(query_vec, top_k=3))
+
+    @staticmethod
+    def wants_stream(request, data):
+        """Streaming com {"stream": true}, ?stream=1 ou Accept: text/event-stream"""
+        flag = data.get('stream') or request.GET.get('stream')
+        return str(flag).lower() in ('1', 'true') or 'text/event-stream' in request.headers.get('Accept', '')
+
+    @staticmethod
+    def stream_response(events):
+        """Server-Sent Events, como AIRAGChatView.stream_response, com um gerador assíncrono"""
+        async def encode():
+            async for event, data in events:
+                yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+        response = StreamingHttpResponse(encode(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
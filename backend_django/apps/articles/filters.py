@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.db.models import Case, IntegerField, When
+from rest_framework import filters
+from .services.bm25_index import corpus_stats
+from .services.search_service import SearchService
+
+
+class BM25SearchFilter(filters.SearchFilter):
+    """
+    Substitui o SearchFilter do DRF (LIKE '%termo%' sobre todo o conteúdo)
+    por uma consulta ao índice invertido BM25, ou pela pesquisa híbrida
+    (BM25 + embeddings) quando settings.SEARCH_LIST_MODE = 'hybrid'.
+    Os resultados mantêm a ordem de relevância, salvo se for pedido ?ordering=.
+    Enquanto o índice não tiver artigos (ex.: antes do rebuild_search_index), usa o
+    SearchFilter do DRF sobre `search_fields`, em vez de não devolver nada.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = ' '.join(self.get_search_terms(request))
+        if not query:
+            return queryset
+        if not corpus_stats('article')[0]:
+            return super().filter_queryset(request, queryset, view)
+
+        service = SearchService(consumer='search')
+        limit = settings.SEARCH_MAX_RESULTS
+        if settings.SEARCH_LIST_MODE == 'hybrid':
+            ranked = service.hybrid_search(query, top_k=limit)
+        else:
+            ranked = service.keyword_search(query, top_k=limit)
+
+        article_ids = [article_id for article_id, _ in ranked]
+        if not article_ids:
+            return queryset.none()
+        relevance = Case(
+            *[When(id=article_id, then=position) for position, article_id in enumerate(article_ids)],
+            output_field=IntegerField()
+        )
+        return queryset.filter(id__in=article_ids).order_by(relevance)
@@ -0,0 +1,220 @@
+import json
+import subprocess
+import tempfile
+from datetime import date
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from apps.analytics.models import ArticleMetricDaily
+from apps.analytics.views import TrendingAPI
+from apps.articles.services.evaluation import (SyntheticCorpus, SyntheticQueryEmbeddings,
+                                               measure, ndcg_at_k, recall_at_k)
+from apps.articles.services.recommender_service import RecommenderService
+from apps.articles.services.search_service import SearchService
+from apps.articles.renderers import ORJSONRenderer
+from apps.articles.serializers import ArticleListRowSerializer, ArticleListSerializer
+from apps.articles.services.vector_index import get_vector_index, invalidate_vector_index
+from apps.articles.views import ArticleViewSet
+
+
+class Command(BaseCommand):
+    help = ("Benchmark offline de pesquisa e recomendações sobre um corpus sintético (criado numa "
+            "transação que é revertida no fim): latência e consultas SQL por pedido de "
+            "semantic_search, RecommenderService, ArticleViewSet (lista/detalhe) e TrendingAPI, "
+            "e recall/NDCG contra interações de teste. Resultados em JSON para comparar commits.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--articles', type=int, default=500, help="Nº de artigos sintéticos")
+        parser.add_argument('--chunks', type=int, default=4, help="Chunks por artigo")
+        parser.add_argument('--dim', type=int, default=64, help="Dimensão dos embeddings")
+        parser.add_argument('--topics', type=int, default=10, help="Nº de temas (e categorias)")
+        parser.add_argument('--sessions', type=int, default=100, help="Nº de sessões de leitores")
+        parser.add_argument('--events', type=int, default=10, help="Interações de treino por sessão")
+        parser.add_argument('--holdout', type=int, default=2, help="Interações de teste por sessão")
+        parser.add_argument('--queries', type=int, default=100, help="Nº de pesquisas avaliadas")
+        parser.add_argument('--k', type=int, default=10, help="Corte para recall@k e NDCG@k")
+        parser.add_argument('--repeat', type=int, default=30, help="Chamadas medidas por operação")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help="Ficheiro JSON com os resultados")
+        parser.add_argument('--compare', help="JSON de uma execução anterior, para mostrar as diferenças")
+        parser.add_argument('--keep', action='store_true', help="Manter o corpus sintético na base de dados")
+
+    def handle(self, *args, **options):
+        if options['articles'] < 2:
+            raise CommandError("--articles tem de ser pelo menos 2.")
+        corpus = SyntheticCorpus(
+            articles=options['articles'], chunks_per_article=options['chunks'], dim=options['dim'],
+            topics=options['topics'], sessions=options['sessions'], events_per_session=options['events'],
+            holdout=options['holdout'], queries=options['queries'], seed=options['seed'],
+        )
+
+        # Nem o snapshot de embeddings nem o índice IVF persistido podem ver (ou guardar) o corpus sintético
+        with tempfile.TemporaryDirectory() as tmp, override_settings(
+            EMBEDDING_SNAPSHOT_ENABLED=False, SEARCH_INDEX_DIR=tmp
+        ):
+            try:
+                with transaction.atomic():
+                    corpus.create()
+                    self._seed_trending(corpus)
+                    invalidate_vector_index()
+                    results = self._run(corpus, options)
+                    if not options['keep']:
+                        transaction.set_rollback(True)
+            finally:
+                invalidate_vector_index()
+
+        self._report(results)
+        if options['compare']:
+            with open(options['compare']) as f:
+                self._compare(json.load(f), results)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"\nResultados gravados em {options['output']}")
+
+    def _seed_trending(self, corpus):
+        """Métricas do dia para o fallback em base de dados do TrendingAPI (sem Redis)"""
+        views = corpus.rng.integers(1, 1000, size=len(corpus.article_ids))
+        ArticleMetricDaily.objects.bulk_create([
+            ArticleMetricDaily(article_id=int(article_id), day=date.today(), views=int(count))
+            for article_id, count in zip(corpus.article_ids, views)
+        ], batch_size=1000)
+
+    def _run(self, corpus, options):
+        k, repeat = options['k'], options['repeat']
+        # Construir o índice fora das medições (num processo real já está em memória)
+        get_vector_index()
+
+        search = SearchService()
+        search.ai = SyntheticQueryEmbeddings(corpus.query_vectors)
+        queries = list(corpus.query_vectors)
+        recommender = RecommenderService()
+        sessions = list(corpus.session_holdout)
+
+        factory = APIRequestFactory()
+        host = next((h for h in settings.ALLOWED_HOSTS if h != '*' and not h.startswith('.')), 'localhost')
+        article_list = ArticleViewSet.as_view({'get': 'list'})
+        article_detail = ArticleViewSet.as_view({'get': 'retrieve'})
+        trending = TrendingAPI.as_view()
+
+        def call(view, path, **kwargs):
+            response = view(factory.get(path, HTTP_HOST=host), **kwargs)
+            response.render()
+            assert response.status_code == 200, (path, response.status_code)
+
+        latency = {
+            'semantic_search': measure(lambda i: search.semantic_search(queries[i % len(queries)], top_k=k), repeat),
+            'recommendations': measure(
+                lambda i: recommender.get_recommendations_for_user(session_id=sessions[i % len(sessions)], top_k=k),
+                repeat,
+            ),
+            'article_list': measure(lambda i: call(article_list, '/api/articles/'), repeat),
+            'article_detail': measure(
+                lambda i: call(article_detail, '/api/articles/', slug=corpus.slugs[i % len(corpus.slugs)]), repeat
+            ),
+            # Parâmetro único por chamada: mede o pedido e não a cache_page
+            'trending': measure(lambda i: call(trending, f'/api/analytics/articles/trending/?range=day&_={i}'), repeat),
+        }
+        with override_settings(ARTICLE_RESPONSE_CACHE_TTL=0):
+            latency['article_list_uncached'] = measure(lambda i: call(article_list, '/api/articles/'), repeat)
+
+        # Serialização + JSON de uma página: ArticleListSerializer/JSONRenderer vs. caminho rápido
+        context = {'request': Request(factory.get('/api/articles/', HTTP_HOST=host))}
+        page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+        queryset = ArticleViewSet.queryset.all()
+        latency['serialize_page_drf'] = measure(lambda i: JSONRenderer().render(
+            ArticleListSerializer(queryset[:page_size], many=True, context=context).data
+        ), repeat)
+        latency['serialize_page_fast'] = measure(lambda i: ORJSONRenderer().render(
+            ArticleListRowSerializer(ArticleListRowSerializer.values(queryset)[:page_size], context=context).data
+        ), repeat)
+
+        return {
+            'meta': {
+                'timestamp': timezone.now().isoformat(),
+                'commit': self._git_commit(),
+                'database': connection.vendor,
+                'search_backend': settings.SEARCH_INDEX_BACKEND,
+                'corpus': corpus.params(),
+                'k': k,
+            },
+            'latency': latency,
+            'quality': {
+                'search': self._search_quality(search, corpus, k),
+                'recommendations': self._recommendation_quality(recommender, corpus, k),
+                # Referência: o ranking sem perfil (só popularidade e frescura)
+                'recommendations_baseline': self._recommendation_quality(recommender, corpus, k, personalized=False),
+            },
+        }
+
+    @staticmethod
+    def _search_quality(search, corpus, k):
+        recalls, ndcgs = [], []
+        for query, relevant in corpus.query_relevant.items():
+            ranked = search.semantic_ranking(query, top_k=k * corpus.chunks_per_article)
+            articles = list(dict.fromkeys(article_id for _, article_id, _ in ranked))
+            recalls.append(recall_at_k(articles, relevant, k))
+            ndcgs.append(ndcg_at_k(articles, relevant, k))
+        return {f'recall@{k}': round(float(np.mean(recalls)), 4), f'ndcg@{k}': round(float(np.mean(ndcgs)), 4)}
+
+    @staticmethod
+    def _recommendation_quality(recommender, corpus, k, personalized=True):
+        recalls, ndcgs = [], []
+        for session_id, relevant in corpus.session_holdout.items():
+            articles = recommender.get_recommendations_for_user(
+                session_id=session_id if personalized else None, top_k=k
+            )
+            ids = [article.id for article in articles]
+            recalls.append(recall_at_k(ids, relevant, k))
+            ndcgs.append(ndcg_at_k(ids, relevant, k))
+        if not recalls:
+            return {}
+        return {f'recall@{k}': round(float(np.mean(recalls)), 4), f'ndcg@{k}': round(float(np.mean(ndcgs)), 4)}
+
+    @staticmethod
+    def _git_commit():
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5, cwd=settings.BASE_DIR
+            ).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            return None
+
+    def _report(self, results):
+        corpus = results['meta']['corpus']
+        self.stdout.write(f"Corpus: {corpus['articles']} artigos x {corpus['chunks_per_article']} chunks "
+                          f"(dim={corpus['dim']}), {corpus['sessions']} sessões, {results['meta']['database']}")
+        self.stdout.write(f"\n{'operação':<22}{'p50 ms':>10}{'p95 ms':>10}{'média ms':>10}{'consultas':>11}")
+        for name, stats in results['latency'].items():
+            self.stdout.write(f"{name:<22}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}"
+                              f"{stats['mean_ms']:>10.2f}{stats['queries_per_call']:>11}")
+        self.stdout.write(f"\n{'qualidade':<26}" + ''.join(f"{metric:>12}" for metric in self._metrics(results)))
+        for name, metrics in results['quality'].items():
+            self.stdout.write(f"{name:<26}" + ''.join(f"{value:>12.4f}" for value in metrics.values()))
+
+    @staticmethod
+    def _metrics(results):
+        k = results['meta']['k']
+        return [f'recall@{k}', f'ndcg@{k}']
+
+    def _compare(self, baseline, results):
+        """Diferença relativa de latência/consultas e absoluta de qualidade face a uma execução anterior"""
+        self.stdout.write(f"\nComparação com {baseline['meta'].get('commit') or 'execução anterior'}")
+        for name, stats in results['latency'].items():
+            before = baseline.get('latency', {}).get(name)
+            if not before:
+                continue
+            change = (stats['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else 0.0
+            queries = stats['queries_per_call'] - before['queries_per_call']
+            self.stdout.write(f"{name:<22}p50 {change:+7.1f}%   consultas {queries:+d}")
+        for name, metrics in results['quality'].items():
+            before = baseline.get('quality', {}).get(name, {})
+            deltas = [f"{metric} {value - before[metric]:+.4f}" for metric, value in metrics.items() if metric in before]
+            if deltas:
+                self.stdout.write(f"{name:<22}" + '   '.join(deltas))
@@ -0,0 +1,77 @@
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from google.generativeai import client as genai_client
+from apps.articles.services.ai_service import AIService, get_ai_service, reset_ai_service
+
+
+class Command(BaseCommand):
+    help = ("Mede o custo de preparação do cliente Gemini por pedido: um AIService novo por pedido "
+            "(genai.configure + GenerativeModel + cliente do SDK) vs o cliente partilhado get_ai_service().")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help="Nº de pedidos simulados")
+        parser.add_argument('--threads', type=int, default=8, help="Threads em simultâneo (como um worker gthread)")
+        parser.add_argument('--live', type=int, default=0,
+                            help="Nº de embeddings reais a medir em cada modo (consome quota; requer GEMINI_API_KEY)")
+
+    def handle(self, *args, **options):
+        reset_ai_service()
+        modes = {
+            'por-pedido': self._per_request,
+            'partilhado': self._shared,
+        }
+
+        self.stdout.write(f"{'modo':<12}{'µs/pedido':>12}{'p99 µs':>10}{'pedidos/s':>12}{'clientes':>10}")
+        for name, setup in modes.items():
+            self._report(name, *self._run(setup, options['requests'], options['threads']))
+
+        if options['live']:
+            self.stdout.write(f"\nLatência real de embed_content ({options['live']} pedidos sequenciais)")
+            self.stdout.write(f"{'modo':<12}{'p50 ms':>10}{'p99 ms':>10}")
+            for name, setup in modes.items():
+                self._live(name, setup, options['live'])
+
+    @staticmethod
+    def _per_request():
+        """Comportamento anterior: cada view/serviço criava o seu AIService"""
+        ai = AIService()
+        return ai, genai_client.get_default_generative_client()
+
+    @staticmethod
+    def _shared():
+        ai = get_ai_service()
+        return ai, genai_client.get_default_generative_client()
+
+    def _run(self, setup, requests, threads):
+        def timed(_):
+            started = time.perf_counter()
+            ai, sdk_client = setup()
+            return time.perf_counter() - started, sdk_client
+
+        # Regime estável: a criação única do cliente partilhado fica fora da medição
+        setup()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(timed, range(requests)))
+        elapsed = time.perf_counter() - started
+        latencies = np.array([latency for latency, _ in results]) * 1e6
+        # Cada cliente novo do SDK abre um canal novo (ligação TCP + TLS ao Gemini)
+        clients = len({id(sdk_client) for _, sdk_client in results})
+        return latencies, elapsed, clients
+
+    def _report(self, name, latencies, elapsed, clients):
+        self.stdout.write(
+            f"{name:<12}{latencies.mean():>12.1f}{np.percentile(latencies, 99):>10.1f}"
+            f"{len(latencies) / elapsed:>12.0f}{clients:>10}"
+        )
+
+    def _live(self, name, setup, count):
+        latencies = []
+        for _ in range(count):
+            started = time.perf_counter()
+            ai, _ = setup()
+            ai.embed_content(model=ai.embed_model, content="benchmark", task_type="retrieval_query")
+            latencies.append((time.perf_counter() - started) * 1000)
+        self.stdout.write(f"{name:<12}{np.percentile(latencies, 50):>10.0f}{np.percentile(latencies, 99):>10.0f}")
@@ -0,0 +1,77 @@
+import os
+import time
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from apps.articles.services.vector_index import ExactVectorIndex, get_corpus_fingerprint
+from apps.articles.services.ann_index import IVFVectorIndex
+
+
+class Command(BaseCommand):
+    help = "Compara o índice IVF aproximado com a pesquisa exacta (recall@k e latência p50/p99) sobre a tabela de chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--k', type=int, default=10, help="Número de vizinhos (recall@k)")
+        parser.add_argument('--queries', type=int, default=200, help="Número de queries de teste")
+        parser.add_argument('--nlist', type=int, default=None, help="Número de listas IVF (omissão: 4*sqrt(N))")
+        parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32],
+                            help="Valores de nprobe a avaliar")
+        parser.add_argument('--noise', type=float, default=0.05,
+                            help="Ruído gaussiano adicionado aos vetores usados como queries")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--save', action='store_true',
+                            help="Persistir o índice IVF treinado em SEARCH_INDEX_DIR")
+
+    def handle(self, *args, **options):
+        k = options['k']
+        rng = np.random.default_rng(options['seed'])
+
+        started = time.perf_counter()
+        exact = ExactVectorIndex.from_database()
+        if len(exact) == 0:
+            raise CommandError("Não existem chunks com embedding para avaliar.")
+        self.stdout.write(f"Índice exacto: {len(exact)} chunks, dim={exact.matrix.shape[1]} "
+                          f"({time.perf_counter() - started:.2f}s)")
+
+        started = time.perf_counter()
+        ivf = IVFVectorIndex.build(exact, nlist=options['nlist'] or settings.SEARCH_IVF_NLIST, seed=options['seed'])
+        self.stdout.write(f"Índice IVF: nlist={ivf.nlist} treinado em {time.perf_counter() - started:.2f}s")
+
+        if options['save']:
+            path = os.path.join(settings.SEARCH_INDEX_DIR, 'ivf_index.npz')
+            ivf.save(path, fingerprint=get_corpus_fingerprint())
+            self.stdout.write(f"Índice IVF persistido em {path}")
+
+        # Queries: vetores reais do corpus com ruído, para simular perguntas próximas do conteúdo
+        sample = rng.choice(len(exact), size=min(options['queries'], len(exact)), replace=False)
+        queries = exact.matrix[sample] + rng.normal(scale=options['noise'], size=(len(sample), exact.matrix.shape[1]))
+
+        truth = []
+        exact_latencies = []
+        for query in queries:
+            t0 = time.perf_counter()
+            results = exact.search(query, top_k=k)
+            exact_latencies.append(time.perf_counter() - t0)
+            truth.append({chunk_id for chunk_id, _, _ in results})
+
+        self.stdout.write("")
+        self.stdout.write(f"{'backend':<14}{'recall@' + str(k):>12}{'p50 (ms)':>12}{'p99 (ms)':>12}")
+        self._report('exact', 1.0, exact_latencies)
+
+        for nprobe in options['nprobe']:
+            latencies = []
+            hits = 0
+            for query, expected in zip(queries, truth):
+                t0 = time.perf_counter()
+                results = ivf.search(query, top_k=k, nprobe=nprobe)
+                latencies.append(time.perf_counter() - t0)
+                hits += len(expected & {chunk_id for chunk_id, _, _ in results})
+            recall = hits / max(1, sum(len(expected) for expected in truth))
+            self._report(f"ivf/{nprobe}", recall, latencies)
+
+    def _report(self, label, recall, latencies):
+        latencies_ms = np.array(latencies) * 1000
+        self.stdout.write(
+            f"{label:<14}{recall:>12.3f}"
+            f"{np.percentile(latencies_ms, 50):>12.3f}{np.percentile(latencies_ms, 99):>12.3f}"
+        )
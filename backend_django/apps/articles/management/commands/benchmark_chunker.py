@@ -0,0 +1,130 @@
+import math
+import random
+import re
+from collections import Counter, defaultdict
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from apps.articles.models import Article
+from apps.articles.services.chunking import (SENTENCE_END_RE, FixedWindowChunker,
+                                             MarkdownChunker, count_tokens)
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class LexicalRetriever:
+    """
+    Retriever TF-IDF (índice invertido) usado como aproximação offline dos
+    embeddings: permite comparar chunkers sem gastar quota da API.
+    """
+
+    def __init__(self, texts):
+        self.doc_vectors = []
+        self.postings = defaultdict(list)
+        document_frequency = Counter()
+        term_counts = [Counter(WORD_RE.findall(text.lower())) for text in texts]
+        for counts in term_counts:
+            document_frequency.update(counts.keys())
+        self.idf = {term: math.log(1 + len(texts) / df) for term, df in document_frequency.items()}
+        for doc_id, counts in enumerate(term_counts):
+            weights = {term: (1 + math.log(tf)) * self.idf[term] for term, tf in counts.items()}
+            norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+            for term, weight in weights.items():
+                self.postings[term].append((doc_id, weight / norm))
+
+    def search(self, query, top_k):
+        scores = defaultdict(float)
+        for term, tf in Counter(WORD_RE.findall(query.lower())).items():
+            weight = (1 + math.log(tf)) * self.idf.get(term, 0.0)
+            for doc_id, doc_weight in self.postings.get(term, ()):
+                scores[doc_id] += weight * doc_weight
+        return [doc_id for doc_id, _ in sorted(scores.items(), key=lambda item: -item[1])[:top_k]]
+
+
+class EmbeddingRetriever:
+    """Retriever com os embeddings reais do Gemini (consome quota)"""
+
+    def __init__(self, texts):
+        from apps.articles.services.ai_service import get_ai_service
+        self.ai = get_ai_service()
+        vectors = [v if v is not None else [0.0] * 768 for v in self.ai.generate_embeddings(texts)]
+        self.matrix = np.asarray(vectors, dtype=np.float32)
+        self.matrix /= np.linalg.norm(self.matrix, axis=1, keepdims=True).clip(min=1e-12)
+
+    def search(self, query, top_k):
+        scores = self.matrix @ np.asarray(self.ai.get_query_embedding(query), dtype=np.float32)
+        return list(np.argsort(-scores)[:top_k])
+
+
+class Command(BaseCommand):
+    help = ("Compara o chunker Markdown com as janelas fixas de 1000 caracteres: nº de chunks, "
+            "tokens a embeber (custo), texto duplicado, frases intactas e recall@k.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--articles', type=int, default=200, help="Nº máximo de artigos publicados a usar")
+        parser.add_argument('--queries', type=int, default=300, help="Nº de frases usadas como perguntas")
+        parser.add_argument('--k', type=int, default=5)
+        parser.add_argument('--drop', type=float, default=0.3,
+                            help="Fração de palavras removidas de cada pergunta (evita correspondência exacta)")
+        parser.add_argument('--max-tokens', type=int, default=300)
+        parser.add_argument('--overlap-tokens', type=int, default=40)
+        parser.add_argument('--price', type=float, default=0.15,
+                            help="Custo de embedding em USD por milhão de tokens")
+        parser.add_argument('--embed', action='store_true',
+                            help="Usar embeddings Gemini reais em vez do retriever TF-IDF offline")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        articles = list(
+            Article.objects.filter(status='published').order_by('id').values_list('id', 'content')[:options['articles']]
+        )
+        if not articles:
+            raise CommandError("Não existem artigos publicados para avaliar.")
+
+        # Perguntas: frases reais dos artigos, com parte das palavras removidas
+        candidates = [
+            (article_id, sentence.strip())
+            for article_id, content in articles
+            for sentence in SENTENCE_END_RE.split(content)
+            if len(sentence.split()) >= 8 and '\n' not in sentence.strip()
+        ]
+        queries = rng.sample(candidates, min(options['queries'], len(candidates)))
+        queries = [
+            (article_id, sentence, ' '.join(w for w in sentence.split() if rng.random() >= options['drop']))
+            for article_id, sentence in queries
+        ]
+        corpus_chars = sum(len(content) for _, content in articles)
+        self.stdout.write(f"{len(articles)} artigos, {len(queries)} perguntas, "
+                          f"retriever={'gemini' if options['embed'] else 'tf-idf'}\n")
+
+        chunkers = {
+            'fixed-1000': FixedWindowChunker(),
+            'markdown': MarkdownChunker(options['max_tokens'], options['overlap_tokens']),
+        }
+        header = (f"{'chunker':<12}{'chunks':>8}{'tokens':>10}{'custo $':>10}"
+                  f"{'duplicado':>11}{'intactas':>10}{'recall@' + str(options['k']):>10}")
+        self.stdout.write(header)
+        for name, chunker in chunkers.items():
+            self._evaluate(name, chunker, articles, queries, corpus_chars, options)
+
+    def _evaluate(self, name, chunker, articles, queries, corpus_chars, options):
+        texts, owners = [], []
+        for article_id, content in articles:
+            for chunk in chunker.split(content):
+                texts.append(chunk.content)
+                owners.append(article_id)
+        if not texts:
+            return
+        tokens = sum(count_tokens(text) for text in texts)
+        duplicated = max(0.0, sum(len(text) for text in texts) / max(1, corpus_chars) - 1)
+
+        retriever = EmbeddingRetriever(texts) if options['embed'] else LexicalRetriever(texts)
+        intact = hits = 0
+        for article_id, sentence, query in queries:
+            intact += any(owner == article_id and sentence in text for owner, text in zip(owners, texts))
+            hits += any(owners[doc_id] == article_id for doc_id in retriever.search(query, options['k']))
+
+        self.stdout.write(
+            f"{name:<12}{len(texts):>8}{tokens:>10}{tokens / 1e6 * options['price']:>10.4f}"
+            f"{duplicated:>10.1%} {intact / max(1, len(queries)):>9.1%} {hits / max(1, len(queries)):>9.1%}"
+        )
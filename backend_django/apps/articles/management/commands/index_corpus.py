@@ -0,0 +1,144 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+from apps.articles.models import Article, IndexingRun
+from apps.articles.services.ai_service import get_ai_service
+from apps.articles.services.embedding_snapshot import write_snapshot
+from apps.articles.services.indexing_service import apply_chunk_sync, plan_chunk_sync
+from apps.articles.services.rate_limiter import TokenBucket
+from apps.articles.services.vector_index import invalidate_vector_index, ivf_enabled, publish_ivf_index
+
+
+class Command(BaseCommand):
+    help = ("Indexa o corpus (chunks + embeddings) em paralelo, com limite de pedidos "
+            "à API Gemini e checkpoint para retomar execuções interrompidas.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Pedidos de embedding em paralelo (omissão: AI_INDEXING_WORKERS)")
+        parser.add_argument('--rpm', type=int, default=None,
+                            help="Pedidos de embedding por minuto (omissão: AI_EMBEDDING_RPM). Substitui "
+                                 "a quota partilhada: deixar margem para o tráfego dos servidores")
+        parser.add_argument('--all', action='store_true',
+                            help="Indexar também artigos não publicados")
+        parser.add_argument('--restart', action='store_true',
+                            help="Ignorar o checkpoint e começar uma nova execução")
+
+    def handle(self, *args, **options):
+        workers = options['workers'] or settings.AI_INDEXING_WORKERS
+        rpm = options['rpm'] or settings.AI_EMBEDDING_RPM
+        if workers < 1 or rpm < 1:
+            raise CommandError("--workers e --rpm têm de ser positivos.")
+
+        articles = Article.objects.all() if options['all'] else Article.objects.filter(status='published')
+        run = self._get_run(options['restart'], articles)
+        # Os artigos que falharam antes do checkpoint voltam a entrar na fila
+        pending_ids = list(
+            articles.filter(Q(id__gt=run.last_article_id) | Q(id__in=run.failed_article_ids))
+            .order_by('id').values_list('id', flat=True)
+        )
+        if run.last_article_id:
+            self.stdout.write(f"A retomar a execução {run.id} após o artigo {run.last_article_id} "
+                              f"({run.articles_done}/{run.articles_total} já indexados, "
+                              f"{len(run.failed_article_ids)} com erro a repetir).")
+        self.stdout.write(f"{len(pending_ids)} artigos por indexar com {workers} workers, limite de {rpm} pedidos/min.")
+
+        self.ai = get_ai_service()
+        self.rate_limiter = TokenBucket.per_minute(rpm, burst=workers)
+        started = time.perf_counter()
+        done = chunks = 0
+
+        # Só os pedidos de embedding correm no pool; leituras e escritas na BD ficam
+        # nesta thread. O checkpoint avança por janelas de ids contíguos, quando a
+        # janela inteira termina, por isso uma interrupção nunca salta artigos.
+        # Os artigos da janela que falharam ficam em failed_article_ids, sem
+        # escrever nada, e são repetidos quando a execução é retomada.
+        failed = set(run.failed_article_ids)
+        window_size = workers * 4
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for start in range(0, len(pending_ids), window_size):
+                    window = pending_ids[start:start + window_size]
+                    plans = [
+                        plan_chunk_sync(article, self.ai.embed_model)
+                        for article in Article.objects.filter(id__in=window).order_by('id')
+                    ]
+                    futures = [pool.submit(self._embed, plan) for plan in plans]
+                    for plan, future in zip(plans, futures):
+                        try:
+                            stats = apply_chunk_sync(plan, future.result())
+                        except Exception as e:
+                            self.stderr.write(f"Erro a indexar o artigo {plan.article.id}: {e}")
+                            failed.add(plan.article.id)
+                            continue
+                        failed.discard(plan.article.id)
+                        run.articles_done += 1
+                        run.chunks_embedded += stats['embedded']
+                        run.chunks_reused += stats['reused']
+                        chunks += stats['embedded']
+                    run.last_article_id = max(run.last_article_id, window[-1])
+                    run.failed_article_ids = sorted(failed)
+                    run.articles_failed = len(failed)
+                    run.save()
+
+                    done += len(window)
+                    self._report(done, len(pending_ids), chunks, time.perf_counter() - started)
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING(
+                f"Interrompido; a próxima execução retoma após o artigo {run.last_article_id}."
+            ))
+            return
+
+        if failed:
+            # A execução fica em curso: a próxima invocação repete só os que falharam
+            self.stdout.write(self.style.WARNING(
+                f"{len(failed)} artigos com erro; execute novamente o comando para os repetir."
+            ))
+        else:
+            run.status = 'completed'
+            run.finished_at = timezone.now()
+            run.save()
+
+        invalidate_vector_index()
+        if settings.EMBEDDING_SNAPSHOT_ENABLED:
+            version = write_snapshot()
+            self.stdout.write(f"Snapshot de embeddings publicado: {version}")
+        if ivf_enabled() and publish_ivf_index():
+            self.stdout.write("Índice IVF treinado e publicado.")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexação concluída: {run.articles_done} artigos ({run.articles_failed} com erro), "
+            f"{run.chunks_embedded} chunks gerados, {run.chunks_reused} reutilizados."
+        ))
+
+    def _get_run(self, restart, articles):
+        run = IndexingRun.objects.filter(status='running').first()
+        if run and restart:
+            run.status = 'failed'
+            run.finished_at = timezone.now()
+            run.save(update_fields=['status', 'finished_at', 'updated_at'])
+            run = None
+        if run is None:
+            run = IndexingRun.objects.create(articles_total=articles.count())
+        return run
+
+    def _embed(self, plan):
+        if not plan.texts:
+            return []
+        embeddings = self.ai.generate_embeddings(plan.texts, rate_limiter=self.rate_limiter)
+        # Lotes que falharam vêm a None: o artigo não é gravado e conta como erro
+        if any(embedding is None for embedding in embeddings):
+            raise RuntimeError("pedido de embedding falhou")
+        return embeddings
+
+    def _report(self, done, total, chunks, elapsed):
+        articles_rate = done / elapsed if elapsed else 0.0
+        chunks_rate = chunks / elapsed if elapsed else 0.0
+        eta = (total - done) / articles_rate if articles_rate else 0.0
+        self.stdout.write(
+            f"[{done}/{total}] {articles_rate:.2f} artigos/s, {chunks_rate:.1f} chunks/s, "
+            f"ETA {time.strftime('%H:%M:%S', time.gmtime(eta))}"
+        )
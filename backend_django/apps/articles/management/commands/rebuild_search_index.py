@@ -0,0 +1,16 @@
+import time
+from django.core.management.base import BaseCommand
+from apps.articles.services.bm25_index import rebuild_index
+
+
+class Command(BaseCommand):
+    help = ("Reconstrói o índice invertido BM25 (artigos publicados e chunks). Correr depois da "
+            "migração 0016 (até lá o ?search= usa o SearchFilter do DRF); a partir daí o índice "
+            "é mantido incrementalmente pela index_article_task.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        documents = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(
+            f"Índice BM25 reconstruído: {documents} documentos em {time.perf_counter() - started:.1f}s."
+        ))
@@ -0,0 +1,70 @@
+import numpy as np
+from django.db import migrations, models
+
+
+def pack_json_embeddings(apps, schema_editor):
+    """Converte os vetores JSON existentes para float32 binário"""
+    ArticleChunk = apps.get_model('articles', 'ArticleChunk')
+    batch = []
+    chunks = ArticleChunk.objects.exclude(embedding__isnull=True).only('id', 'embedding')
+    for chunk in chunks.iterator(chunk_size=500):
+        if chunk.embedding:
+            chunk.embedding_packed = np.asarray(chunk.embedding, dtype='<f4').tobytes()
+            chunk.embedding_dtype = 'float32'
+            batch.append(chunk)
+        if len(batch) >= 500:
+            ArticleChunk.objects.bulk_update(batch, ['embedding_packed', 'embedding_dtype'])
+            batch = []
+    if batch:
+        ArticleChunk.objects.bulk_update(batch, ['embedding_packed', 'embedding_dtype'])
+
+
+def unpack_to_json(apps, schema_editor):
+    ArticleChunk = apps.get_model('articles', 'ArticleChunk')
+    dtypes = {'float32': '<f4', 'float16': '<f2'}
+    batch = []
+    chunks = ArticleChunk.objects.exclude(embedding_packed__isnull=True).only('id', 'embedding_packed', 'embedding_dtype')
+    for chunk in chunks.iterator(chunk_size=500):
+        vector = np.frombuffer(chunk.embedding_packed, dtype=dtypes.get(chunk.embedding_dtype, '<f4'))
+        chunk.embedding = vector.astype(float).tolist()
+        batch.append(chunk)
+        if len(batch) >= 500:
+            ArticleChunk.objects.bulk_update(batch, ['embedding'])
+            batch = []
+    if batch:
+        ArticleChunk.objects.bulk_update(batch, ['embedding'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0012_userlike'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='articlechunk',
+            name='embedding_dtype',
+            field=models.CharField(choices=[('float32', 'float32'), ('float16', 'float16')], default='float32', max_length=8),
+        ),
+        migrations.AddField(
+            model_name='articlechunk',
+            name='embedding_packed',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.RunPython(pack_json_embeddings, unpack_to_json),
+        migrations.RemoveField(
+            model_name='articlechunk',
+            name='embedding',
+        ),
+        migrations.RenameField(
+            model_name='articlechunk',
+            old_name='embedding_packed',
+            new_name='embedding',
+        ),
+        migrations.AlterField(
+            model_name='articlechunk',
+            name='embedding',
+            field=models.BinaryField(blank=True, help_text='Vetor de embedding compactado (float32/float16 little-endian)', null=True),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:17
+
+import hashlib
+from django.db import migrations, models
+
+# Modelo de embedding em uso quando os chunks existentes foram gerados
+EMBED_MODEL = 'models/gemini-embedding-001'
+
+
+def backfill_hashes_and_positions(apps, schema_editor):
+    """
+    Preenche hash e posição dos chunks existentes, para que a primeira
+    reindexação incremental reaproveite os embeddings já calculados.
+    """
+    ArticleChunk = apps.get_model('articles', 'ArticleChunk')
+    batch = []
+    last_article_id, position = None, 0
+    chunks = ArticleChunk.objects.only('id', 'article_id', 'content').order_by('article_id', 'id')
+    for chunk in chunks.iterator(chunk_size=500):
+        if chunk.article_id != last_article_id:
+            last_article_id, position = chunk.article_id, 0
+        chunk.position = position
+        chunk.content_hash = hashlib.sha256(f"{EMBED_MODEL}\x00{chunk.content}".encode('utf-8')).hexdigest()
+        position += 1
+        batch.append(chunk)
+        if len(batch) >= 500:
+            ArticleChunk.objects.bulk_update(batch, ['position', 'content_hash'])
+            batch = []
+    if batch:
+        ArticleChunk.objects.bulk_update(batch, ['position', 'content_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0013_articlechunk_binary_embedding'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='articlechunk',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, help_text='SHA-256 do conteúdo (e do modelo de embedding), para reutilizar vetores inalterados', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='articlechunk',
+            name='position',
+            field=models.PositiveIntegerField(default=0, verbose_name='Posição no Artigo'),
+        ),
+        migrations.RunPython(backfill_hashes_and_positions, migrations.RunPython.noop),
+    ]
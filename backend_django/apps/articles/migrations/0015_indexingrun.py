@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0014_articlechunk_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndexingRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('running', 'Em curso'), ('completed', 'Concluída'), ('failed', 'Falhou')], db_index=True, default='running', max_length=20)),
+                ('last_article_id', models.IntegerField(default=0, help_text='Todos os artigos com id <= a este já foram indexados')),
+                ('articles_total', models.IntegerField(default=0)),
+                ('articles_done', models.IntegerField(default=0)),
+                ('articles_failed', models.IntegerField(default=0)),
+                ('chunks_embedded', models.IntegerField(default=0)),
+                ('chunks_reused', models.IntegerField(default=0)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Execução de Indexação',
+                'verbose_name_plural': 'Execuções de Indexação',
+                'ordering': ['-started_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0015_indexingrun'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('article', 'Artigo'), ('chunk', 'Chunk')], max_length=10)),
+                ('length', models.PositiveIntegerField(default=0, help_text='Nº de termos (para a normalização BM25)')),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_documents', to='articles.article')),
+                ('chunk', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='search_document', to='articles.articlechunk')),
+            ],
+            options={
+                'verbose_name': 'Documento de Pesquisa',
+                'verbose_name_plural': 'Documentos de Pesquisa',
+            },
+        ),
+        migrations.CreateModel(
+            name='SearchPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('tf', models.PositiveIntegerField(default=1)),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='articles.searchdocument')),
+            ],
+            options={
+                'verbose_name': 'Entrada do Índice',
+                'verbose_name_plural': 'Entradas do Índice',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='searchdocument',
+            index=models.Index(fields=['kind', 'article'], name='articles_se_kind_371107_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='searchposting',
+            unique_together={('term', 'document')},
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:46
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0016_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AIResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('kind', models.CharField(choices=[('insight', 'Insight'), ('summary', 'Sumário'), ('glossary', 'Glossário')], max_length=20)),
+                ('model', models.CharField(max_length=100, verbose_name='Modelo')),
+                ('prompt_version', models.PositiveIntegerField(default=1)),
+                ('result', models.JSONField(verbose_name='Resultado')),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('article', models.ForeignKey(blank=True, help_text='Artigo de origem, quando conhecido (pré-geração na publicação)', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ai_results', to='articles.article')),
+            ],
+            options={
+                'verbose_name': 'Resultado de IA',
+                'verbose_name_plural': 'Resultados de IA',
+            },
+        ),
+    ]
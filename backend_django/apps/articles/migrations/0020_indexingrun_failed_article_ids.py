@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0019_article_articles_status_published_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='indexingrun',
+            name='failed_article_ids',
+            field=models.JSONField(blank=True, default=list, help_text='Artigos cujo embedding falhou: repetidos quando a execução é retomada'),
+        ),
+        migrations.AlterField(
+            model_name='indexingrun',
+            name='last_article_id',
+            field=models.IntegerField(default=0, help_text='Todos os artigos com id <= a este já foram processados (exceto failed_article_ids)'),
+        ),
+    ]
@@ -1,9 +1,12 @@
 from django.db import models
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.utils.text import slugify
 from django.utils import timezone
 import uuid
+import numpy as np
 from taggit.managers import TaggableManager
+from taggit.models import Tag, TaggedItem
 from simple_history.models import HistoricalRecords
 
 
@@ -131,6 +134,8 @@ class Article(models.Model):
             models.Index(fields=['-published_at']),
             models.Index(fields=['status']),
             models.Index(fields=['slug']),
+            # Feed publicado paginado por cursor (ver pagination.ArticleFeedPagination)
+            models.Index(fields=['status', '-published_at', '-created_at'], name='articles_status_published'),
         ]
     
     def __str__(self):
@@ -199,6 +204,11 @@ class Comment(models.Model):
         ordering = ['-created_at']
         verbose_name = "Comentário"
         verbose_name_plural = "Comentários"
+        indexes = [
+            models.Index(fields=['article', 'status', '-created_at'], name='comments_article_status_date'),
+            # Lista global (CommentViewSet sem ?article=)
+            models.Index(fields=['status', '-created_at'], name='comments_status_date'),
+        ]
     
     def __str__(self):
         return f"Comentário de {self.author_name} em {self.article.title}"
@@ -326,7 +336,7 @@ class Profile(models.Model):
 
 
 # Signals para criar/atualizar Perfil automaticamente
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 
 @receiver(post_save, sender=User)
@@ -428,6 +438,81 @@ def create_outbox_event_on_publish(sender, instance, created, **kwargs):
             transaction.on_commit(lambda: dispatch_outbox_task.delay())
 
 
+# Campos indexados (BM25: título, resumo e conteúdo; chunks: conteúdo) ou que mudam a visibilidade
+INDEXED_FIELDS = {'title', 'excerpt', 'content', 'status'}
+
+
+@receiver(post_save, sender=Article)
+def reindex_article_on_save(sender, instance, **kwargs):
+    """
+    Atualiza o índice BM25 e volta a segmentar o artigo publicado (só os
+    chunks alterados são re-embedded), fora do pedido, em index_article_task.
+    Nos restantes artigos só o índice BM25 é atualizado (são retirados dele).
+    """
+    update_fields = kwargs.get('update_fields')
+    if update_fields and not set(update_fields) & INDEXED_FIELDS:
+        return
+
+    from django.db import transaction
+    from .tasks import index_article_task
+    search_only = not instance.is_published
+    transaction.on_commit(lambda: index_article_task.delay(instance.id, search_only=search_only))
+
+
+@receiver(post_save, sender=Article)
+def prewarm_ai_results_on_save(sender, instance, **kwargs):
+    """Gera insight, sumário e glossário do artigo publicado antes do primeiro leitor"""
+    update_fields = kwargs.get('update_fields')
+    if update_fields and 'content' not in update_fields and 'status' not in update_fields:
+        return
+
+    if instance.is_published and settings.AI_RESULT_PREWARM:
+        from django.db import transaction
+        from .tasks import prewarm_ai_results_task
+        transaction.on_commit(lambda: prewarm_ai_results_task.delay(instance.id))
+
+
+# Contadores atualizados sem tocar no conteúdo (a cache de respostas tolera o atraso)
+COUNTER_FIELDS = {'views', 'likes'}
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+def bump_response_cache_on_article_change(sender, instance, **kwargs):
+    """Invalida as respostas em cache da lista e do detalhe do artigo"""
+    update_fields = kwargs.get('update_fields')
+    if update_fields and set(update_fields) <= COUNTER_FIELDS:
+        return
+
+    from .services import response_cache
+    response_cache.bump_versions(instance.id)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_response_cache_on_comment_change(sender, instance, **kwargs):
+    """Comentário aprovado (ou apagado/alterado depois de moderado); os pendentes não são públicos"""
+    if instance.status != 'pending':
+        from .services import response_cache
+        response_cache.bump_versions(instance.article_id)
+
+
+@receiver(m2m_changed, sender=TaggedItem)
+def bump_response_cache_on_tags_change(sender, instance, action, **kwargs):
+    """Tags adicionadas/removidas de um artigo"""
+    if isinstance(instance, Article) and action in ('post_add', 'post_remove', 'post_clear'):
+        from .services import response_cache
+        response_cache.bump_versions(instance.id)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def bump_response_cache_on_tag_change(sender, instance, **kwargs):
+    """Tag renomeada/apagada: pode aparecer em qualquer artigo"""
+    from .services import response_cache
+    response_cache.bump_versions()
+
+
 class Bookmark(models.Model):
     """Artigos guardados pelo utilizador (Biblioteca Pessoal)"""
     user = models.ForeignKey(
@@ -500,10 +585,33 @@ def update_karma_on_footnote_approval(sender, instance, **kwargs):
 
 class ArticleChunk(models.Model):
     """Fragmento de artigo para recuperação semântica (RAG)"""
+    
+    # Formatos binários suportados (little-endian, independentes da plataforma)
+    EMBEDDING_DTYPES = {
+        'float32': '<f4',
+        'float16': '<f2',
+    }
+    DTYPE_CHOICES = [
+        ('float32', 'float32'),
+        ('float16', 'float16'),
+    ]
+    
     article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='chunks')
     content = models.TextField(verbose_name="Conteúdo do Chunk")
+    content_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        db_index=True,
+        help_text="SHA-256 do conteúdo (e do modelo de embedding), para reutilizar vetores inalterados"
+    )
+    position = models.PositiveIntegerField(default=0, verbose_name="Posição no Artigo")
     token_count = models.IntegerField(default=0)
-    embedding = models.JSONField(null=True, blank=True, help_text="Vetor de embedding (fallback para SQLite)")
+    embedding = models.BinaryField(
+        null=True,
+        blank=True,
+        help_text="Vetor de embedding compactado (float32/float16 little-endian)"
+    )
+    embedding_dtype = models.CharField(max_length=8, choices=DTYPE_CHOICES, default='float32')
     # Para Postgres + pgvector, usar: embedding = VectorField(dimensions=768)
     
     class Meta:
@@ -513,6 +621,68 @@ class ArticleChunk(models.Model):
     def __str__(self):
         return f"Chunk {self.id} de {self.article.title}"
 
+    @classmethod
+    def pack_embedding(cls, vector, dtype='float32'):
+        """Converte uma lista/array de floats para o formato binário compacto"""
+        return np.asarray(vector, dtype=cls.EMBEDDING_DTYPES[dtype]).tobytes()
+
+    @classmethod
+    def unpack_embedding(cls, raw, dtype='float32'):
+        """Vista NumPy (sem cópia, só de leitura) sobre os bytes guardados"""
+        if raw is None:
+            return None
+        return np.frombuffer(raw, dtype=cls.EMBEDDING_DTYPES[dtype])
+
+    def set_embedding(self, vector, dtype=None):
+        self.embedding_dtype = dtype or getattr(settings, 'EMBEDDING_STORAGE_DTYPE', 'float32')
+        self.embedding = self.pack_embedding(vector, self.embedding_dtype) if vector is not None else None
+
+    @property
+    def vector(self):
+        """Embedding como array NumPy (zero-copy via numpy.frombuffer)"""
+        return self.unpack_embedding(self.embedding, self.embedding_dtype)
+
+
+class SearchDocument(models.Model):
+    """Documento do índice invertido BM25 (um artigo publicado ou um chunk)"""
+    KIND_CHOICES = [
+        ('article', 'Artigo'),
+        ('chunk', 'Chunk'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='search_documents')
+    chunk = models.OneToOneField(
+        ArticleChunk,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='search_document'
+    )
+    length = models.PositiveIntegerField(default=0, help_text="Nº de termos (para a normalização BM25)")
+
+    class Meta:
+        verbose_name = "Documento de Pesquisa"
+        verbose_name_plural = "Documentos de Pesquisa"
+        indexes = [
+            models.Index(fields=['kind', 'article']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.chunk_id or self.article_id}"
+
+
+class SearchPosting(models.Model):
+    """Entrada da lista invertida: termo -> documento, com a frequência do termo"""
+    term = models.CharField(max_length=64)
+    document = models.ForeignKey(SearchDocument, on_delete=models.CASCADE, related_name='postings')
+    tf = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        verbose_name = "Entrada do Índice"
+        verbose_name_plural = "Entradas do Índice"
+        unique_together = ('term', 'document')
+
 
 class UserEvent(models.Model):
     """Eventos de utilizador para o motor de recomendação"""
@@ -550,6 +720,75 @@ class AISuggestion(models.Model):
         verbose_name_plural = "Sugestões de IA"
 
 
+class AIResult(models.Model):
+    """
+    Resultado gerado pela IA (insight, sumário ou glossário), endereçado pelo
+    conteúdo: a chave é o SHA-256 do texto enviado ao modelo, da versão do
+    prompt e do modelo, pelo que leitores do mesmo artigo partilham a resposta.
+    """
+    KIND_CHOICES = [
+        ('insight', 'Insight'),
+        ('summary', 'Sumário'),
+        ('glossary', 'Glossário'),
+    ]
+
+    key = models.CharField(max_length=64, unique=True)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    article = models.ForeignKey(
+        Article,
+        on_delete=models.CASCADE,
+        related_name='ai_results',
+        null=True,
+        blank=True,
+        help_text="Artigo de origem, quando conhecido (pré-geração na publicação)"
+    )
+    model = models.CharField(max_length=100, verbose_name="Modelo")
+    prompt_version = models.PositiveIntegerField(default=1)
+    result = models.JSONField(verbose_name="Resultado")
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        verbose_name = "Resultado de IA"
+        verbose_name_plural = "Resultados de IA"
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.key[:12]}"
+
+
+class RelatedArticle(models.Model):
+    """
+    Vizinhos mais próximos de cada artigo publicado, pré-calculados (tarefa
+    compute_related_articles_task) a partir dos embeddings dos chunks, das
+    tags e da categoria. As recomendações de um artigo são uma leitura
+    indexada por (article, rank).
+    """
+    article = models.ForeignKey(
+        Article,
+        on_delete=models.CASCADE,
+        related_name='related_links',
+        verbose_name="Artigo"
+    )
+    related = models.ForeignKey(
+        Article,
+        on_delete=models.CASCADE,
+        related_name='related_to',
+        verbose_name="Artigo relacionado"
+    )
+    rank = models.PositiveSmallIntegerField(verbose_name="Posição")
+    score = models.FloatField(verbose_name="Similaridade")
+
+    class Meta:
+        unique_together = ('article', 'rank')
+        ordering = ['article', 'rank']
+        verbose_name = "Artigo Relacionado"
+        verbose_name_plural = "Artigos Relacionados"
+
+    def __str__(self):
+        return f"{self.article_id} → {self.related_id} (#{self.rank})"
+
+
 
 class OutboxEvent(models.Model):
     """Eventos para serem despachados para sistemas externos (Microserviço Newsletter)"""
@@ -569,6 +808,38 @@ class OutboxEvent(models.Model):
         return f"{self.event_type} - {self.id} ({'OK' if self.processed else 'PENDING'})"
 
 
+class IndexingRun(models.Model):
+    """Checkpoint de uma indexação completa do corpus (comando index_corpus)"""
+    STATUS_CHOICES = [
+        ('running', 'Em curso'),
+        ('completed', 'Concluída'),
+        ('failed', 'Falhou'),
+    ]
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running', db_index=True)
+    last_article_id = models.IntegerField(default=0, help_text="Todos os artigos com id <= a este já foram processados (exceto failed_article_ids)")
+    articles_total = models.IntegerField(default=0)
+    articles_done = models.IntegerField(default=0)
+    articles_failed = models.IntegerField(default=0)
+    failed_article_ids = models.JSONField(
+        default=list, blank=True,
+        help_text="Artigos cujo embedding falhou: repetidos quando a execução é retomada"
+    )
+    chunks_embedded = models.IntegerField(default=0)
+    chunks_reused = models.IntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-started_at']
+        verbose_name = "Execução de Indexação"
+        verbose_name_plural = "Execuções de Indexação"
+
+    def __str__(self):
+        return f"Indexação {self.id} ({self.get_status_display()}, {self.articles_done}/{self.articles_total})"
+
+
 class ReviewRequest(models.Model):
     """Solicitação de revisão por pares para um artigo"""
     
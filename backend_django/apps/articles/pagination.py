@@ -0,0 +1,89 @@
+import json
+from collections import OrderedDict
+from django.db import connections
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+def approximate_count(queryset):
+    """
+    Nº aproximado de linhas do queryset: a estimativa do planeador do
+    PostgreSQL (EXPLAIN), sem percorrer a tabela. Noutras bases de dados
+    (SQLite em desenvolvimento) faz o COUNT(*) exato.
+    """
+    queryset = queryset.order_by()
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class ApproximateCountCursorPagination(CursorPagination):
+    """
+    Paginação por cursor (keyset): cada página é um WHERE sobre as colunas
+    da ordenação + LIMIT, com custo proporcional ao tamanho da página a
+    qualquer profundidade. Sem total, exceto com ?count=approx (aproximado).
+    """
+    count_query_param = 'count'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        if request.query_params.get(self.count_query_param) == 'approx':
+            self.count = approximate_count(queryset)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.count is not None:
+            response.data = OrderedDict([('count', self.count), *response.data.items()])
+        return response
+
+
+class FeedPagination(PageNumberPagination):
+    """
+    Paginação por página (COUNT(*) + OFFSET, a de sempre) ou, com
+    ?pagination=cursor, por cursor sobre `cursor_ordering` (os links
+    next/previous já levam o parâmetro cursor). O scroll infinito deve
+    usar o modo cursor: o OFFSET fica mais lento à medida que o arquivo cresce.
+    Com um termo de pesquisa (o `search_param` dos filtros da view) fica
+    sempre por página: o cursor reordenaria por `cursor_ordering` e perderia
+    a ordem por relevância (BM25).
+    """
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+    cursor_ordering = '-created_at'
+    cursor_class = ApproximateCountCursorPagination
+
+    def uses_cursor(self, request, view=None):
+        params = request.query_params
+        if not (params.get(self.mode_query_param) == 'cursor' or self.cursor_query_param in params):
+            return False
+        search_params = {getattr(backend, 'search_param', None) for backend in getattr(view, 'filter_backends', ())}
+        return not any(params.get(param) for param in search_params if param)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.uses_cursor(request, view):
+            self.cursor_paginator = self.cursor_class()
+            self.cursor_paginator.ordering = self.cursor_ordering
+            self.cursor_paginator.page_size = self.page_size
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class ArticleFeedPagination(FeedPagination):
+    # Mesma ordenação de Article.Meta (índice articles_status_published)
+    cursor_ordering = ('-published_at', '-created_at')
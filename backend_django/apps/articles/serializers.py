@@ -1,5 +1,9 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Article, Category, Comment, Footnote, Subscriber, Bookmark, UserLike
+from taggit.models import Tag
+from .models import Article, Category, Comment, Footnote, Subscriber, Bookmark, UserLike, Profile
 
 from taggit.serializers import (TagListSerializerField,
                                 TaggitSerializer)
@@ -9,6 +13,43 @@ class CategorySerializer(serializers.ModelSerializer):
         model = Category
         fields = ['id', 'name', 'slug', 'description']
 
+class UserArticleFlags:
+    """
+    Bookmarks e likes do utilizador entre um conjunto de artigos, resolvidos em
+    duas consultas (uma por tabela) em vez de duas .exists() por artigo.
+    """
+
+    def __init__(self, user, article_ids):
+        self.article_ids = set(article_ids)
+        self.bookmarked = set(
+            Bookmark.objects.filter(user=user, article_id__in=self.article_ids).values_list('article_id', flat=True)
+        )
+        self.liked = set(
+            UserLike.objects.filter(user=user, article_id__in=self.article_ids).values_list('article_id', flat=True)
+        )
+
+
+class UserArticleFlagsListSerializer(serializers.ListSerializer):
+    """
+    ListSerializer que, antes de serializar a página, guarda no contexto os
+    UserArticleFlags de todos os seus artigos: is_bookmarked/is_liked passam
+    a custar duas consultas por página, independentemente do tamanho.
+    `article_attr` é o atributo de cada item que aponta para o artigo (None:
+    o item é o próprio artigo).
+    """
+    article_attr = None
+
+    def article_id(self, item):
+        return getattr(item, f'{self.article_attr}_id') if self.article_attr else item.id
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        request = self.context.get('request')
+        if items and request and request.user.is_authenticated:
+            self.context['article_flags'] = UserArticleFlags(request.user, [self.article_id(item) for item in items])
+        return super().to_representation(items)
+
+
 class ArticleListSerializer(TaggitSerializer, serializers.ModelSerializer):
     category = serializers.SerializerMethodField()
     tags = TagListSerializerField()
@@ -32,6 +73,7 @@ class ArticleListSerializer(TaggitSerializer, serializers.ModelSerializer):
             'likes', 'views', 'tags', 'metrics', 'journalMeta', 'slug',
             'is_bookmarked', 'is_liked'
         ]
+        list_serializer_class = UserArticleFlagsListSerializer
 
     def get_category(self, obj):
         return obj.category.name if obj.category else "Sem Categoria"
@@ -76,18 +118,144 @@ class ArticleListSerializer(TaggitSerializer, serializers.ModelSerializer):
             'acceptedDate': obj.published_at.strftime("%d %b %Y") if obj.published_at else ""
         }
 
+    def _flags(self, obj):
+        """UserArticleFlags calculados pelo ListSerializer, se cobrirem este artigo"""
+        flags = self.context.get('article_flags')
+        return flags if flags is not None and obj.id in flags.article_ids else None
+
     def get_is_bookmarked(self, obj):
+        flags = self._flags(obj)
+        if flags is not None:
+            return obj.id in flags.bookmarked
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return Bookmark.objects.filter(user=request.user, article=obj).exists()
         return False
 
     def get_is_liked(self, obj):
+        flags = self._flags(obj)
+        if flags is not None:
+            return obj.id in flags.liked
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return UserLike.objects.filter(user=request.user, article=obj).exists()
         return False
 
+class ArticleListRowSerializer:
+    """
+    Caminho rápido da listagem de artigos: a mesma saída do
+    ArticleListSerializer, construída a partir de linhas .values() (sem
+    instâncias nem campos DRF). As tags vêm numa consulta para a página, os
+    URLs absolutos de media partem de uma origem calculada uma vez e os flags
+    do utilizador de UserArticleFlags. Tem a interface de serializer que a
+    ListModelMixin usa (`many`, `context`, `.data`).
+    """
+    DATE_FORMAT = "%d %b %Y"
+    VALUES = (
+        'id', 'title', 'excerpt', 'slug', 'status', 'likes', 'views', 'reading_time', 'cover_image',
+        'published_at', 'created_at', 'citations', 'altmetric_score', 'download_count',
+        'doi', 'issn', 'volume', 'issue', 'category_id', 'category__name',
+        'author__username', 'author__first_name', 'author__last_name',
+        'author__profile__id', 'author__profile__photo', 'author__profile__badges',
+    )
+
+    def __init__(self, instance=None, many=True, context=None, **kwargs):
+        self.instance = instance
+        self.context = context or {}
+
+    @classmethod
+    def values(cls, queryset):
+        """Linhas da página; as prefetches do queryset de instâncias não se aplicam a .values()"""
+        return queryset.prefetch_related(None).values(*cls.VALUES)
+
+    @staticmethod
+    def tags(article_ids):
+        """{article_id: [nomes]}: a mesma consulta do prefetch_related('tags')"""
+        relname = Article.tags.through.tag_relname()
+        rows = Tag.objects.filter(**{
+            f'{relname}__content_type': ContentType.objects.get_for_model(Article),
+            f'{relname}__object_id__in': article_ids,
+        }).values_list(f'{relname}__object_id', 'name')
+        tags = {}
+        for article_id, name in rows:
+            tags.setdefault(article_id, []).append(name)
+        return tags
+
+    def media_url(self, field, name):
+        """Como request.build_absolute_uri(field.url), com a origem calculada uma vez"""
+        if not name:
+            return None
+        url = field.storage.url(name)
+        request = self.context.get('request')
+        if request is None:
+            return url
+        if url.startswith('/') and not url.startswith('//'):
+            if self._origin is None:
+                self._origin = request.build_absolute_uri('/')[:-1]
+            return self._origin + url
+        return request.build_absolute_uri(url)
+
+    @property
+    def data(self):
+        rows = self.instance
+        if isinstance(rows, models.QuerySet):
+            rows = self.values(rows)
+        rows = list(rows)
+        ids = [row['id'] for row in rows]
+        tags = self.tags(ids) if ids else {}
+
+        request = self.context.get('request')
+        flags = None
+        if ids and request and request.user.is_authenticated:
+            flags = UserArticleFlags(request.user, ids)
+
+        self._origin = None
+        cover_field = Article._meta.get_field('cover_image')
+        photo_field = Profile._meta.get_field('photo')
+        return [self.to_representation(row, tags, flags, cover_field, photo_field) for row in rows]
+
+    def to_representation(self, row, tags, flags, cover_field, photo_field):
+        article_id = row['id']
+        published_at = row['published_at']
+        has_profile = row['author__profile__id'] is not None
+        return {
+            'id': article_id,
+            'title': row['title'],
+            'excerpt': row['excerpt'],
+            'author': f"{row['author__first_name']} {row['author__last_name']}".strip(),
+            'author_username': row['author__username'],
+            'author_badges': row['author__profile__badges'] if has_profile else [],
+            'authorAvatarUrl': self.media_url(photo_field, row['author__profile__photo']) if has_profile else None,
+            # Como o DateTimeField do DRF: na zona horária atual
+            'date': timezone.localtime(published_at).strftime(self.DATE_FORMAT) if published_at else None,
+            'category': row['category__name'] if row['category_id'] is not None else "Sem Categoria",
+            'imageUrl': self.media_url(cover_field, row['cover_image']),
+            'readTime': row['reading_time'],
+            'status': row['status'],
+            'likes': row['likes'],
+            'views': row['views'],
+            'tags': tags.get(article_id, []),
+            'metrics': {
+                'citations': row['citations'],
+                'altmetricScore': row['altmetric_score'],
+                'viewCount': row['views'],
+                'downloadCount': row['download_count'],
+            },
+            # Como ArticleListSerializer.get_journalMeta: strftime direto (sem conversão de zona)
+            'journalMeta': {
+                'doi': row['doi'],
+                'issn': row['issn'],
+                'volume': row['volume'],
+                'issue': row['issue'],
+                'receivedDate': row['created_at'].strftime(self.DATE_FORMAT),
+                'acceptedDate': published_at.strftime(self.DATE_FORMAT) if published_at else "",
+            },
+            'slug': row['slug'],
+            'is_bookmarked': flags is not None and article_id in flags.bookmarked,
+            'is_liked': flags is not None and article_id in flags.liked,
+        }
+
+
 class ArticleDetailSerializer(ArticleListSerializer):
     author_username = serializers.CharField(source='author.username', read_only=True)
     authorAvatarUrl = serializers.SerializerMethodField()
@@ -109,21 +277,6 @@ class ArticleDetailSerializer(ArticleListSerializer):
         ]
 
 
-
-
-    def get_is_bookmarked(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return Bookmark.objects.filter(user=request.user, article=obj).exists()
-        return False
-
-    def get_is_liked(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return UserLike.objects.filter(user=request.user, article=obj).exists()
-        return False
-
-
 class CommentSerializer(serializers.ModelSerializer):
     author = serializers.CharField(source='author_name')
     email = serializers.EmailField(source='author_email')
@@ -170,6 +323,10 @@ class AuthorFollowerSerializer(serializers.ModelSerializer):
         model = AuthorFollower
         fields = ['follower_email']
 
+class BookmarkListSerializer(UserArticleFlagsListSerializer):
+    article_attr = 'article'
+
+
 class BookmarkSerializer(serializers.ModelSerializer):
     article = ArticleListSerializer(read_only=True)
     article_id = serializers.PrimaryKeyRelatedField(
@@ -182,6 +339,7 @@ class BookmarkSerializer(serializers.ModelSerializer):
         model = Bookmark
         fields = ['id', 'user', 'article', 'article_id', 'created_at']
         read_only_fields = ['user', 'created_at']
+        list_serializer_class = BookmarkListSerializer
 
 class AuthorSerializer(serializers.ModelSerializer):
     profile = ProfileSerializer(read_only=True)
@@ -193,16 +351,9 @@ class AuthorSerializer(serializers.ModelSerializer):
         fields = ['username', 'first_name', 'last_name', 'date_joined', 'profile', 'stats', 'is_following']
         
     def get_stats(self, obj):
-        # Calcular estatísticas reais
-        articles = obj.articles.filter(status='published')
-        total_views = sum(a.views for a in articles)
-        followers_count = AuthorFollower.objects.filter(author=obj).count()
-        return {
-            'articles': articles.count(),
-            'reads': total_views,
-            'followers': followers_count,
-            'karma': getattr(obj.profile, 'karma', 0) if hasattr(obj, 'profile') else 0
-        }
+        # Uma linha da tabela AuthorStats, mantida pelos sinais/tarefas de analytics
+        from apps.analytics.services import AuthorStatsService
+        return AuthorStatsService.get(obj).as_dict()
 
     def get_is_following(self, obj):
         # Tenta determinar se o usuário atual segue este autor
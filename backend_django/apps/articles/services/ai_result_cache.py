@@ -0,0 +1,140 @@
+import hashlib
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+from ..models import AIResult
+from .ai_service import AIService
+
+KINDS = ('insight', 'summary', 'glossary')
+CACHE_KEY = 'ai:result:{key}'
+STATS_KEY = 'ai:result:stats:{kind}:{outcome}'
+
+# Respostas de recurso (IA desligada ou com erro) nunca são guardadas
+FALLBACK_RESULTS = {
+    'insight': (AIService.INSIGHT_DISABLED_MESSAGE, AIService.INSIGHT_ERROR_MESSAGE),
+    'summary': (AIService.SUMMARY_DISABLED_MESSAGE, AIService.SUMMARY_ERROR_MESSAGE),
+    'glossary': ([],),
+}
+
+
+def result_key(kind, content):
+    """
+    SHA-256 do texto efetivamente enviado ao modelo (conteúdo truncado), da
+    versão do prompt e do modelo: mudar qualquer um deles gera outra chave.
+    """
+    content = (content or '')[:AIService.PROMPT_CONTENT_LIMITS[kind]]
+    material = f"{kind}\x00{AIService.PROMPT_VERSIONS[kind]}\x00{AIService.GENERATION_MODEL}\x00{content}"
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+def _count(kind, outcome):
+    key = STATS_KEY.format(kind=kind, outcome=outcome)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # A chave expirou/foi despejada entre o add e o incr
+        cache.set(key, 1, None)
+
+
+def lookup(kind, content):
+    """
+    Resultado em cache ou None. Primeiro a cache do Django (Redis), depois a
+    tabela AIResult; os hits na tabela voltam a aquecer a cache do Django.
+    """
+    key = result_key(kind, content)
+    cached = cache.get(CACHE_KEY.format(key=key))
+    if cached is not None:
+        _count(kind, 'hits')
+        return cached
+
+    entry = AIResult.objects.filter(key=key).values_list('result', flat=True).first()
+    if entry is None:
+        _count(kind, 'misses')
+        return None
+
+    # Só os hits na tabela atualizam last_used_at: a eviction por LRU tem
+    # a granularidade do TTL da cache do Django, sem uma escrita por leitura
+    AIResult.objects.filter(key=key).update(hits=F('hits') + 1, last_used_at=timezone.now())
+    cache.set(CACHE_KEY.format(key=key), entry, settings.AI_RESULT_CACHE_TTL)
+    _count(kind, 'hits')
+    return entry
+
+
+def store(kind, content, result, article=None):
+    """Guarda o resultado (exceto respostas de recurso); devolve True se foi guardado"""
+    if result in FALLBACK_RESULTS[kind]:
+        return False
+    key = result_key(kind, content)
+    defaults = {
+        'kind': kind,
+        'model': AIService.GENERATION_MODEL,
+        'prompt_version': AIService.PROMPT_VERSIONS[kind],
+        'result': result,
+        'last_used_at': timezone.now(),
+    }
+    if article is not None:
+        defaults['article'] = article
+    AIResult.objects.update_or_create(key=key, defaults=defaults)
+    cache.set(CACHE_KEY.format(key=key), result, settings.AI_RESULT_CACHE_TTL)
+    return True
+
+
+def cached_result(kind, content, generate, article=None):
+    """Resultado em cache ou, numa falha, `generate(content)` (que é guardado)"""
+    result = lookup(kind, content)
+    if result is None:
+        result = generate(content)
+        store(kind, content, result, article=article)
+    return result
+
+
+def invalidate_article(article):
+    """
+    Apaga os resultados de um artigo: os associados na pré-geração e os
+    endereçados pelo seu conteúdo atual (pedidos vindos do frontend).
+    Devolve o nº de entradas removidas.
+    """
+    keys = [result_key(kind, article.content) for kind in KINDS]
+    entries = AIResult.objects.filter(article=article) | AIResult.objects.filter(key__in=keys)
+    keys = set(keys) | set(entries.values_list('key', flat=True))
+    deleted, _ = AIResult.objects.filter(key__in=keys).delete()
+    cache.delete_many([CACHE_KEY.format(key=key) for key in keys])
+    return deleted
+
+
+def evict(max_entries=None, max_age_days=None):
+    """
+    Remove entradas sem uso há mais de `max_age_days` e, acima de
+    `max_entries`, as menos usadas recentemente (LRU por last_used_at).
+    As cópias na cache do Django expiram sozinhas (AI_RESULT_CACHE_TTL).
+    """
+    max_entries = settings.AI_RESULT_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+    max_age_days = settings.AI_RESULT_CACHE_MAX_AGE_DAYS if max_age_days is None else max_age_days
+
+    cutoff = timezone.now() - timedelta(days=max_age_days)
+    deleted, _ = AIResult.objects.filter(last_used_at__lt=cutoff).delete()
+    overflow = AIResult.objects.count() - max_entries
+    if overflow > 0:
+        oldest = AIResult.objects.order_by('last_used_at').values_list('id', flat=True)[:overflow]
+        removed, _ = AIResult.objects.filter(id__in=list(oldest)).delete()
+        deleted += removed
+    return deleted
+
+
+def stats():
+    """Hits, misses e hit rate por tipo (contadores partilhados por todos os workers)"""
+    counters = cache.get_many([STATS_KEY.format(kind=kind, outcome=outcome)
+                               for kind in KINDS for outcome in ('hits', 'misses')])
+    result = {'entries': AIResult.objects.count()}
+    for kind in KINDS:
+        hits = counters.get(STATS_KEY.format(kind=kind, outcome='hits'), 0)
+        misses = counters.get(STATS_KEY.format(kind=kind, outcome='misses'), 0)
+        result[kind] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+        }
+    return result
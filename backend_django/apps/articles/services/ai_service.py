@@ -1,56 +1,224 @@
 
+import hashlib
 import os
+import threading
+from contextlib import contextmanager
 import google.generativeai as genai
 from django.conf import settings
 from ..models import Article, ArticleChunk
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .embedding_cache import get_query_embedding_cache
+from .rate_limiter import RateLimitExceeded, SharedTokenBucket
+from .single_flight import SingleFlight, SingleFlightError
+
+
+class AIBusyError(RuntimeError):
+    """Todas as vagas de pedidos ao Gemini deste processo estão ocupadas"""
+
 
 class AIService:
+    GENERATION_MODEL = 'gemini-1.5-flash'
+    EMBED_MODEL = 'models/gemini-embedding-001'
+
+    # Quotas do Gemini (pedidos/min por modelo): cada uma tem o seu token
+    # bucket partilhado e o seu circuit breaker
+    QUOTAS = ('generate', 'embed')
+    # Respostas do Gemini que indicam um serviço em dificuldades (não um pedido inválido)
+    UPSTREAM_FAILURE_STATUSES = {429, 500, 502, 503, 504}
+
+    # Versão de cada prompt: incrementar ao alterá-lo invalida os resultados em cache
+    PROMPT_VERSIONS = {'insight': 1, 'summary': 1, 'glossary': 1}
+    # Nº de caracteres do artigo enviados em cada prompt
+    PROMPT_CONTENT_LIMITS = {'insight': 4000, 'summary': 4000, 'glossary': 3000}
+
+    # Respostas de recurso quando a IA não está configurada ou falha
+    INSIGHT_DISABLED_MESSAGE = "Fascinante reflexão científica em processamento..."
+    INSIGHT_ERROR_MESSAGE = "Um insight fascinante está a ser preparado pelos nossos curadores."
+    SUMMARY_DISABLED_MESSAGE = "Sumário em elaboração editorial."
+    SUMMARY_ERROR_MESSAGE = "O sumário está a ser revisto pela nossa equipa editorial."
+
+    # Mensagens devolvidas ao leitor pelo chat RAG
+    RAG_ERROR_MESSAGE = "Peço desculpa, ocorreu um erro ao contactar o motor de inteligência artificial do Sussurros do Saber. Por favor, tente novamente em instantes."
+    RAG_QUOTA_MESSAGE = "O motor de IA está com elevada carga de pedidos (Limite de Quota). Por favor, aguarde um minuto e tente novamente."
+    RAG_DISABLED_MESSAGE = "A funcionalidade de IA não está configurada (API Key em falta)."
+
     def __init__(self):
         self.api_key = getattr(settings, 'GEMINI_API_KEY', None) or os.getenv('GEMINI_API_KEY')
         if not self.api_key:
             print("[AIService] Warning: GEMINI_API_KEY not configured.")
         
         genai.configure(api_key=self.api_key)
-        self.model = genai.GenerativeModel('gemini-1.5-flash')
-        self.embed_model = 'models/gemini-embedding-001'
+        self.model = genai.GenerativeModel(self.GENERATION_MODEL)
+        self.embed_model = self.EMBED_MODEL
+        self._slots = threading.BoundedSemaphore(settings.AI_MAX_CONCURRENT_REQUESTS)
+        self.single_flight = SingleFlight(
+            redis=self._shared_redis() if settings.AI_SINGLE_FLIGHT_REDIS else None,
+            wait_timeout=settings.AI_SINGLE_FLIGHT_TIMEOUT,
+            result_ttl=settings.AI_SINGLE_FLIGHT_RESULT_TTL,
+        )
+        quota_rpm = {'generate': settings.AI_GENERATION_RPM, 'embed': settings.AI_EMBEDDING_RPM}
+        self.rate_limiters = {
+            quota: SharedTokenBucket.per_minute(
+                f"ai:quota:{quota}", rpm,
+                burst=max(1.0, rpm * settings.AI_RATE_LIMIT_BURST_SECONDS / 60.0),
+                redis=self._shared_redis(),
+            )
+            for quota, rpm in quota_rpm.items()
+        }
+        self.circuit_breakers = {
+            quota: CircuitBreaker(
+                f"gemini-{quota}",
+                failure_threshold=settings.AI_CIRCUIT_FAILURE_THRESHOLD,
+                reset_timeout=settings.AI_CIRCUIT_RESET_TIMEOUT,
+                redis=self._shared_redis(),
+            )
+            for quota in self.QUOTAS
+        }
 
-    def generate_insight(self, content):
-        """Fornece um insight curto e fascinante sobre o artigo"""
-        if not self.api_key: return "Fascinante reflexão científica em processamento..."
-        
-        prompt = f"Como um curador científico do 'Sussurros do Saber', forneça um insight curto (máximo 3 frases) e fascinante sobre este artigo: {content[:4000]}"
+    @staticmethod
+    def _shared_redis():
+        """Redis partilhado (o mesmo das analytics) para coordenar os processos, se disponível"""
+        from apps.analytics.services import redis_client
+        return redis_client if redis_client.enabled else None
+
+    @staticmethod
+    def _error_status(error):
+        """Código HTTP de um erro do SDK (google.api_core: .code) ou do aiohttp (.status)"""
+        status = getattr(error, 'status', None) or getattr(error, 'code', None)
+        return status if isinstance(status, int) else None
+
+    @classmethod
+    def is_quota_error(cls, error):
+        return cls._error_status(error) == 429 or "429" in str(error)
+
+    @classmethod
+    def is_upstream_failure(cls, error):
+        """Erros que contam para o circuit breaker: quota, 5xx, timeouts e falhas de ligação"""
+        return (
+            cls.is_quota_error(error)
+            or cls._error_status(error) in cls.UPSTREAM_FAILURE_STATUSES
+            or isinstance(error, (TimeoutError, ConnectionError))
+        )
+
+    @staticmethod
+    def is_throttled(error):
+        """O pedido foi recusado localmente por falta de quota ou com o circuito aberto"""
+        if isinstance(error, SingleFlightError):
+            return error.throttled
+        return isinstance(error, (RateLimitExceeded, CircuitOpenError))
+
+    @classmethod
+    def describe_error(cls, error):
+        """Classificação de um erro partilhado pelo single-flight com outros processos"""
+        return {
+            'status': 429 if cls.is_quota_error(error) else cls._error_status(error),
+            'throttled': cls.is_throttled(error),
+        }
+
+    @contextmanager
+    def gemini_call(self, quota, block=False, limiter=None):
+        """
+        Envolve cada pedido ao Gemini:
+        1. circuit breaker: com o serviço em baixo falha de imediato (CircuitOpenError);
+        2. token bucket partilhado da quota: espera no máximo AI_RATE_LIMIT_WAIT
+           segundos (sem limite com `block`, para tarefas em lote) ou levanta
+           RateLimitExceeded. Um `limiter` próprio (ex.: o --rpm do
+           index_corpus) substitui o partilhado, para não limitar duas vezes;
+        3. vaga de concorrência do processo (request_slot).
+        Um 429 esvazia o bucket, para que nenhum processo insista até a quota recuperar.
+        """
+        breaker = self.circuit_breakers[quota]
+        limiter = limiter or self.rate_limiters[quota]
+        breaker.before_call()
+        healthy = None  # None: o pedido não chegou ao Gemini
         try:
-            response = self.model.generate_content(prompt)
-            return response.text
-        except Exception as e:
-            print(f"[AIService] Insight Error: {e}")
-            return "Um insight fascinante está a ser preparado pelos nossos curadores."
+            if block:
+                limiter.acquire()
+            else:
+                limiter.acquire(timeout=settings.AI_RATE_LIMIT_WAIT)
+            with self.request_slot():
+                try:
+                    yield
+                except Exception as e:
+                    healthy = not self.is_upstream_failure(e)
+                    if self.is_quota_error(e):
+                        limiter.drain()
+                    raise
+                healthy = True
+        finally:
+            if healthy is None:
+                breaker.release()
+            elif healthy:
+                breaker.record_success()
+            else:
+                breaker.record_failure()
 
-    def generate_summary(self, content):
-        """Cria um sumário executivo de alto nível"""
-        if not self.api_key: return "Sumário em elaboração editorial."
-        
-        prompt = f"""
+    @contextmanager
+    def request_slot(self):
+        """
+        Limita os pedidos ao Gemini em simultâneo no processo
+        (settings.AI_MAX_CONCURRENT_REQUESTS); sem vaga em
+        AI_CONCURRENCY_TIMEOUT segundos, falha com AIBusyError.
+        """
+        if not self._slots.acquire(timeout=settings.AI_CONCURRENCY_TIMEOUT):
+            raise AIBusyError("Limite de pedidos simultâneos ao Gemini atingido")
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    def generate_content(self, *args, **kwargs):
+        """GenerativeModel.generate_content dentro de gemini_call('generate')"""
+        with self.gemini_call('generate'):
+            return self.model.generate_content(*args, **kwargs)
+
+    def embed_content(self, block=False, limiter=None, **kwargs):
+        """genai.embed_content dentro de gemini_call('embed')"""
+        with self.gemini_call('embed', block=block, limiter=limiter):
+            return genai.embed_content(**kwargs)
+
+    def generate_text(self, prompt, response_mime_type=None):
+        """
+        Texto gerado para `prompt`. Pedidos idênticos em simultâneo (mesmo
+        modelo, formato e prompt) partilham uma única chamada ao Gemini, no
+        processo e entre processos (single-flight); um erro, incluindo um 429,
+        é entregue a todos em vez de se multiplicar em novas chamadas.
+        """
+        def call():
+            kwargs = {}
+            if response_mime_type:
+                kwargs['generation_config'] = genai.GenerationConfig(response_mime_type=response_mime_type)
+            return self.generate_content(prompt, **kwargs).text
+
+        return self.single_flight.do(self.generation_key(prompt, response_mime_type), call)
+
+    @classmethod
+    def generation_key(cls, prompt, response_mime_type=None):
+        """Chave single-flight de uma geração (partilhada com o AsyncAIService)"""
+        digest = hashlib.sha256(
+            f"{cls.GENERATION_MODEL}\x00{response_mime_type}\x00{prompt}".encode()
+        ).hexdigest()
+        return f"generate:{digest}"
+
+    @classmethod
+    def _insight_prompt(cls, content):
+        return f"Como um curador científico do 'Sussurros do Saber', forneça um insight curto (máximo 3 frases) e fascinante sobre este artigo: {content[:cls.PROMPT_CONTENT_LIMITS['insight']]}"
+
+    @classmethod
+    def _summary_prompt(cls, content):
+        return f"""
         Você é um editor sénior do jornal académico "Sussurros do Saber".
         Leia o manuscrito abaixo e crie um sumário executivo de alto nível.
         O sumário deve consistir em 3 pontos fundamentais (bullet points), totalizando no máximo 80 palavras.
         Seja rigoroso, académico mas fascinante.
         
         Texto:
-        {content[:4000]}
+        {content[:cls.PROMPT_CONTENT_LIMITS['summary']]}
         """
-        try:
-            response = self.model.generate_content(prompt)
-            return response.text
-        except Exception as e:
-            print(f"[AIService] Summary Error: {e}")
-            return "O sumário está a ser revisto pela nossa equipa editorial."
 
-    def generate_glossary(self, content):
-        """Identifica e define termos técnicos complexos em formato JSON"""
-        if not self.api_key: return []
-        
-        prompt = f"""
+    @classmethod
+    def _glossary_prompt(cls, content):
+        return f"""
         Como editor académico do Sussurros do Saber, analise o texto abaixo.
         Identifique 5 a 8 termos técnicos, científicos ou conceitos complexos que necessitam de clarificação.
         REGRAS CRÍTICAS:
@@ -65,17 +233,40 @@ class AIService:
         ]
         
         Texto:
-        {content[:3000]}
+        {content[:cls.PROMPT_CONTENT_LIMITS['glossary']]}
         """
+
+    def generate_insight(self, content):
+        """Fornece um insight curto e fascinante sobre o artigo"""
+        if not self.api_key: return self.INSIGHT_DISABLED_MESSAGE
+        
+        prompt = self._insight_prompt(content)
         try:
-            response = self.model.generate_content(
-                prompt,
-                generation_config=genai.GenerationConfig(
-                    response_mime_type="application/json",
-                )
-            )
+            return self.generate_text(prompt)
+        except Exception as e:
+            print(f"[AIService] Insight Error: {e}")
+            return self.INSIGHT_ERROR_MESSAGE
+
+    def generate_summary(self, content):
+        """Cria um sumário executivo de alto nível"""
+        if not self.api_key: return self.SUMMARY_DISABLED_MESSAGE
+        
+        prompt = self._summary_prompt(content)
+        try:
+            return self.generate_text(prompt)
+        except Exception as e:
+            print(f"[AIService] Summary Error: {e}")
+            return self.SUMMARY_ERROR_MESSAGE
+
+    def generate_glossary(self, content):
+        """Identifica e define termos técnicos complexos em formato JSON"""
+        if not self.api_key: return []
+        
+        prompt = self._glossary_prompt(content)
+        try:
+            text = self.generate_text(prompt, response_mime_type="application/json")
             import json
-            return json.loads(response.text)
+            return json.loads(text)
         except Exception as e:
             print(f"[AIService] Glossary Error: {e}")
             return []
@@ -84,7 +275,7 @@ class AIService:
         """Gera embedding para um texto usando Gemini"""
         if not self.api_key: return [0.0] * 768
         try:
-            result = genai.embed_content(
+            result = self.embed_content(
                 model=self.embed_model,
                 content=text,
                 task_type="retrieval_document"
@@ -94,33 +285,98 @@ class AIService:
             print(f"[AIService] Embedding Error: {e}")
             return [0.0] * 768
 
+    def generate_embeddings(self, texts, batch_size=None, rate_limiter=None):
+        """
+        Gera embeddings para vários textos, enviando até `batch_size` textos
+        por pedido (settings.AI_EMBEDDING_BATCH_SIZE por omissão).
+        Com `rate_limiter` (TokenBucket), cada pedido consome um token desse
+        bucket em vez da quota partilhada. Em lote, espera sem limite pela
+        quota em vez de desistir.
+        Devolve uma lista alinhada com `texts`; lotes que falhem ficam a None.
+        """
+        texts = list(texts)
+        if not texts: return []
+        if not self.api_key: return [[0.0] * 768 for _ in texts]
+
+        batch_size = batch_size or settings.AI_EMBEDDING_BATCH_SIZE
+        embeddings = []
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            try:
+                result = self.embed_content(
+                    block=True,
+                    limiter=rate_limiter,
+                    model=self.embed_model,
+                    content=batch,
+                    task_type="retrieval_document"
+                )
+                embeddings.extend(result['embedding'])
+            except Exception as e:
+                print(f"[AIService] Batch Embedding Error ({len(batch)} textos): {e}")
+                embeddings.extend([None] * len(batch))
+        return embeddings
+
     def get_query_embedding(self, query):
-        """Gera embedding para uma pesquisa"""
+        """
+        Gera embedding para uma pesquisa.
+        Pesquisas repetidas são servidas pela cache (LRU local + cache partilhada),
+        evitando a chamada remota ao Gemini.
+        """
         if not self.api_key: return [0.0] * 768
+
+        query_cache = get_query_embedding_cache()
+        key = query_cache.make_key(query, self.embed_model)
+        cached = query_cache.get(key)
+        if cached is not None:
+            return cached.tolist()
+
         try:
-            result = genai.embed_content(
-                model=self.embed_model,
-                content=query,
-                task_type="retrieval_query"
+            # A mesma pesquisa feita em simultâneo (ex.: uma sugestão popular)
+            # gera um único pedido de embedding
+            embedding = self.single_flight.do(
+                f"embed:{key}",
+                lambda: self.embed_content(
+                    model=self.embed_model,
+                    content=query,
+                    task_type="retrieval_query"
+                )['embedding'],
             )
-            return result['embedding']
+            # Apenas respostas válidas são guardadas (nunca o vetor de fallback)
+            query_cache.set(key, embedding)
+            return embedding
         except Exception as e:
             print(f"[AIService] Query Embedding Error: {e}")
             return [0.0] * 768
 
-    def rag_chat(self, question, context_chunks):
+    def single_flight_stats(self):
+        """Chamadas executadas (líderes) e partilhadas (no processo e via Redis)"""
+        return self.single_flight.stats()
+
+    def status(self):
         """
-        Executa o fluxo RAG: Contexto + Pergunta -> Resposta com Citações
+        Estado do cliente Gemini: circuit breakers e token buckets por quota e
+        deduplicação. Os contadores são deste processo; os tokens disponíveis
+        são os do bucket partilhado (quando há Redis).
         """
-        if not self.api_key:
-            return {"text": "A funcionalidade de IA não está configurada (API Key em falta).", "citations": [], "confidence": 0}
+        return {
+            'circuit_breakers': {quota: breaker.stats() for quota, breaker in self.circuit_breakers.items()},
+            'rate_limiters': {quota: limiter.stats() for quota, limiter in self.rate_limiters.items()},
+            'single_flight': self.single_flight_stats(),
+        }
+
+    @staticmethod
+    def query_embedding_cache_stats():
+        """Contadores de hits/misses da cache de embeddings de pesquisa"""
+        return get_query_embedding_cache().stats()
 
+    @staticmethod
+    def _build_rag_prompt(question, context_chunks):
         context_text = "\n\n".join([
-            f"[ID:{chunk.id} | Artigo:{chunk.article.id}] {chunk.content}" 
+            f"[ID:{chunk.id} | Artigo:{chunk.article_id}] {chunk.content}" 
             for chunk in context_chunks
         ])
 
-        prompt = f"""
+        return f"""
         Atue como o Assistente Científico "Sussurros AI".
         
         OBJETIVO:
@@ -142,37 +398,97 @@ class AIService:
         {question}
         """
 
-        import time
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                response = self.model.generate_content(prompt)
-                return {
-                    "text": response.text,
-                    "citations": [
-                        {"article_id": chunk.article.id, "chunk_id": chunk.id} 
-                        for chunk in context_chunks
-                    ],
-                    "confidence": 0.95
-                }
-            except Exception as e:
-                # Se for erro de quota (429), tentar novamente com backoff
-                if "429" in str(e) and attempt < max_retries - 1:
-                    wait_time = (attempt + 1) * 2
-                    print(f"[AIService] Quota exceeded (429). Retrying in {wait_time}s... (Attempt {attempt + 1})")
-                    time.sleep(wait_time)
-                    continue
-                
-                import traceback
-                print(f"[AIService] RAG Chat Error: {e}")
-                traceback.print_exc()
-                
-                user_msg = "Peço desculpa, ocorreu um erro ao contactar o motor de inteligência artificial do Sussurros do Saber. Por favor, tente novamente em instantes."
-                if "429" in str(e):
-                    user_msg = "O motor de IA está com elevada carga de pedidos (Limite de Quota). Por favor, aguarde um minuto e tente novamente."
-                
-                return {
-                    "text": user_msg,
-                    "citations": [],
-                    "confidence": 0
-                }
+    @staticmethod
+    def _rag_citations(context_chunks):
+        return [
+            {"article_id": chunk.article_id, "chunk_id": chunk.id} 
+            for chunk in context_chunks
+        ]
+
+    def rag_chat(self, question, context_chunks):
+        """
+        Executa o fluxo RAG: Contexto + Pergunta -> Resposta com Citações
+        """
+        if not self.api_key:
+            return {"text": self.RAG_DISABLED_MESSAGE, "citations": [], "confidence": 0}
+
+        prompt = self._build_rag_prompt(question, context_chunks)
+        # Sem retentativas com sleep: com a quota esgotada ou o circuito aberto
+        # o leitor recebe logo a resposta de recurso, sem prender o worker
+        try:
+            text = self.generate_text(prompt)
+        except Exception as e:
+            print(f"[AIService] RAG Chat Error: {e}")
+            return {"text": self.rag_error_message(e), "citations": [], "confidence": 0}
+        return {
+            "text": text,
+            "citations": self._rag_citations(context_chunks),
+            "confidence": 0.95
+        }
+
+    @classmethod
+    def rag_error_message(cls, error):
+        """Mensagem para o leitor: carga elevada (quota/circuito) ou erro genérico"""
+        if cls.is_throttled(error) or cls.is_quota_error(error):
+            return cls.RAG_QUOTA_MESSAGE
+        return cls.RAG_ERROR_MESSAGE
+
+    def rag_chat_stream(self, question, context_chunks):
+        """
+        Versão em streaming do fluxo RAG. Gera eventos (nome, dados):
+        - ('token', {"text": ...}) à medida que o Gemini produz texto
+        - ('citations', {"citations": [...], "confidence": ...}) no fim
+        - ('error', {"text": ...}) se a geração falhar
+        Não há retentativas com sleep: num erro de quota (429) o cliente é
+        avisado de imediato, sem prender o worker.
+        """
+        if not self.api_key:
+            yield 'error', {"text": self.RAG_DISABLED_MESSAGE}
+            return
+
+        prompt = self._build_rag_prompt(question, context_chunks)
+        streamed_text = False
+        try:
+            # A vaga (e o pedido de teste do circuit breaker) fica ocupada
+            # enquanto o Gemini envia a resposta
+            with self.gemini_call('generate'):
+                for part in self.model.generate_content(prompt, stream=True):
+                    text = getattr(part, 'text', '')
+                    if text:
+                        streamed_text = True
+                        yield 'token', {"text": text}
+        except Exception as e:
+            print(f"[AIService] RAG Stream Error: {e}")
+            yield 'error', {"text": self.rag_error_message(e)}
+            if not streamed_text:
+                return
+
+        yield 'citations', {
+            "citations": self._rag_citations(context_chunks),
+            "confidence": 0.95 if streamed_text else 0
+        }
+
+
+_ai_service = None
+_ai_service_lock = threading.Lock()
+
+
+def get_ai_service():
+    """
+    Instância única por processo, criada no primeiro uso: genai.configure e o
+    GenerativeModel (e os clientes HTTP/gRPC do SDK) são criados uma só vez e
+    partilhados por todas as threads. O AIService não guarda estado por pedido.
+    """
+    global _ai_service
+    if _ai_service is None:
+        with _ai_service_lock:
+            if _ai_service is None:
+                _ai_service = AIService()
+    return _ai_service
+
+
+def reset_ai_service():
+    """Descarta a instância partilhada (ex.: após mudar GEMINI_API_KEY, em testes)"""
+    global _ai_service
+    with _ai_service_lock:
+        _ai_service = None
@@ -0,0 +1,176 @@
+import os
+import tempfile
+import numpy as np
+from .vector_index import ExactVectorIndex
+
+
+class IVFVectorIndex(ExactVectorIndex):
+    """
+    Índice aproximado IVF (Inverted File) em NumPy puro.
+    Os vetores normalizados são agrupados por k-means esférico em `nlist` listas;
+    cada pesquisa só compara a query com as `nprobe` listas mais próximas.
+    """
+
+    def __init__(self, chunk_ids, article_ids, author_ids, matrix,
+                 centroids, assignments, nprobe=8, normalized=False):
+        super().__init__(chunk_ids, article_ids, author_ids, matrix, normalized=normalized)
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        assignments = np.asarray(assignments, dtype=np.int64)
+        self.nprobe = nprobe
+
+        # Listas invertidas em formato compacto: posições ordenadas por cluster + offsets
+        self.order = np.argsort(assignments, kind='stable')
+        counts = np.bincount(assignments, minlength=len(self.centroids))
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    @property
+    def nlist(self):
+        return len(self.centroids)
+
+    @staticmethod
+    def default_nlist(n):
+        return int(max(1, min(n, round(4 * np.sqrt(n)))))
+
+    @classmethod
+    def build(cls, exact, nlist=None, nprobe=8, n_iter=20, max_train_points=None, seed=0):
+        """Treina os centróides sobre os vetores de um índice exacto"""
+        n = len(exact)
+        nlist = min(nlist or cls.default_nlist(n), max(n, 1))
+        if n == 0:
+            dim = exact.matrix.shape[1] if exact.matrix.ndim == 2 else 0
+            return cls(exact.chunk_ids, exact.article_ids, exact.author_ids, exact.matrix,
+                       np.zeros((0, dim), dtype=np.float32), np.zeros(0, dtype=np.int64), nprobe,
+                       normalized=True)
+
+        centroids = spherical_kmeans(
+            exact.matrix, nlist, n_iter=n_iter,
+            max_train_points=max_train_points or nlist * 64, seed=seed
+        )
+        assignments = assign_to_centroids(exact.matrix, centroids)
+        # A matriz do índice exacto já está normalizada (e pode ser o mmap do snapshot): sem cópia
+        return cls(exact.chunk_ids, exact.article_ids, exact.author_ids, exact.matrix,
+                   centroids, assignments, nprobe, normalized=True)
+
+    def search(self, query_vec, top_k=5, author_id=None, nprobe=None):
+        if len(self) == 0 or top_k <= 0:
+            return []
+
+        query = np.asarray(query_vec, dtype=np.float32)
+        if query.shape[0] != self.matrix.shape[1]:
+            return []
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return []
+        query = query / norm
+
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        centroid_scores = self.centroids @ query
+        if nprobe < self.nlist:
+            probes = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        else:
+            probes = np.arange(self.nlist)
+
+        candidates = np.concatenate([
+            self.order[self.offsets[c]:self.offsets[c + 1]] for c in probes
+        ])
+        if author_id:
+            candidates = candidates[self.author_ids[candidates] == int(author_id)]
+        if candidates.size == 0:
+            return []
+
+        scores = self.matrix[candidates] @ query
+        k = min(top_k, scores.shape[0])
+        if k < scores.shape[0]:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(scores.shape[0])
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [
+            (int(self.chunk_ids[candidates[t]]), int(self.article_ids[candidates[t]]), float(scores[t]))
+            for t in top
+        ]
+
+    def save(self, path, fingerprint=''):
+        """
+        Persiste o índice em disco (.npz), de forma atómica: escreve num
+        ficheiro temporário único na mesma pasta e substitui o destino com
+        os.replace, pelo que escritores concorrentes nunca se misturam.
+        """
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        assignments = np.empty(len(self), dtype=np.int64)
+        for cluster in range(self.nlist):
+            assignments[self.order[self.offsets[cluster]:self.offsets[cluster + 1]]] = cluster
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(
+                    f,
+                    chunk_ids=self.chunk_ids,
+                    article_ids=self.article_ids,
+                    author_ids=self.author_ids,
+                    matrix=self.matrix,
+                    centroids=self.centroids,
+                    assignments=assignments,
+                    fingerprint=np.array(fingerprint),
+                )
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    @classmethod
+    def load(cls, path, nprobe=8):
+        """Carrega um índice persistido; devolve (índice, fingerprint do corpus)"""
+        with np.load(path) as data:
+            index = cls(
+                data['chunk_ids'], data['article_ids'], data['author_ids'], data['matrix'],
+                data['centroids'], data['assignments'], nprobe, normalized=True
+            )
+            fingerprint = str(data['fingerprint'])
+        return index, fingerprint
+
+
+def assign_to_centroids(matrix, centroids, batch_size=65536):
+    """Atribui cada vetor (normalizado) ao centróide com maior produto interno"""
+    assignments = np.empty(matrix.shape[0], dtype=np.int64)
+    for start in range(0, matrix.shape[0], batch_size):
+        block = matrix[start:start + batch_size]
+        assignments[start:start + batch_size] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+
+def spherical_kmeans(matrix, k, n_iter=20, max_train_points=None, seed=0):
+    """K-means sobre a esfera unitária (similaridade de cosseno)"""
+    rng = np.random.default_rng(seed)
+    n = matrix.shape[0]
+    if max_train_points and n > max_train_points:
+        train = matrix[rng.choice(n, size=max_train_points, replace=False)]
+    else:
+        train = matrix
+
+    centroids = train[rng.choice(train.shape[0], size=k, replace=False)].copy()
+    for _ in range(n_iter):
+        labels = assign_to_centroids(train, centroids)
+        order = np.argsort(labels, kind='stable')
+        counts = np.bincount(labels, minlength=k)
+        present = np.flatnonzero(counts)
+        sums = np.add.reduceat(train[order], np.concatenate([[0], np.cumsum(counts)[:-1]])[present], axis=0)
+
+        new_centroids = centroids.copy()
+        new_centroids[present] = sums
+        # Clusters vazios são reinicializados com pontos aleatórios
+        empty = np.flatnonzero(counts == 0)
+        if empty.size:
+            new_centroids[empty] = train[rng.choice(train.shape[0], size=empty.size)]
+        new_centroids = ExactVectorIndex.normalize(new_centroids)
+
+        if np.allclose(new_centroids, centroids, atol=1e-6):
+            centroids = new_centroids
+            break
+        centroids = new_centroids
+    return centroids.astype(np.float32)
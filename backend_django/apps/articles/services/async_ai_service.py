@@ -0,0 +1,224 @@
+import asyncio
+import json
+import os
+import weakref
+from contextlib import asynccontextmanager
+import aiohttp
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from .ai_service import AIService, get_ai_service
+from .embedding_cache import get_query_embedding_cache
+
+# Uma sessão HTTP (com pool de ligações) por event loop
+_sessions = weakref.WeakKeyDictionary()
+
+
+def get_async_session():
+    """
+    Sessão aiohttp partilhada pelo event loop atual. Reutilizar as ligações
+    (keep-alive) é o que permite centenas de pedidos em voo por processo.
+    """
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        session = aiohttp.ClientSession(
+            base_url=settings.GEMINI_API_BASE_URL.rstrip('/') + '/',
+            timeout=aiohttp.ClientTimeout(total=settings.AI_ASYNC_TIMEOUT),
+            connector=aiohttp.TCPConnector(limit=settings.AI_ASYNC_MAX_CONNECTIONS),
+        )
+        _sessions[loop] = session
+    return session
+
+
+async def close_async_session():
+    """Fecha a sessão do event loop atual (scripts e testes com asyncio.run)"""
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None:
+        await session.close()
+
+
+class AsyncAIService:
+    """
+    Cliente assíncrono do Gemini (API REST v1beta, via aiohttp) para as views async.
+    Usa os mesmos prompts, modelos e respostas de recurso do AIService, mas
+    nunca bloqueia o event loop: enquanto um pedido espera pela rede, o mesmo
+    worker atende outros.
+    """
+
+    def __init__(self):
+        self.api_key = getattr(settings, 'GEMINI_API_KEY', None) or os.getenv('GEMINI_API_KEY')
+        self.model = AIService.GENERATION_MODEL
+        self.embed_model = AIService.EMBED_MODEL
+        # Os circuit breakers e as quotas são os do cliente síncrono do processo
+        self.ai = get_ai_service()
+
+    @classmethod
+    def is_upstream_failure(cls, error):
+        return AIService.is_upstream_failure(error) or isinstance(error, aiohttp.ClientConnectionError)
+
+    @asynccontextmanager
+    async def gemini_call(self, quota):
+        """AIService.gemini_call sem bloquear o event loop (breaker e Redis consultados numa thread)"""
+        breaker = self.ai.circuit_breakers[quota]
+        limiter = self.ai.rate_limiters[quota]
+        await sync_to_async(breaker.before_call, thread_sensitive=False)()
+        healthy = None  # None: o pedido não chegou ao Gemini
+        try:
+            await limiter.acquire_async(timeout=settings.AI_RATE_LIMIT_WAIT)
+            try:
+                yield
+            except Exception as e:
+                healthy = not self.is_upstream_failure(e)
+                if AIService.is_quota_error(e):
+                    await sync_to_async(limiter.drain, thread_sensitive=False)()
+                raise
+            healthy = True
+        finally:
+            if healthy is None:
+                breaker.release()
+            elif healthy:
+                breaker.record_success()
+            else:
+                await sync_to_async(breaker.record_failure, thread_sensitive=False)()
+
+    def _url(self, model, method):
+        model = model if model.startswith('models/') else f"models/{model}"
+        return f"{model}:{method}"
+
+    async def generate_content_async(self, prompt, response_mime_type=None):
+        """Gera texto (generateContent) e devolve a concatenação das partes"""
+        body = {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+        if response_mime_type:
+            body["generationConfig"] = {"responseMimeType": response_mime_type}
+        async with self.gemini_call('generate'), get_async_session().post(
+            self._url(self.model, 'generateContent'), params={'key': self.api_key}, json=body
+        ) as response:
+            response.raise_for_status()
+            return self._response_text(await response.json())
+
+    async def stream_content_async(self, prompt):
+        """Gera texto em streaming (streamGenerateContent?alt=sse), fragmento a fragmento"""
+        body = {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+        async with self.gemini_call('generate'), get_async_session().post(
+            self._url(self.model, 'streamGenerateContent'),
+            params={'key': self.api_key, 'alt': 'sse'}, json=body
+        ) as response:
+            response.raise_for_status()
+            async for line in response.content:
+                line = line.decode('utf-8').strip()
+                if line.startswith('data:'):
+                    text = self._response_text(json.loads(line[len('data:'):]))
+                    if text:
+                        yield text
+
+    async def embed_content_async(self, text, task_type='RETRIEVAL_QUERY'):
+        async with self.gemini_call('embed'), get_async_session().post(
+            self._url(self.embed_model, 'embedContent'),
+            params={'key': self.api_key},
+            json={"content": {"parts": [{"text": text}]}, "taskType": task_type},
+        ) as response:
+            response.raise_for_status()
+            return (await response.json())['embedding']['values']
+
+    async def generate_text(self, prompt, response_mime_type=None):
+        """
+        Como AIService.generate_text: pedidos idênticos em simultâneo partilham
+        uma chamada ao Gemini (SingleFlight.do_async: no event loop e, via
+        Redis, com os outros processos e as views síncronas). Nem o líder nem
+        quem espera ocupam uma thread.
+        """
+        return await self.ai.single_flight.do_async(
+            AIService.generation_key(prompt, response_mime_type),
+            lambda: self.generate_content_async(prompt, response_mime_type),
+        )
+
+    @staticmethod
+    def _response_text(payload):
+        candidates = payload.get('candidates') or []
+        if not candidates:
+            return ''
+        parts = candidates[0].get('content', {}).get('parts', [])
+        return ''.join(part.get('text', '') for part in parts)
+
+    async def generate_insight(self, content):
+        """Fornece um insight curto e fascinante sobre o artigo"""
+        if not self.api_key: return AIService.INSIGHT_DISABLED_MESSAGE
+        try:
+            return await self.generate_text(AIService._insight_prompt(content))
+        except Exception as e:
+            print(f"[AsyncAIService] Insight Error: {e}")
+            return AIService.INSIGHT_ERROR_MESSAGE
+
+    async def generate_summary(self, content):
+        """Cria um sumário executivo de alto nível"""
+        if not self.api_key: return AIService.SUMMARY_DISABLED_MESSAGE
+        try:
+            return await self.generate_text(AIService._summary_prompt(content))
+        except Exception as e:
+            print(f"[AsyncAIService] Summary Error: {e}")
+            return AIService.SUMMARY_ERROR_MESSAGE
+
+    async def generate_glossary(self, content):
+        """Identifica e define termos técnicos complexos em formato JSON"""
+        if not self.api_key: return []
+        try:
+            text = await self.generate_text(
+                AIService._glossary_prompt(content), response_mime_type='application/json'
+            )
+            return json.loads(text)
+        except Exception as e:
+            print(f"[AsyncAIService] Glossary Error: {e}")
+            return []
+
+    async def get_query_embedding(self, query):
+        """Embedding de pesquisa, com a mesma cache (LRU local + partilhada) da versão síncrona"""
+        if not self.api_key: return [0.0] * 768
+
+        query_cache = get_query_embedding_cache()
+        key = query_cache.make_key(query, self.embed_model)
+        # A camada partilhada pode ir ao Redis: fora do event loop
+        cached = await sync_to_async(query_cache.get, thread_sensitive=False)(key)
+        if cached is not None:
+            return cached.tolist()
+
+        try:
+            # Mesma chave single-flight da versão síncrona
+            embedding = await self.ai.single_flight.do_async(f"embed:{key}", lambda: self.embed_content_async(query))
+        except Exception as e:
+            print(f"[AsyncAIService] Query Embedding Error: {e}")
+            return [0.0] * 768
+        await sync_to_async(query_cache.set, thread_sensitive=False)(key, embedding)
+        return embedding
+
+    async def rag_chat(self, question, context_chunks):
+        """Fluxo RAG (Contexto + Pergunta -> Resposta com Citações), sem retentativas bloqueantes"""
+        if not self.api_key:
+            return {"text": AIService.RAG_DISABLED_MESSAGE, "citations": [], "confidence": 0}
+        try:
+            text = await self.generate_text(AIService._build_rag_prompt(question, context_chunks))
+        except Exception as e:
+            print(f"[AsyncAIService] RAG Chat Error: {e}")
+            return {"text": AIService.rag_error_message(e), "citations": [], "confidence": 0}
+        return {"text": text, "citations": AIService._rag_citations(context_chunks), "confidence": 0.95}
+
+    async def rag_chat_stream(self, question, context_chunks):
+        """Versão assíncrona de AIService.rag_chat_stream (mesmos eventos)"""
+        if not self.api_key:
+            yield 'error', {"text": AIService.RAG_DISABLED_MESSAGE}
+            return
+
+        streamed_text = False
+        try:
+            async for text in self.stream_content_async(AIService._build_rag_prompt(question, context_chunks)):
+                streamed_text = True
+                yield 'token', {"text": text}
+        except Exception as e:
+            print(f"[AsyncAIService] RAG Stream Error: {e}")
+            yield 'error', {"text": AIService.rag_error_message(e)}
+            if not streamed_text:
+                return
+
+        yield 'citations', {
+            "citations": AIService._rag_citations(context_chunks),
+            "confidence": 0.95 if streamed_text else 0
+        }
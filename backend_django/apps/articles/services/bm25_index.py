@@ -0,0 +1,140 @@
+import math
+from collections import Counter, defaultdict
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Count
+from ..models import Article, ArticleChunk, SearchDocument, SearchPosting
+from .text_analysis import analyze
+
+# Parâmetros BM25 clássicos
+K1 = 1.2
+B = 0.75
+# O título pesa como se aparecesse 3 vezes no texto
+TITLE_WEIGHT = 3
+
+STATS_CACHE_KEY = 'search:bm25:stats:{kind}'
+STATS_CACHE_TTL = 300
+
+
+def article_terms(article):
+    return analyze(article.title) * TITLE_WEIGHT + analyze(article.excerpt) + analyze(article.content)
+
+
+def _write_document(document, terms):
+    counts = Counter(terms)
+    document.length = len(terms)
+    document.save()
+    document.postings.all().delete()
+    SearchPosting.objects.bulk_create(
+        [SearchPosting(term=term, document=document, tf=tf) for term, tf in counts.items()],
+        batch_size=1000
+    )
+
+
+def _invalidate_stats():
+    cache.delete_many([STATS_CACHE_KEY.format(kind=kind) for kind, _ in SearchDocument.KIND_CHOICES])
+
+
+def index_article(article):
+    """
+    Atualiza o documento BM25 do artigo (incremental: só as suas entradas
+    são reescritas). Artigos não publicados são removidos do índice.
+    """
+    with transaction.atomic():
+        if article.status != 'published':
+            SearchDocument.objects.filter(kind='article', article=article).delete()
+        else:
+            document, _ = SearchDocument.objects.get_or_create(kind='article', article=article)
+            _write_document(document, article_terms(article))
+    _invalidate_stats()
+
+
+def index_chunks(chunks):
+    """Indexa chunks novos (criados com bulk_create, que não dispara post_save)"""
+    with transaction.atomic():
+        for chunk in chunks:
+            document, _ = SearchDocument.objects.get_or_create(
+                kind='chunk', chunk=chunk, defaults={'article_id': chunk.article_id}
+            )
+            _write_document(document, analyze(chunk.content))
+    _invalidate_stats()
+
+
+def rebuild_index():
+    """Reconstrói o índice inteiro (artigos publicados + todos os chunks, como o índice vetorial)"""
+    with transaction.atomic():
+        SearchDocument.objects.all().delete()
+        published = Article.objects.filter(status='published')
+        for article in published.iterator(chunk_size=200):
+            document = SearchDocument.objects.create(kind='article', article=article)
+            _write_document(document, article_terms(article))
+        chunks = ArticleChunk.objects.only('id', 'article_id', 'content')
+        for chunk in chunks.iterator(chunk_size=500):
+            document = SearchDocument.objects.create(kind='chunk', chunk=chunk, article_id=chunk.article_id)
+            _write_document(document, analyze(chunk.content))
+    _invalidate_stats()
+    return SearchDocument.objects.count()
+
+
+def corpus_stats(kind):
+    """(nº de documentos, comprimento médio), em cache durante alguns minutos"""
+    key = STATS_CACHE_KEY.format(kind=kind)
+    stats = cache.get(key)
+    if stats is None:
+        aggregate = SearchDocument.objects.filter(kind=kind).aggregate(n=Count('id'), avgdl=Avg('length'))
+        stats = (aggregate['n'], aggregate['avgdl'] or 0.0)
+        cache.set(key, stats, STATS_CACHE_TTL)
+    return stats
+
+
+def bm25_search(query, kind='article', top_k=10, author_id=None):
+    """
+    Pesquisa BM25 sobre o índice invertido: só lê as entradas dos termos da
+    pesquisa (índice em `term`), sem percorrer o texto dos artigos.
+    Devolve [(article_id, chunk_id, score)] por ordem decrescente de score.
+    """
+    terms = set(analyze(query))
+    if not terms:
+        return []
+    n_docs, avgdl = corpus_stats(kind)
+    if not n_docs:
+        return []
+
+    postings = SearchPosting.objects.filter(term__in=terms, document__kind=kind)
+    if author_id:
+        postings = postings.filter(document__article__author_id=author_id)
+    rows = list(postings.values_list(
+        'term', 'tf', 'document_id', 'document__article_id', 'document__chunk_id', 'document__length'
+    ))
+
+    if author_id:
+        # O idf vem do corpus inteiro, não apenas dos documentos do autor
+        document_frequency = dict(
+            SearchPosting.objects.filter(term__in=terms, document__kind=kind)
+            .values('term').annotate(df=Count('id')).values_list('term', 'df')
+        )
+    else:
+        document_frequency = Counter(term for term, *_ in rows)
+    scores = defaultdict(float)
+    owners = {}
+    for term, tf, document_id, article_id, chunk_id, length in rows:
+        df = document_frequency[term]
+        idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+        norm = K1 * (1 - B + B * length / avgdl) if avgdl else K1
+        scores[document_id] += idf * tf * (K1 + 1) / (tf + norm)
+        owners[document_id] = (article_id, chunk_id)
+
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:top_k]
+    return [(owners[document_id][0], owners[document_id][1], score) for document_id, score in ranked]
+
+
+def reciprocal_rank_fusion(rankings, k=60, top_k=10):
+    """
+    Funde várias listas ordenadas de ids com RRF: score = soma de 1 / (k + posição).
+    Não depende da escala dos scores (BM25 e cosseno não são comparáveis).
+    """
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for position, item in enumerate(ranking, start=1):
+            scores[item] += 1.0 / (k + position)
+    return sorted(scores.items(), key=lambda entry: -entry[1])[:top_k]
@@ -0,0 +1,162 @@
+import re
+from collections import namedtuple
+from django.conf import settings
+
+TextChunk = namedtuple('TextChunk', ['content', 'token_count'])
+
+HEADING_RE = re.compile(r'^#{1,6}\s+\S')
+FENCE_RE = re.compile(r'^(```|~~~)')
+# Fim de frase: pontuação final seguida de espaço e de uma maiúscula, número ou aspas
+SENTENCE_END_RE = re.compile(r'(?<=[.!?…])\s+(?=["«(\[]?[A-ZÀ-ÖØ-Þ0-9])')
+TOKEN_RE = re.compile(r'\w+|[^\w\s]', re.UNICODE)
+
+
+def count_tokens(text):
+    """
+    Estimativa do nº de tokens do modelo de embedding (tokenizador SentencePiece).
+    Cada sinal de pontuação conta como um token; palavras longas são partidas
+    em sub-palavras de ~6 caracteres, o que aproxima bem texto em português.
+    """
+    return sum(1 + (len(piece) - 1) // 6 for piece in TOKEN_RE.findall(text or ''))
+
+
+class FixedWindowChunker:
+    """Chunker original: janelas de 1000 caracteres com passo de 800 (20% repetido)"""
+
+    def __init__(self, size=1000, stride=800):
+        self.size = size
+        self.stride = stride
+
+    def split(self, text):
+        text = text or ''
+        return [
+            TextChunk(window, count_tokens(window))
+            for window in (text[i:i + self.size] for i in range(0, len(text), self.stride))
+        ]
+
+
+class MarkdownChunker:
+    """
+    Chunker estrutural para Markdown:
+    1. Divide o texto em secções (cabeçalhos #) e blocos (parágrafos, listas, código)
+    2. Blocos maiores que o orçamento são divididos por frases (e, em último caso, por palavras)
+    3. Agrupa as unidades até `max_tokens`, sem misturar secções
+    4. Cada chunk seguinte da mesma secção repete as últimas frases do anterior,
+       até `overlap_tokens`, para manter contexto sem duplicar janelas inteiras
+    """
+
+    def __init__(self, max_tokens=300, overlap_tokens=40):
+        if overlap_tokens >= max_tokens:
+            raise ValueError("overlap_tokens tem de ser menor que max_tokens")
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+
+    def split(self, text):
+        chunks = []
+        for section in self._sections(text or ''):
+            chunks.extend(self._pack(self._units(section)))
+        return chunks
+
+    def _sections(self, text):
+        """Agrupa os blocos de texto por secção; o cabeçalho abre a secção"""
+        sections, current = [], []
+        for block in self._blocks(text):
+            if HEADING_RE.match(block) and current:
+                sections.append(current)
+                current = []
+            current.append(block)
+        if current:
+            sections.append(current)
+        return sections
+
+    @staticmethod
+    def _blocks(text):
+        """Parágrafos separados por linhas em branco; blocos de código ficam inteiros"""
+        blocks, current, in_fence = [], [], False
+        for line in text.replace('\r\n', '\n').split('\n'):
+            if FENCE_RE.match(line.strip()):
+                in_fence = not in_fence
+            if not in_fence and (not line.strip() or HEADING_RE.match(line)):
+                if current:
+                    blocks.append('\n'.join(current).strip())
+                    current = []
+                if line.strip():
+                    blocks.append(line.strip())
+                continue
+            current.append(line)
+        if current:
+            blocks.append('\n'.join(current).strip())
+        return [block for block in blocks if block]
+
+    def _units(self, blocks):
+        """Unidades indivisíveis (blocos ou frases) que cabem no orçamento, com separador"""
+        units = []
+        for block in blocks:
+            if count_tokens(block) <= self.max_tokens:
+                units.append(('\n\n', block))
+                continue
+            sentences = SENTENCE_END_RE.split(block)
+            for position, sentence in enumerate(sentences):
+                separator = '\n\n' if position == 0 else ' '
+                for piece in self._split_long(sentence):
+                    units.append((separator, piece))
+                    separator = ' '
+        return units
+
+    def _split_long(self, sentence):
+        """Último recurso para frases enormes (tabelas, listas sem pontuação)"""
+        if count_tokens(sentence) <= self.max_tokens:
+            return [sentence]
+        pieces, current, current_tokens = [], [], 0
+        for word in sentence.split():
+            tokens = count_tokens(word)
+            if current and current_tokens + tokens > self.max_tokens:
+                pieces.append(' '.join(current))
+                current, current_tokens = [], 0
+            current.append(word)
+            current_tokens += tokens
+        if current:
+            pieces.append(' '.join(current))
+        return pieces
+
+    def _pack(self, units):
+        chunks, current, current_tokens = [], [], 0
+        for separator, text in units:
+            tokens = count_tokens(text)
+            if current and current_tokens + tokens > self.max_tokens:
+                chunks.append(self._join(current))
+                current = self._overlap(current, budget=self.max_tokens - tokens)
+                current_tokens = sum(count_tokens(unit_text) for _, unit_text in current)
+            current.append((separator, text))
+            current_tokens += tokens
+        if current:
+            chunks.append(self._join(current))
+        return [TextChunk(content, count_tokens(content)) for content in chunks]
+
+    def _overlap(self, units, budget):
+        """Últimas unidades do chunk anterior que cabem na sobreposição (só frases)"""
+        carried, carried_tokens = [], 0
+        for separator, text in reversed(units):
+            tokens = count_tokens(text)
+            if HEADING_RE.match(text) or carried_tokens + tokens > min(self.overlap_tokens, budget):
+                break
+            carried.insert(0, (separator, text))
+            carried_tokens += tokens
+        return carried
+
+    @staticmethod
+    def _join(units):
+        return ''.join(
+            (separator if position else '') + text
+            for position, (separator, text) in enumerate(units)
+        )
+
+
+def get_chunker(name=None):
+    """Chunker configurado em settings.CHUNKER ('markdown' ou 'fixed')"""
+    name = name or settings.CHUNKER
+    if name == 'fixed':
+        return FixedWindowChunker()
+    if name == 'markdown':
+        return MarkdownChunker(settings.CHUNK_MAX_TOKENS, settings.CHUNK_OVERLAP_TOKENS)
+    raise ValueError(f"Chunker desconhecido: {name}")
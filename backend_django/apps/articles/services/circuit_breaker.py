@@ -0,0 +1,117 @@
+import threading
+import time
+
+
+class CircuitOpenError(RuntimeError):
+    """Circuito aberto: o pedido falha de imediato, sem chamar o serviço"""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker para um serviço externo (o Gemini):
+    - closed: os pedidos passam; `failure_threshold` falhas seguidas abrem o circuito.
+    - open: os pedidos falham de imediato (CircuitOpenError) durante `reset_timeout` s.
+    - half_open: passa um único pedido de teste; o sucesso fecha o circuito,
+      uma falha volta a abri-lo.
+    Com Redis, a abertura é partilhada (`<prefix>:<name>:open`, com TTL
+    `reset_timeout`): quando um processo abre o circuito, todos deixam de
+    chamar o serviço.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0, redis=None,
+                 clock=time.monotonic, prefix='circuit'):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.redis = redis
+        self._clock = clock
+        self._shared_key = f"{prefix}:{name}:open"
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def shared(self):
+        return self.redis is not None and getattr(self.redis, 'enabled', True)
+
+    def _refresh(self):
+        """Passa de open a half_open ao fim de reset_timeout (com o lock adquirido)"""
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._refresh()
+
+    def _open_elsewhere(self):
+        return self.shared and self.redis.get(self._shared_key) is not None
+
+    def before_call(self):
+        """Autoriza um pedido ou levanta CircuitOpenError"""
+        open_elsewhere = self._open_elsewhere()
+        with self._lock:
+            state = self._refresh()
+            allowed = (
+                (state == self.CLOSED and not open_elsewhere)
+                or (state == self.HALF_OPEN and not self._probe_in_flight)
+            )
+            if allowed:
+                if state == self.HALF_OPEN:
+                    self._probe_in_flight = True
+                return
+            self.rejected += 1
+        raise CircuitOpenError(f"Serviço {self.name} indisponível (circuito aberto)")
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                print(f"[CircuitBreaker] {self.name}: circuito fechado")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            state = self._refresh()
+            self._failures += 1
+            self._probe_in_flight = False
+            if state == self.OPEN or (state == self.CLOSED and self._failures < self.failure_threshold):
+                return
+            self._state = self.OPEN
+            self._opened_at = self._clock()
+            self.opened += 1
+            failures = self._failures
+        print(f"[CircuitBreaker] {self.name}: circuito aberto após {failures} falhas seguidas")
+        if self.shared:
+            self.redis.set(self._shared_key, '1', px=int(self.reset_timeout * 1000))
+
+    def release(self):
+        """O pedido autorizado não chegou ao serviço: liberta a vaga de teste (half_open)"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def stats(self):
+        open_elsewhere = self._open_elsewhere()
+        with self._lock:
+            state = self._refresh()
+            retry_in = 0.0
+            if state == self.OPEN:
+                retry_in = self.reset_timeout - (self._clock() - self._opened_at)
+            return {
+                'state': self.OPEN if state == self.CLOSED and open_elsewhere else state,
+                'consecutive_failures': self._failures,
+                'opened': self.opened,
+                'rejected': self.rejected,
+                'retry_in_seconds': round(max(0.0, retry_in), 1),
+            }
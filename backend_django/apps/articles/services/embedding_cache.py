@@ -0,0 +1,113 @@
+import hashlib
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+
+class QueryEmbeddingCache:
+    """
+    Cache de embeddings de pesquisa em dois níveis:
+    1. LRU local ao processo (sem I/O), com TTL por entrada
+    2. Cache partilhada do Django (Redis em produção), comum a todos os workers
+    Os vetores são guardados como float32 binário para ocupar pouco espaço.
+    """
+
+    def __init__(self, max_entries=2048, ttl=3600, shared_ttl=86400, prefix='qemb'):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.shared_ttl = shared_ttl
+        self.prefix = prefix
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(text):
+        """Normaliza o texto da pesquisa (Unicode NFC, minúsculas, espaços)"""
+        text = unicodedata.normalize('NFC', text or '')
+        return ' '.join(text.lower().split())
+
+    def make_key(self, text, model):
+        digest = hashlib.sha256(f"{model}\x00{self.normalize(text)}".encode()).hexdigest()
+        return f"{self.prefix}:{digest}"
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, vector = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.local_hits += 1
+                    return vector
+                del self._entries[key]
+
+        raw = cache.get(key) if self.shared_ttl else None
+        if raw is not None:
+            vector = np.frombuffer(raw, dtype='<f4')
+            self._store_local(key, vector)
+            with self._lock:
+                self.shared_hits += 1
+            return vector
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, vector):
+        vector = np.asarray(vector, dtype='<f4')
+        vector.flags.writeable = False
+        self._store_local(key, vector)
+        if self.shared_ttl:
+            cache.set(key, vector.tobytes(), self.shared_ttl)
+
+    def _store_local(self, key, vector):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.local_hits = self.shared_hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.local_hits + self.shared_hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'local_hits': self.local_hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'hit_rate': (self.local_hits + self.shared_hits) / lookups if lookups else 0.0,
+            }
+
+
+_query_cache = None
+_query_cache_lock = threading.Lock()
+
+
+def get_query_embedding_cache():
+    """Instância única por processo, configurada em settings"""
+    global _query_cache
+    if _query_cache is None:
+        with _query_cache_lock:
+            if _query_cache is None:
+                _query_cache = QueryEmbeddingCache(
+                    max_entries=settings.AI_QUERY_EMBEDDING_CACHE_SIZE,
+                    ttl=settings.AI_QUERY_EMBEDDING_CACHE_TTL,
+                    shared_ttl=settings.AI_QUERY_EMBEDDING_SHARED_TTL,
+                )
+    return _query_cache
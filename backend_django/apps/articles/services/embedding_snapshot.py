@@ -0,0 +1,121 @@
+import os
+import shutil
+import time
+import numpy as np
+from django.conf import settings
+
+CURRENT_FILE = 'CURRENT'
+ARRAYS = ('embeddings', 'chunk_ids', 'article_ids', 'author_ids')
+
+
+def get_snapshot_dir():
+    return str(settings.EMBEDDING_SNAPSHOT_DIR)
+
+
+# Última leitura do ponteiro CURRENT neste processo: {pasta: (instante, versão)}
+_current_versions = {}
+
+
+def read_current_version(snapshot_dir=None):
+    """Lê o ponteiro CURRENT; devolve None se ainda não existir snapshot"""
+    path = os.path.join(snapshot_dir or get_snapshot_dir(), CURRENT_FILE)
+    try:
+        with open(path) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def current_version(snapshot_dir=None):
+    """
+    read_current_version com no máximo uma leitura do disco a cada
+    EMBEDDING_SNAPSHOT_CHECK_INTERVAL segundos por processo (consultado em
+    todos os pedidos de pesquisa). Um snapshot novo é visto com esse atraso,
+    exceto no processo que o escreveu.
+    """
+    snapshot_dir = snapshot_dir or get_snapshot_dir()
+    now = time.monotonic()
+    checked = _current_versions.get(snapshot_dir)
+    if checked is not None and now - checked[0] < settings.EMBEDDING_SNAPSHOT_CHECK_INTERVAL:
+        return checked[1]
+    version = read_current_version(snapshot_dir)
+    _current_versions[snapshot_dir] = (now, version)
+    return version
+
+
+def write_snapshot(index=None, snapshot_dir=None, keep=2):
+    """
+    Escreve um snapshot versionado dos embeddings (matriz float32 já normalizada
+    + ids de chunk, artigo e autor) em ficheiros .npy.
+
+    A escrita é atómica: os ficheiros são gerados numa pasta temporária,
+    renomeada para v<versão>, e só depois o ponteiro CURRENT é substituído
+    com os.replace. Os leitores nunca veem um snapshot incompleto.
+    """
+    from .vector_index import ExactVectorIndex
+
+    snapshot_dir = snapshot_dir or get_snapshot_dir()
+    os.makedirs(snapshot_dir, exist_ok=True)
+    index = index if index is not None else ExactVectorIndex.from_database()
+
+    version = f"{time.time_ns()}-{os.getpid()}"
+    tmp_dir = os.path.join(snapshot_dir, f".tmp-{version}")
+    os.makedirs(tmp_dir)
+    arrays = {
+        'embeddings': np.ascontiguousarray(index.matrix, dtype=np.float32),
+        'chunk_ids': index.chunk_ids,
+        'article_ids': index.article_ids,
+        'author_ids': index.author_ids,
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), array)
+    os.rename(tmp_dir, os.path.join(snapshot_dir, f"v{version}"))
+
+    pointer_tmp = os.path.join(snapshot_dir, f"{CURRENT_FILE}.{version}.tmp")
+    with open(pointer_tmp, 'w') as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer_tmp, os.path.join(snapshot_dir, CURRENT_FILE))
+    _current_versions[snapshot_dir] = (time.monotonic(), version)
+
+    _prune_old_versions(snapshot_dir, keep)
+    return version
+
+
+def load_snapshot(version=None, snapshot_dir=None):
+    """
+    Mapeia o snapshot em memória (só de leitura), de modo que todos os
+    processos gunicorn/celery partilham as mesmas páginas da cache do SO.
+    Devolve (versão, dict de arrays) ou (None, None) se não houver snapshot.
+    """
+    snapshot_dir = snapshot_dir or get_snapshot_dir()
+    version = version or read_current_version(snapshot_dir)
+    if not version:
+        return None, None
+
+    path = os.path.join(snapshot_dir, f"v{version}")
+    try:
+        arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')
+            for name in ARRAYS
+        }
+    except (FileNotFoundError, ValueError) as e:
+        print(f"[EmbeddingSnapshot] Snapshot {version} indisponível: {e}")
+        return None, None
+    return version, arrays
+
+
+def _prune_old_versions(snapshot_dir, keep):
+    """
+    Remove versões antigas. Processos que ainda tenham a versão anterior
+    mapeada continuam a funcionar: em POSIX o ficheiro só desaparece quando
+    o último mmap é fechado.
+    """
+    versions = sorted(
+        (entry for entry in os.listdir(snapshot_dir) if entry.startswith('v')),
+        key=lambda entry: int(entry[1:].split('-')[0]),
+        reverse=True
+    )
+    for stale in versions[keep:]:
+        shutil.rmtree(os.path.join(snapshot_dir, stale), ignore_errors=True)
@@ -0,0 +1,177 @@
+import time
+import uuid
+from datetime import timedelta
+import numpy as np
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from ..models import Article, ArticleChunk, Category, UserEvent
+
+
+def recall_at_k(recommended, relevant, k):
+    """Fração dos itens relevantes presentes nos primeiros k recomendados"""
+    relevant = set(relevant)
+    if not relevant:
+        return 0.0
+    return len(relevant & set(list(recommended)[:k])) / len(relevant)
+
+
+def ndcg_at_k(recommended, relevant, k):
+    """NDCG@k com relevância binária"""
+    relevant = set(relevant)
+    if not relevant:
+        return 0.0
+    dcg = sum(1.0 / np.log2(rank + 2) for rank, item in enumerate(list(recommended)[:k]) if item in relevant)
+    ideal = sum(1.0 / np.log2(rank + 2) for rank in range(min(k, len(relevant))))
+    return dcg / ideal
+
+
+def measure(fn, repeat=20, warmup=1):
+    """
+    Executa `fn(i)` `repeat` vezes (após `warmup` execuções não medidas) e
+    devolve a latência (ms) e o nº de consultas SQL por chamada.
+    """
+    for i in range(warmup):
+        fn(i)
+    latencies, queries = [], []
+    for i in range(repeat):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            fn(i)
+            latencies.append((time.perf_counter() - started) * 1000)
+        queries.append(len(captured.captured_queries))
+    latencies = np.array(latencies)
+    return {
+        'calls': repeat,
+        'mean_ms': round(float(latencies.mean()), 3),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+        'p95_ms': round(float(np.percentile(latencies, 95)), 3),
+        'queries_per_call': max(queries),
+    }
+
+
+class SyntheticQueryEmbeddings:
+    """Substitui o AIService numa SearchService: embeddings de queries conhecidas, sem rede"""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def get_query_embedding(self, query):
+        return self.vectors[query]
+
+
+class SyntheticCorpus:
+    """
+    Corpus sintético reprodutível (mesma `seed`, mesmos dados) para avaliação offline:
+    - `topics` temas, cada um com um centróide aleatório e uma categoria; os
+      chunks de cada artigo são o centróide do seu tema mais ruído gaussiano;
+    - popularidade com cauda longa (Zipf) e datas de publicação no último ano;
+    - cada sessão prefere 1 ou 2 temas; as suas `holdout` interações mais
+      recentes ficam de fora (interações de teste), as restantes são UserEvents;
+    - `queries` pesquisas, cada uma próxima de um artigo concreto (o relevante).
+    """
+
+    EVENT_TYPES = ('view', 'view', 'like', 'read_finish')
+
+    def __init__(self, articles=200, chunks_per_article=4, dim=64, topics=8, sessions=50,
+                 events_per_session=10, holdout=2, queries=50, noise=0.5, seed=0):
+        self.size = articles
+        self.chunks_per_article = chunks_per_article
+        self.dim = dim
+        self.topics = topics
+        self.sessions = sessions
+        self.events_per_session = events_per_session
+        self.holdout = holdout
+        self.queries = queries
+        self.noise = noise
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.token = uuid.uuid4().hex[:8]
+
+    def params(self):
+        return {
+            'articles': self.size, 'chunks_per_article': self.chunks_per_article, 'dim': self.dim,
+            'topics': self.topics, 'sessions': self.sessions, 'events_per_session': self.events_per_session,
+            'holdout': self.holdout, 'queries': self.queries, 'noise': self.noise, 'seed': self.seed,
+        }
+
+    def create(self):
+        """Cria os dados (bulk_create, sem sinais de indexação/outbox); devolve self"""
+        rng = self.rng
+        now = timezone.now()
+        author = User.objects.create_user(username=f'bench-{self.token}')
+        categories = Category.objects.bulk_create([
+            Category(name=f'Bench {self.token} {t}', slug=f'bench-{self.token}-{t}') for t in range(self.topics)
+        ])
+
+        centroids = rng.normal(size=(self.topics, self.dim))
+        self.topic_of = rng.integers(self.topics, size=self.size)
+        views = np.minimum(rng.zipf(1.5, size=self.size), 100000)
+        ages = rng.uniform(0, 365, size=self.size)
+        articles = Article.objects.bulk_create([
+            Article(
+                title=f'Artigo sintético {i}', slug=f'bench-{self.token}-{i}',
+                excerpt='Resumo sintético.', content='Conteúdo sintético. ' * 50,
+                author=author, category=categories[self.topic_of[i]], status='published',
+                views=int(views[i]), published_at=now - timedelta(days=float(ages[i])),
+            )
+            for i in range(self.size)
+        ])
+        self.article_ids = np.array([article.id for article in articles])
+        self.slugs = [article.slug for article in articles]
+
+        vectors = (centroids[self.topic_of][:, None, :]
+                   + self.noise * rng.normal(size=(self.size, self.chunks_per_article, self.dim)))
+        ArticleChunk.objects.bulk_create([
+            ArticleChunk(
+                article_id=int(self.article_ids[i]), content=f'Chunk {j} do artigo {i}', position=j,
+                embedding=ArticleChunk.pack_embedding(vectors[i, j]),
+            )
+            for i in range(self.size) for j in range(self.chunks_per_article)
+        ], batch_size=1000)
+
+        self._create_queries(vectors)
+        self._create_sessions(now, views)
+        return self
+
+    def _create_queries(self, vectors):
+        """Cada query é o vetor médio de um artigo com ruído: esse artigo é o relevante"""
+        targets = self.rng.choice(self.size, size=min(self.queries, self.size), replace=False)
+        self.query_vectors, self.query_relevant = {}, {}
+        for q, target in enumerate(targets):
+            text = f'bench-{self.token}-query-{q}'
+            self.query_vectors[text] = (
+                vectors[target].mean(axis=0) + self.noise * self.rng.normal(size=self.dim)
+            ).tolist()
+            self.query_relevant[text] = {int(self.article_ids[target])}
+
+    def _create_sessions(self, now, views):
+        rng = self.rng
+        self.session_holdout = {}
+        events, dates = [], []
+        per_session = self.events_per_session + self.holdout
+        for s in range(self.sessions):
+            preferred = rng.choice(self.topics, size=min(self.topics, rng.integers(1, 3)), replace=False)
+            pool = np.flatnonzero(np.isin(self.topic_of, preferred))
+            if len(pool) < per_session:
+                continue
+            # Os leitores também preferem os artigos populares
+            weights = np.log1p(views[pool]) + 1.0
+            chosen = rng.choice(pool, size=per_session, replace=False, p=weights / weights.sum())
+            session_id = f'bench-{self.token}-{s}'
+            # Por ordem cronológica: as últimas `holdout` são as de teste
+            train, test = chosen[:self.events_per_session], chosen[self.events_per_session:]
+            for order, position in enumerate(train):
+                events.append(UserEvent(
+                    session_id=session_id, article_id=int(self.article_ids[position]),
+                    event_type=self.EVENT_TYPES[rng.integers(len(self.EVENT_TYPES))],
+                ))
+                dates.append(now - timedelta(hours=float(self.events_per_session - order)))
+            self.session_holdout[session_id] = {int(self.article_ids[position]) for position in test}
+
+        events = UserEvent.objects.bulk_create(events, batch_size=1000)
+        # created_at é auto_now_add: as datas simuladas só podem ser gravadas depois
+        for event, created_at in zip(events, dates):
+            event.created_at = created_at
+        UserEvent.objects.bulk_update(events, ['created_at'], batch_size=1000)
@@ -0,0 +1,124 @@
+import hashlib
+from django.db import transaction
+from ..models import ArticleChunk
+from .bm25_index import index_chunks
+from .chunking import get_chunker
+
+
+def chunk_hash(content, embed_model):
+    """
+    Hash do conteúdo do chunk. Inclui o modelo de embedding para que uma
+    mudança de modelo obrigue a gerar novamente todos os vetores.
+    """
+    return hashlib.sha256(f"{embed_model}\x00{content}".encode('utf-8')).hexdigest()
+
+
+class ChunkSyncPlan:
+    """
+    Diferença entre os chunks guardados de um artigo e o seu conteúdo atual.
+    Separa a leitura da BD, os pedidos de embedding e a escrita, para que
+    os pedidos possam correr noutras threads (comando index_corpus).
+    """
+
+    def __init__(self, article, total, kept, to_embed, stale_ids, changed=True):
+        self.article = article
+        self.total = total
+        self.kept = kept
+        self.to_embed = to_embed
+        self.stale_ids = stale_ids
+        self.changed = changed
+
+    @property
+    def texts(self):
+        """Textos que precisam de embedding"""
+        return [chunk.content for _, chunk, _ in self.to_embed]
+
+
+def plan_chunk_sync(article, embed_model):
+    """Compara os hashes dos chunks guardados com os do conteúdo atual"""
+    chunks = get_chunker().split(article.content)
+    hashes = [chunk_hash(chunk.content, embed_model) for chunk in chunks]
+
+    existing = list(
+        ArticleChunk.objects.filter(article=article)
+        .only('id', 'position', 'token_count', 'content_hash', 'embedding')
+        .order_by('position', 'id')
+    )
+    if [chunk.content_hash for chunk in existing] == hashes and all(chunk.embedding is not None for chunk in existing):
+        return ChunkSyncPlan(article, len(hashes), existing, [], [], changed=False)
+
+    # Chunks reutilizáveis (com embedding válido), agrupados por hash;
+    # um texto repetido dentro do artigo pode aparecer em vários chunks
+    reusable = {}
+    for chunk in existing:
+        if chunk.embedding is not None:
+            reusable.setdefault(chunk.content_hash, []).append(chunk)
+
+    kept, to_embed = [], []
+    for position, (text_chunk, digest) in enumerate(zip(chunks, hashes)):
+        candidates = reusable.get(digest)
+        if candidates:
+            chunk = candidates.pop(0)
+            chunk.position = position
+            chunk.token_count = text_chunk.token_count
+            kept.append(chunk)
+        else:
+            to_embed.append((position, text_chunk, digest))
+
+    kept_ids = {chunk.id for chunk in kept}
+    stale_ids = [chunk.id for chunk in existing if chunk.id not in kept_ids]
+    return ChunkSyncPlan(article, len(hashes), kept, to_embed, stale_ids)
+
+
+def apply_chunk_sync(plan, embeddings):
+    """
+    Grava o plano: remove chunks obsoletos, atualiza posições e insere os
+    novos chunks com os `embeddings` (alinhados com plan.texts).
+    """
+    if not plan.changed:
+        return {'total': plan.total, 'reused': plan.total, 'embedded': 0, 'deleted': 0, 'changed': False}
+
+    new_chunks = []
+    for (position, text_chunk, digest), embedding in zip(plan.to_embed, embeddings):
+        chunk = ArticleChunk(
+            article=plan.article,
+            content=text_chunk.content,
+            content_hash=digest,
+            position=position,
+            token_count=text_chunk.token_count
+        )
+        chunk.set_embedding(embedding)
+        new_chunks.append(chunk)
+
+    # Alteração atómica: os leitores nunca veem o artigo sem chunks
+    with transaction.atomic():
+        if plan.stale_ids:
+            ArticleChunk.objects.filter(id__in=plan.stale_ids).delete()
+        if plan.kept:
+            ArticleChunk.objects.bulk_update(plan.kept, ['position', 'token_count'])
+        ArticleChunk.objects.bulk_create(new_chunks)
+        index_chunks(new_chunks)
+
+    return {
+        'total': plan.total,
+        'reused': len(plan.kept),
+        'embedded': len(new_chunks),
+        'deleted': len(plan.stale_ids),
+        'changed': True,
+    }
+
+
+def sync_article_chunks(article, ai, rate_limiter=None):
+    """
+    Sincroniza os chunks de um artigo com o conteúdo atual, de forma incremental:
+    - chunks cujo hash não mudou mantêm o embedding existente (sem chamadas à API)
+    - só os chunks novos ou alterados são enviados para embedding
+    - chunks que deixaram de existir são removidos
+    `rate_limiter` (opcional) é aplicado a cada pedido de embedding.
+
+    Devolve um dict com as contagens (total, reused, embedded, deleted) e
+    `changed`, que é False quando o artigo já estava indexado com este conteúdo.
+    """
+    plan = plan_chunk_sync(article, ai.embed_model)
+    embeddings = ai.generate_embeddings(plan.texts, rate_limiter=rate_limiter) if plan.texts else []
+    return apply_chunk_sync(plan, embeddings)
@@ -1,9 +1,9 @@
 
-from .ai_service import AIService
+from .ai_service import get_ai_service
 
 class NLPService:
     def __init__(self):
-        self.ai = AIService()
+        self.ai = get_ai_service()
 
     def analyze_scientific_structure(self, content):
         """Avalia e sugere melhorias na estrutura do artigo"""
@@ -16,11 +16,11 @@ class NLPService:
         2. Consistência das Metodologias
         3. Clareza da Conclusão
         """
-        response = self.ai.model.generate_content(prompt)
+        response = self.ai.generate_content(prompt)
         return response.text
 
     def extract_key_concepts(self, content):
         """Extrai conceitos chave para o indexador semântico"""
         prompt = f"Extraia os 10 conceitos científicos mais importantes deste texto em formato JSON list: {content}"
-        response = self.ai.model.generate_content(prompt)
+        response = self.ai.generate_content(prompt)
         return response.text
@@ -0,0 +1,202 @@
+import asyncio
+import threading
+import time
+from asgiref.sync import sync_to_async
+
+
+class TokenBucket:
+    """
+    Limitador token-bucket thread-safe.
+    `rate` tokens por segundo, com rajadas até `capacity` tokens.
+    Para a quota Gemini (pedidos por minuto): TokenBucket.per_minute(rpm).
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        if rate <= 0:
+            raise ValueError("rate deve ser positivo")
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, rate))
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, requests_per_minute, burst=None):
+        return cls(requests_per_minute / 60.0, capacity=burst)
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def reserve(self, tokens=1):
+        """Consome `tokens` se houver; senão devolve os segundos até haver (0.0 = concedido)"""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def try_acquire(self, tokens=1):
+        return self.reserve(tokens) == 0.0
+
+    def acquire(self, tokens=1):
+        """Bloqueia até haver tokens disponíveis; devolve o tempo de espera (s)"""
+        waited = 0.0
+        while True:
+            delay = self.reserve(tokens)
+            if delay == 0.0:
+                return waited
+            self._sleep(delay)
+            waited += delay
+
+    def drain(self):
+        """Esvazia o bucket (ex.: após um 429, a quota real está esgotada)"""
+        with self._lock:
+            self._refill()
+            self._tokens = 0.0
+
+    @property
+    def tokens(self):
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+
+class RateLimitExceeded(RuntimeError):
+    """Não houve token disponível dentro do tempo de espera permitido"""
+
+
+# Token bucket atómico no Redis, com o relógio do próprio Redis (os processos
+# podem estar em máquinas diferentes). KEYS[1]: hash do bucket;
+# ARGV: rate (tokens/s), capacidade, tokens pedidos (-1 esvazia o bucket).
+# Devolve {ms até haver tokens (0 = concedido), tokens restantes}.
+SHARED_TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local time = redis.call('time')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local state = redis.call('hmget', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(state[1]) or capacity
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate / 1000)
+local wait = 0
+if requested < 0 then
+    tokens = 0
+elseif tokens >= requested then
+    tokens = tokens - requested
+else
+    wait = math.ceil((requested - tokens) * 1000 / rate)
+end
+redis.call('hset', KEYS[1], 'tokens', tostring(tokens), 'updated_at', now)
+redis.call('pexpire', KEYS[1], math.ceil(capacity * 1000 / rate) + 1000)
+return {wait, tostring(tokens)}
+"""
+
+
+class SharedTokenBucket:
+    """
+    Token bucket partilhado por todos os processos (web e Celery) através do
+    Redis: a quota do Gemini é da conta, não de cada worker. Sem Redis (ou com
+    o Redis em baixo) recorre a um TokenBucket local ao processo.
+    Contadores `granted`, `throttled` (pedidos recusados) e `waited` (segundos
+    de espera acumulados) para observabilidade.
+    """
+
+    def __init__(self, key, rate, capacity=None, redis=None, sleep=time.sleep):
+        self.key = key
+        self.redis = redis
+        self.local = TokenBucket(rate, capacity, sleep=sleep)
+        self.rate = self.local.rate
+        self.capacity = self.local.capacity
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self.granted = 0
+        self.throttled = 0
+        self.drained = 0
+        self.waited = 0.0
+
+    @classmethod
+    def per_minute(cls, key, requests_per_minute, burst=None, redis=None):
+        return cls(key, requests_per_minute / 60.0, capacity=burst, redis=redis)
+
+    @property
+    def shared(self):
+        return self.redis is not None and getattr(self.redis, 'enabled', True)
+
+    def _eval(self, requested):
+        """Resposta do script no Redis, ou None se o Redis não estiver disponível"""
+        if not self.shared:
+            return None
+        return self.redis.eval(SHARED_TOKEN_BUCKET_SCRIPT, 1, self.key, self.rate, self.capacity, requested)
+
+    def reserve(self, tokens=1):
+        """Consome `tokens` se houver; senão devolve os segundos até haver (0.0 = concedido)"""
+        reply = self._eval(tokens)
+        if reply is None:
+            return self.local.reserve(tokens)
+        return int(reply[0]) / 1000.0
+
+    def acquire(self, tokens=1, timeout=None):
+        """
+        Espera por tokens no máximo `timeout` segundos (None: sem limite);
+        devolve o tempo de espera ou levanta RateLimitExceeded.
+        """
+        waited = 0.0
+        while True:
+            delay = self.reserve(tokens)
+            if delay == 0.0:
+                self._record(granted=1, waited=waited)
+                return waited
+            if timeout is not None and waited + delay > timeout:
+                self._record(throttled=1, waited=waited)
+                raise RateLimitExceeded(f"Quota de pedidos esgotada ({self.key})")
+            self._sleep(delay)
+            waited += delay
+
+    async def acquire_async(self, tokens=1, timeout=None):
+        """Como acquire, mas espera sem bloquear o event loop (o Redis é consultado numa thread)"""
+        reserve = sync_to_async(self.reserve, thread_sensitive=False)
+        waited = 0.0
+        while True:
+            delay = await reserve(tokens)
+            if delay == 0.0:
+                self._record(granted=1, waited=waited)
+                return waited
+            if timeout is not None and waited + delay > timeout:
+                self._record(throttled=1, waited=waited)
+                raise RateLimitExceeded(f"Quota de pedidos esgotada ({self.key})")
+            await asyncio.sleep(delay)
+            waited += delay
+
+    def drain(self):
+        """Esvazia o bucket em todos os processos: a quota real acabou (429)"""
+        if self._eval(-1) is None:
+            self.local.drain()
+        self._record(drained=1)
+
+    def _record(self, granted=0, throttled=0, drained=0, waited=0.0):
+        with self._lock:
+            self.granted += granted
+            self.throttled += throttled
+            self.drained += drained
+            self.waited += waited
+
+    def stats(self):
+        reply = self._eval(0)
+        tokens = float(reply[1]) if reply is not None else self.local.tokens
+        with self._lock:
+            return {
+                'shared': reply is not None,
+                'requests_per_minute': self.rate * 60,
+                'capacity': self.capacity,
+                'tokens': round(tokens, 2),
+                'granted': self.granted,
+                'throttled': self.throttled,
+                'drained': self.drained,
+                'waited_seconds': round(self.waited, 3),
+            }
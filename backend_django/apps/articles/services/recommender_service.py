@@ -1,49 +1,164 @@
-
-from ..models import Article, UserEvent, ArticleChunk
-from .search_service import SearchService
+import threading
+import time
+from collections import namedtuple
 import numpy as np
+from django.conf import settings
+from django.utils import timezone
+from ..models import Article, UserEvent
+from . import response_cache
+from .search_service import SearchService
+from .vector_index import get_vector_index
+
+# Artigos publicados candidatos: ids, priors já calculados e linha na matriz de artigos do índice (-1: sem embeddings)
+Candidates = namedtuple('Candidates', 'ids priors rows index versions built_at')
+
+_lock = threading.Lock()
+_candidates = {}
+
 
 class RecommenderService:
-    def __init__(self):
-        self.search = SearchService()
+    """
+    Recomendações por perfil de utilizador/sessão:
+    1. O perfil é a média dos vetores dos artigos com que interagiu, pesada pela
+       recência (meia-vida RECOMMENDER_EVENT_HALF_LIFE_HOURS) e pelo tipo de evento.
+    2. O perfil é comparado com a matriz de vetores dos artigos (média dos
+       chunks, ver ExactVectorIndex.article_matrix) num único produto matriz-vetor.
+    3. Ao cosseno somam-se priors de popularidade (log das visualizações) e de
+       frescura (meia-vida RECOMMENDER_FRESHNESS_HALF_LIFE_DAYS); sem histórico
+       (ou sem embeddings) só os priors contam.
+    Número fixo de consultas e nenhuma chamada ao Gemini: os vetores vêm do
+    índice vetorial em memória e os candidatos com os priors de uma cache do
+    processo (get_candidates), pelo que por pedido só corre o produto com o perfil.
+    """
 
-    def get_recommendations_for_user(self, user=None, session_id=None, top_k=5):
+    SIMILARITY_WEIGHT = 0.75
+    POPULARITY_WEIGHT = 0.15
+    FRESHNESS_WEIGHT = 0.10
+
+    # Peso de cada interação no perfil (pesquisas não têm artigo)
+    EVENT_WEIGHTS = {'view': 1.0, 'like': 2.0, 'read_finish': 3.0}
+
+    def recent_events(self, user=None, session_id=None):
+        """(article_id, event_type, created_at) das interações mais recentes"""
+        if user is not None:
+            events = UserEvent.objects.filter(user=user)
+        elif session_id:
+            events = UserEvent.objects.filter(session_id=session_id, user__isnull=True)
+        else:
+            return []
+        return list(
+            events.filter(article__isnull=False)
+            .order_by('-created_at')
+            .values_list('article_id', 'event_type', 'created_at')[:settings.RECOMMENDER_HISTORY_SIZE]
+        )
+
+    @classmethod
+    def profile_vector(cls, events, article_ids, vectors, now=None):
+        """Média pesada (recência x tipo de evento) dos vetores dos artigos; None sem dados"""
+        if not events or vectors.size == 0:
+            return None
+        now = now or timezone.now()
+        # article_ids vem ordenado (ExactVectorIndex.article_matrix)
+        article_ids = np.asarray(article_ids)
+        event_ids = np.array([article_id for article_id, _, _ in events], dtype=np.int64)
+        event_rows = np.minimum(np.searchsorted(article_ids, event_ids), len(article_ids) - 1)
+        positions, weights = [], []
+        for (_, event_type, created_at), row, article_id in zip(events, event_rows.tolist(), event_ids.tolist()):
+            if article_ids[row] != article_id:
+                continue
+            age_hours = max(0.0, (now - created_at).total_seconds() / 3600)
+            positions.append(row)
+            weights.append(
+                cls.EVENT_WEIGHTS.get(event_type, 1.0)
+                * 0.5 ** (age_hours / settings.RECOMMENDER_EVENT_HALF_LIFE_HOURS)
+            )
+        if not positions:
+            return None
+        profile = np.asarray(weights, dtype=np.float32) @ vectors[positions]
+        norm = np.linalg.norm(profile)
+        return profile / norm if norm > 0 else None
+
+    @classmethod
+    def priors(cls, views, published_at, now=None):
+        """Popularidade (log das visualizações, em [0, 1]) e frescura (decaimento exponencial)"""
+        now = now or timezone.now()
+        popularity = np.log1p(np.asarray(views, dtype=np.float64))
+        if popularity.size and popularity.max() > 0:
+            popularity /= popularity.max()
+        age_days = np.array([
+            max(0.0, (now - date).total_seconds() / 86400) if date else np.inf for date in published_at
+        ])
+        freshness = 0.5 ** (age_days / settings.RECOMMENDER_FRESHNESS_HALF_LIFE_DAYS)
+        return cls.POPULARITY_WEIGHT * popularity + cls.FRESHNESS_WEIGHT * freshness
+
+    @classmethod
+    def get_candidates(cls, backend):
         """
-        Sistema de recomendação híbrido:
-        1. Baseado em Conteúdo (Artigos similares aos que o utilizador gostou/viu)
-        2. Popularidade (Fallback)
+        Candidatos do processo para o índice do `backend`, refeitos quando o
+        índice é reconstruído, quando algum artigo muda (versão global da
+        cache de respostas) ou ao fim de RECOMMENDER_CANDIDATES_TTL segundos
+        (as visualizações mudam com .update(), sem sinais).
         """
-        # Obter histórico recente do utilizador
-        events = UserEvent.objects.filter(
-            user=user if user else None,
-            session_id=session_id
-        ).order_by('-created_at')[:10]
-        
-        if not events.exists():
-            # Fallback: Top artigos por visualizações
-            return Article.objects.filter(status='published').order_by('-views')[:top_k]
-        
-        # Obter IDs de artigos interagidos
-        article_ids = events.values_list('article_id', flat=True).distinct()
-        
-        # Encontrar artigos similares usando embeddings
-        recommended_articles = []
-        seen_ids = set(article_ids)
-        
-        for art_id in article_ids:
-            article = Article.objects.get(id=art_id)
-            # Pegar o primeiro chunk do artigo para busca de similaridade
-            chunk = article.chunks.first()
-            if chunk and chunk.embedding:
-                similars = self.search.semantic_search(chunk.content, top_k=3)
-                for s_chunk in similars:
-                    if s_chunk.article.id not in seen_ids:
-                        recommended_articles.append(s_chunk.article)
-                        seen_ids.add(s_chunk.article.id)
-                        
-        # Se não houver recomendações suficientes, preencher com populares
-        if len(recommended_articles) < top_k:
-            pop_articles = Article.objects.exclude(id__in=seen_ids).order_by('-views')[:top_k-len(recommended_articles)]
-            recommended_articles.extend(list(pop_articles))
-            
-        return recommended_articles[:top_k]
+        index = get_vector_index(backend)
+        versions = response_cache.versions()
+        cached = _candidates.get(backend)
+        if cls._is_current(cached, index, versions):
+            return cached
+
+        with _lock:
+            cached = _candidates.get(backend)
+            if not cls._is_current(cached, index, versions):
+                cached = cls._build_candidates(index, versions)
+                _candidates[backend] = cached
+            return cached
+
+    @staticmethod
+    def _is_current(cached, index, versions):
+        return (
+            cached is not None and cached.index is index and cached.versions == versions
+            and time.monotonic() - cached.built_at < settings.RECOMMENDER_CANDIDATES_TTL
+        )
+
+    @classmethod
+    def _build_candidates(cls, index, versions):
+        candidates = list(
+            Article.objects.filter(status='published').values_list('id', 'views', 'published_at')
+        )
+        ids = np.array([article_id for article_id, _, _ in candidates], dtype=np.int64)
+        priors = cls.priors([views for _, views, _ in candidates], [date for _, _, date in candidates])
+
+        indexed_ids, _ = index.article_matrix()
+        rows = np.full(len(ids), -1, dtype=np.int64)
+        if len(indexed_ids):
+            positions = np.minimum(np.searchsorted(indexed_ids, ids), len(indexed_ids) - 1)
+            indexed = indexed_ids[positions] == ids
+            rows[indexed] = positions[indexed]
+        return Candidates(ids, priors, rows, index, versions, time.monotonic())
+
+    def get_recommendations_for_user(self, user=None, session_id=None, top_k=5):
+        events = self.recent_events(user=user, session_id=session_id)
+
+        backend = settings.SEARCH_INDEX_BACKENDS.get('recommender', settings.SEARCH_INDEX_BACKEND)
+        candidates = self.get_candidates(backend)
+        if not len(candidates.ids):
+            return []
+        scores = candidates.priors.copy()
+
+        indexed_ids, vectors = candidates.index.article_matrix()
+        profile = self.profile_vector(events, indexed_ids, vectors)
+        if profile is not None:
+            # Cosseno com o perfil para os candidatos com embeddings (os restantes ficam a 0)
+            similarity = vectors @ profile
+            indexed = candidates.rows >= 0
+            scores[indexed] += self.SIMILARITY_WEIGHT * similarity[candidates.rows[indexed]]
+
+        # Artigos com que já interagiu não são recomendados
+        seen = np.isin(candidates.ids, [article_id for article_id, _, _ in events])
+        scores[seen] = -np.inf
+
+        k = min(top_k, int((~seen).sum()))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return SearchService.hydrate_articles([int(article_id) for article_id in candidates.ids[top]])
@@ -0,0 +1,284 @@
+from collections import Counter, defaultdict
+from itertools import chain
+import numpy as np
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Count
+from taggit.models import TaggedItem
+from ..models import Article, ArticleChunk, RelatedArticle
+from .vector_index import ExactVectorIndex, get_vector_index
+
+# Pesos de cada sinal na similaridade entre artigos
+EMBEDDING_WEIGHT = 0.7
+TAG_WEIGHT = 0.2
+CATEGORY_WEIGHT = 0.1
+
+# Linhas da matriz de similaridade calculadas de cada vez (memória: BLOCK_SIZE x nº de artigos)
+BLOCK_SIZE = 512
+
+
+class ArticleSimilarity:
+    """
+    Similaridade entre todos os artigos publicados, vetorizada em NumPy:
+        0.7 * cosseno(média dos embeddings dos chunks)
+      + 0.2 * Jaccard(tags)
+      + 0.1 * [mesma categoria]
+    A matriz completa nunca é materializada: é calculada em blocos de linhas.
+    As tags ficam em formato esparso (CSR): as de cada artigo e, invertidas,
+    os artigos de cada tag; a memória cresce com o nº de etiquetas atribuídas
+    e não com artigos x tags.
+    """
+
+    def __init__(self, article_ids, vectors, tags, categories):
+        """`tags`: ids das tags de cada artigo, alinhados com `article_ids`"""
+        self.article_ids = np.asarray(article_ids, dtype=np.int64)
+        self.vectors = np.asarray(vectors, dtype=np.float32)
+        # -1: sem categoria (nunca conta como "mesma categoria")
+        self.categories = np.asarray(categories, dtype=np.int64)
+        self._positions = {int(article_id): i for i, article_id in enumerate(self.article_ids)}
+
+        tag_sets = [sorted(set(article_tags)) for article_tags in tags]
+        sizes = np.array([len(article_tags) for article_tags in tag_sets], dtype=np.int64)
+        self.tag_counts = sizes.astype(np.float32)
+        self.tag_indptr = np.concatenate([[0], np.cumsum(sizes)])
+        tag_ids = np.fromiter(chain.from_iterable(tag_sets), dtype=np.int64, count=int(sizes.sum()))
+        # Ids de tag -> colunas 0..T-1
+        _, self.tag_columns = np.unique(tag_ids, return_inverse=True)
+        self.tag_columns = self.tag_columns.reshape(-1).astype(np.int64)
+        owners = np.repeat(np.arange(len(tag_sets), dtype=np.int64), sizes)
+        order = np.argsort(self.tag_columns, kind='stable')
+        self.tag_members = owners[order]
+        n_tags = int(self.tag_columns.max()) + 1 if self.tag_columns.size else 0
+        self.tag_members_indptr = np.concatenate([[0], np.cumsum(np.bincount(self.tag_columns, minlength=n_tags))])
+
+    def __len__(self):
+        return len(self.article_ids)
+
+    @classmethod
+    def from_database(cls, index=None):
+        """
+        Artigos publicados, tags e categorias da base de dados; os vetores vêm
+        do índice vetorial do processo (snapshot mmap), sem reler os embeddings.
+        """
+        rows = list(Article.objects.filter(status='published').order_by('id').values_list('id', 'category_id'))
+        article_ids = [article_id for article_id, _ in rows]
+        categories = [category_id if category_id is not None else -1 for _, category_id in rows]
+        positions = {article_id: i for i, article_id in enumerate(article_ids)}
+
+        tags = [[] for _ in article_ids]
+        tagged = Article.objects.filter(id__in=article_ids, tags__isnull=False).values_list('id', 'tags__id')
+        for article_id, tag_id in tagged:
+            tags[positions[article_id]].append(tag_id)
+
+        index = index if index is not None else get_vector_index()
+        return cls(article_ids, cls.article_vectors(article_ids, index), tags, categories)
+
+    @staticmethod
+    def article_vectors(article_ids, index):
+        """
+        Vetor médio dos chunks de cada artigo (ExactVectorIndex.article_matrix),
+        alinhado com `article_ids`. Artigos sem chunks indexados ficam com o vetor nulo.
+        """
+        indexed_ids, pooled = index.article_matrix()
+        vectors = np.zeros((len(article_ids), pooled.shape[1]), dtype=np.float32)
+        rows = {int(article_id): i for i, article_id in enumerate(indexed_ids)}
+        for i, article_id in enumerate(article_ids):
+            row = rows.get(article_id)
+            if row is not None:
+                vectors[i] = pooled[row]
+        return vectors
+
+    def position(self, article_id):
+        return self._positions.get(int(article_id))
+
+    def shared_tags(self, positions):
+        """Nº de tags em comum entre as linhas `positions` e todos os artigos (listas invertidas)"""
+        shared = np.zeros((len(positions), len(self)), dtype=np.float32)
+        for row, position in enumerate(positions):
+            columns = self.tag_columns[self.tag_indptr[position]:self.tag_indptr[position + 1]]
+            if columns.size:
+                members = np.concatenate([
+                    self.tag_members[self.tag_members_indptr[c]:self.tag_members_indptr[c + 1]] for c in columns
+                ])
+                shared[row] = np.bincount(members, minlength=len(self))
+        return shared
+
+    def scores(self, positions):
+        """Similaridade das linhas `positions` contra todos os artigos (o próprio fica a -inf)"""
+        positions = np.asarray(positions, dtype=np.int64)
+        scores = EMBEDDING_WEIGHT * (self.vectors[positions] @ self.vectors.T)
+
+        if self.tag_members.size:
+            shared = self.shared_tags(positions)
+            union = self.tag_counts[positions, None] + self.tag_counts[None, :] - shared
+            scores += TAG_WEIGHT * np.divide(shared, union, out=np.zeros_like(shared), where=union > 0)
+
+        categories = self.categories[positions, None]
+        scores += CATEGORY_WEIGHT * ((categories == self.categories[None, :]) & (categories >= 0))
+        scores[np.arange(len(positions)), positions] = -np.inf
+        return scores
+
+    def top(self, row, top_n):
+        """(article_id, score) dos top_n artigos de uma linha de scores, com score > 0"""
+        k = min(top_n, row.shape[0] - 1)
+        if k <= 0:
+            return []
+        candidates = np.argpartition(-row, k - 1)[:k]
+        candidates = candidates[np.argsort(-row[candidates], kind='stable')]
+        return [(int(self.article_ids[c]), float(row[c])) for c in candidates if row[c] > 0]
+
+    def neighbours(self, positions, top_n):
+        """Para cada posição, lista de (article_id, score) dos top_n vizinhos com score > 0"""
+        results = []
+        for start in range(0, len(positions), BLOCK_SIZE):
+            block = self.scores(positions[start:start + BLOCK_SIZE])
+            results.extend(self.top(row, top_n) for row in block)
+        return results
+
+
+def _links(article_ids, neighbours):
+    return [
+        RelatedArticle(article_id=article_id, related_id=related_id, rank=rank, score=score)
+        for article_id, related in zip(article_ids, neighbours)
+        for rank, (related_id, score) in enumerate(related)
+    ]
+
+
+def rebuild(top_n=None):
+    """Recalcula os vizinhos de todos os artigos publicados; devolve o nº de ligações"""
+    top_n = top_n or settings.RELATED_ARTICLES_TOP_N
+    similarity = ArticleSimilarity.from_database()
+    links = _links(similarity.article_ids, similarity.neighbours(np.arange(len(similarity)), top_n))
+    with transaction.atomic():
+        RelatedArticle.objects.all().delete()
+        RelatedArticle.objects.bulk_create(links, batch_size=1000)
+    return len(links)
+
+
+def score_article(article_id, category_id, index=None):
+    """
+    Similaridade de um artigo contra o corpus, sem carregar o corpus:
+    - cosseno contra a matriz de artigos do índice do processo (o vetor do
+      próprio artigo é relido dos seus chunks: o índice pode ainda não os ter);
+    - Jaccard só para os artigos com tags em comum (listas invertidas do TaggedItem);
+    - categoria só para os artigos da mesma categoria.
+    Devolve (article_ids, scores), com o próprio artigo a -inf. Os ids podem
+    incluir artigos não publicados: quem usa o resultado filtra-os.
+    """
+    index = index if index is not None else get_vector_index()
+    ids, pooled = index.article_matrix()
+    vector = ArticleSimilarity.article_vectors(
+        [article_id], ExactVectorIndex.from_database(ArticleChunk.objects.filter(article_id=article_id))
+    )[0]
+    if pooled.shape[0] and vector.shape == pooled.shape[1:]:
+        scores = EMBEDDING_WEIGHT * (pooled @ vector)
+    else:
+        scores = np.zeros(len(ids), dtype=np.float32)
+
+    bonus = defaultdict(float)
+    tagged = TaggedItem.objects.filter(content_type=ContentType.objects.get_for_model(Article))
+    tag_ids = list(tagged.filter(object_id=article_id).values_list('tag_id', flat=True))
+    if tag_ids:
+        shared = Counter(tagged.filter(tag_id__in=tag_ids).values_list('object_id', flat=True))
+        counts = dict(
+            tagged.filter(object_id__in=shared).values('object_id').annotate(n=Count('id')).values_list('object_id', 'n')
+        )
+        for other, n in shared.items():
+            bonus[other] += TAG_WEIGHT * n / (len(tag_ids) + counts[other] - n)
+    if category_id is not None:
+        for other in Article.objects.filter(status='published', category_id=category_id).values_list('id', flat=True):
+            bonus[other] += CATEGORY_WEIGHT
+
+    if bonus:
+        other_ids = np.fromiter(bonus.keys(), dtype=np.int64, count=len(bonus))
+        other_scores = np.fromiter(bonus.values(), dtype=np.float32, count=len(bonus))
+        # article_matrix devolve os ids ordenados
+        positions = np.minimum(np.searchsorted(ids, other_ids), max(len(ids) - 1, 0))
+        indexed = (ids[positions] == other_ids) if len(ids) else np.zeros(len(other_ids), dtype=bool)
+        np.add.at(scores, positions[indexed], other_scores[indexed])
+        ids = np.concatenate([ids, other_ids[~indexed]])
+        scores = np.concatenate([scores, other_scores[~indexed]])
+    scores[ids == article_id] = -np.inf
+    return ids, scores
+
+
+def _published_top(ids, scores, top_n):
+    """(article_id, score) dos top_n artigos publicados com score > 0; só consulta os candidatos"""
+    positive = int((scores > 0).sum())
+    k = min(top_n * 2, positive)
+    while k:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+        published = set(Article.objects.filter(
+            id__in=ids[candidates].tolist(), status='published'
+        ).values_list('id', flat=True))
+        top = [(int(ids[c]), float(scores[c])) for c in candidates if int(ids[c]) in published][:top_n]
+        if len(top) == top_n or k == positive:
+            return top
+        k = min(k * 4, positive)
+    return []
+
+
+def refresh_article(article_id, top_n=None):
+    """
+    Atualização na publicação: só o artigo é comparado com o corpus
+    (score_article, uma linha de scores). Como a similaridade é simétrica,
+    essa linha também dá o score do artigo nas listas dos vizinhos e das que
+    já o incluíam, que são fundidas com as ligações guardadas. Os artigos que
+    deixam de caber numa lista são repostos na reconstrução noturna.
+    """
+    top_n = top_n or settings.RELATED_ARTICLES_TOP_N
+    article = Article.objects.filter(id=article_id, status='published').values('category_id').first()
+    if article is None:
+        # Já não está publicado
+        RelatedArticle.objects.filter(article_id=article_id).delete()
+        return 0
+
+    ids, scores = score_article(article_id, article['category_id'])
+    own = _published_top(ids, scores, top_n)
+
+    affected = {related_id for related_id, _ in own}
+    affected |= set(RelatedArticle.objects.filter(
+        related_id=article_id, article__status='published'
+    ).values_list('article_id', flat=True))
+    affected = sorted(affected)
+    mask = np.isin(ids, affected)
+    owner_scores = dict(zip(ids[mask].tolist(), scores[mask].tolist()))
+    stored = defaultdict(list)
+    for owner, related_id, score in RelatedArticle.objects.filter(article_id__in=affected).values_list(
+        'article_id', 'related_id', 'score'
+    ):
+        if related_id != article_id:
+            stored[owner].append((related_id, score))
+
+    lists = [own]
+    for owner in affected:
+        related = stored[owner]
+        score = owner_scores.get(owner, 0.0)
+        if score > 0:
+            related.append((article_id, score))
+        lists.append(sorted(related, key=lambda item: -item[1])[:top_n])
+
+    links = _links([article_id] + affected, lists)
+    with transaction.atomic():
+        RelatedArticle.objects.filter(article_id__in=[article_id] + affected).delete()
+        RelatedArticle.objects.bulk_create(links)
+    return len(links)
+
+
+def related_to(article, limit=3):
+    """
+    Artigos relacionados, por ordem de relevância: uma consulta pela chave
+    (article, rank). Enquanto a tabela não tiver o artigo (acabado de publicar,
+    ainda por indexar) recorre aos mais recentes da mesma categoria.
+    """
+    articles = Article.objects.filter(status='published').select_related(
+        'author', 'author__profile', 'category'
+    ).prefetch_related('tags')
+    related = list(articles.filter(related_to__article=article).order_by('related_to__rank')[:limit])
+    if related:
+        return related
+    return list(
+        articles.filter(category=article.category).exclude(id=article.id).order_by('-published_at')[:limit]
+    )
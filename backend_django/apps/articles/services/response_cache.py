@@ -0,0 +1,99 @@
+import hashlib
+import time
+from django.core.cache import cache
+from django.db import transaction
+
+GLOBAL_VERSION_KEY = 'articles:response:version'
+ARTICLE_VERSION_KEY = 'articles:response:version:{article_id}'
+ENTRY_KEY = 'articles:response:{kind}:{key}'
+
+# Campos dependentes do utilizador: guardados na cache como anónimos e preenchidos por pedido
+USER_FIELDS = ('is_bookmarked', 'is_liked')
+
+
+def _version_keys(article_id=None):
+    keys = [GLOBAL_VERSION_KEY]
+    if article_id is not None:
+        keys.append(ARTICLE_VERSION_KEY.format(article_id=article_id))
+    return keys
+
+
+def bump_versions(article_id=None):
+    """
+    Invalida as respostas em cache: a versão global (listas e todos os
+    detalhes) e, se indicado, só a do artigo (o seu detalhe). A versão é o
+    instante da alteração em ns e serve também de Last-Modified.
+    Incrementa já e de novo após o commit: um leitor que entre os dois
+    momentos volte a guardar o conteúdo antigo fica com uma versão obsoleta.
+    """
+    keys = _version_keys(article_id)
+
+    def bump():
+        cache.set_many(dict.fromkeys(keys, time.time_ns()), None)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def versions(article_id=None):
+    """Versões atuais (global e, se indicado, do artigo); as ausentes começam agora"""
+    keys = _version_keys(article_id)
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # Chave perdida (cache limpa/despejada): recomeçar num valor único
+            cache.add(key, time.time_ns(), None)
+            found[key] = cache.get(key) or time.time_ns()
+    return tuple(found[key] for key in keys)
+
+
+def request_key(request):
+    """Identifica a representação: host (links de paginação) e caminho com query string"""
+    return hashlib.sha256(f"{request.get_host()}\x00{request.get_full_path()}".encode()).hexdigest()
+
+
+def etag(key, current):
+    return '"%s"' % hashlib.sha256(f"{key}\x00{current}".encode()).hexdigest()[:32]
+
+
+def last_modified(current):
+    """Instante (s) da alteração mais recente"""
+    return max(current) // 10**9
+
+
+def entry_key(kind, key, current=None):
+    if current is not None:
+        key = hashlib.sha256(f"{key}\x00{current}".encode()).hexdigest()
+    return ENTRY_KEY.format(kind=kind, key=key)
+
+
+def get(key):
+    return cache.get(key)
+
+
+def store(key, entry, ttl):
+    cache.set(key, entry, ttl)
+
+
+def _anonymous_item(item):
+    return {**item, **dict.fromkeys(USER_FIELDS, False)}
+
+
+def anonymous(data):
+    """Cópia da resposta (detalhe ou página) com os campos do utilizador a False"""
+    if 'results' in data:
+        return {**data, 'results': [_anonymous_item(item) for item in data['results']]}
+    return _anonymous_item(data)
+
+
+def merge_user_flags(data, user):
+    """Preenche is_bookmarked/is_liked numa resposta anónima: duas consultas"""
+    from ..serializers import UserArticleFlags
+
+    items = data['results'] if 'results' in data else [data]
+    flags = UserArticleFlags(user, [item['id'] for item in items])
+    items = [
+        {**item, 'is_bookmarked': item['id'] in flags.bookmarked, 'is_liked': item['id'] in flags.liked}
+        for item in items
+    ]
+    return {**data, 'results': items} if 'results' in data else items[0]
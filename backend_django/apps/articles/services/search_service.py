@@ -1,37 +1,106 @@
-
 import numpy as np
-from ..models import ArticleChunk
-from .ai_service import AIService
+from django.conf import settings
+from ..models import Article, ArticleChunk
+from .ai_service import get_ai_service
+from .bm25_index import bm25_search, reciprocal_rank_fusion
+from .vector_index import get_vector_index
 
 class SearchService:
-    def __init__(self):
-        self.ai = AIService()
+    def __init__(self, consumer=None, backend=None):
+        """
+        `consumer` identifica quem pesquisa ('rag', 'recommender', ...) para que
+        o backend do índice (exacto ou IVF) possa ser escolhido em
+        settings.SEARCH_INDEX_BACKENDS; `backend` força um backend concreto.
+        """
+        self.ai = get_ai_service()
+        self.backend = backend or settings.SEARCH_INDEX_BACKENDS.get(
+            consumer, settings.SEARCH_INDEX_BACKEND
+        )
 
-    def semantic_search(self, query, top_k=5, author_id=None):
+    def semantic_ranking(self, query, top_k=5, author_id=None):
         """
-        Executa pesquisa semântica. 
+        Camada de recuperação: devolve [(chunk_id, article_id, score)] por ordem
+        de relevância, sem tocar na base de dados.
         Nota: Em produção com PostgreSQL, isto usaria o operador <=> do pgvector.
-        Aqui implementamos uma versão compatível que funciona com o campo JSONField/Numpy.
+        Aqui usamos um índice em memória (exacto ou IVF aproximado) partilhado
+        pelo processo, em vez de percorrer a tabela de chunks a cada pedido.
         """
         query_vec = self.ai.get_query_embedding(query)
-        
-        # Recuperar todos os chunks que têm embeddings
-        chunks = ArticleChunk.objects.exclude(embedding__isnull=True)
-        
-        if author_id:
-            chunks = chunks.filter(article__author_id=author_id)
-
-        
-        results = []
-        for chunk in chunks:
-            # Calcular cosine similarity simples
-            similarity = self.cosine_similarity(query_vec, chunk.embedding)
-            results.append((similarity, chunk))
-        
-        # Ordenar por similaridade
-        results.sort(key=lambda x: x[0], reverse=True)
-        
-        return [item[1] for item in results[:top_k]]
+        return self.vector_ranking(query_vec, top_k=top_k, author_id=author_id)
+
+    def vector_ranking(self, query_vec, top_k=5, author_id=None):
+        """Como semantic_ranking, para um embedding já calculado (ex.: pelo AsyncAIService)"""
+        return get_vector_index(self.backend).search(query_vec, top_k=top_k, author_id=author_id)
+
+    def semantic_search(self, query, top_k=5, author_id=None):
+        """Pesquisa semântica: chunks mais relevantes (uma única consulta in_bulk)"""
+        return self.hydrate_chunks(self.semantic_ranking(query, top_k=top_k, author_id=author_id))
+
+    @staticmethod
+    def hydrate_chunks(ranked):
+        """Chunks de um ranking [(chunk_id, article_id, score)], pela mesma ordem"""
+        if not ranked:
+            return []
+
+        chunks = ArticleChunk.objects.in_bulk([chunk_id for chunk_id, _, _ in ranked])
+        return [chunks[chunk_id] for chunk_id, _, _ in ranked if chunk_id in chunks]
+
+    def semantic_article_search(self, query, top_k=5, author_id=None, queryset=None):
+        """
+        Artigos distintos por ordem do seu chunk mais relevante, carregados numa
+        consulta (mais os prefetch) em vez de `chunk.article` por resultado.
+        """
+        ranked = self.semantic_ranking(query, top_k=top_k, author_id=author_id)
+        return self.hydrate_ranked_articles(ranked, queryset)
+
+    @classmethod
+    def hydrate_ranked_articles(cls, ranked, queryset=None):
+        """Artigos distintos de um ranking de chunks, pela posição do melhor chunk"""
+        article_ids = list(dict.fromkeys(article_id for _, article_id, _ in ranked))
+        return cls.hydrate_articles(article_ids, queryset)
+
+    @staticmethod
+    def hydrate_articles(article_ids, queryset=None):
+        """
+        Carrega os artigos com autor, perfil, categoria e tags (select_related +
+        prefetch_related) num número fixo de consultas, mantendo a ordem de `article_ids`.
+        Ids que não existam (ou fora do `queryset`) são ignorados.
+        """
+        if not article_ids:
+            return []
+        queryset = Article.objects.all() if queryset is None else queryset
+        articles = queryset.select_related(
+            'author', 'author__profile', 'category'
+        ).prefetch_related('tags').in_bulk(article_ids)
+        return [articles[article_id] for article_id in article_ids if article_id in articles]
+
+    def keyword_search(self, query, top_k=10, kind='article', author_id=None):
+        """
+        Pesquisa por palavras-chave (BM25 sobre o índice invertido).
+        kind='article' devolve [(article_id, score)]; kind='chunk' devolve [(chunk_id, score)].
+        """
+        results = bm25_search(query, kind=kind, top_k=top_k, author_id=author_id)
+        if kind == 'chunk':
+            return [(chunk_id, score) for _, chunk_id, score in results]
+        return [(article_id, score) for article_id, _, score in results]
+
+    def hybrid_search(self, query, top_k=10, kind='article', author_id=None, candidates=None):
+        """
+        Pesquisa híbrida: funde o ranking BM25 com o ranking por cosseno dos
+        embeddings usando Reciprocal Rank Fusion (settings.SEARCH_RRF_K).
+        Para kind='article', cada artigo fica com a posição do seu melhor chunk.
+        Devolve [(id, score_rrf)] com ids de artigos ou de chunks conforme `kind`.
+        """
+        candidates = candidates or max(top_k * 4, 50)
+        lexical = [item_id for item_id, _ in self.keyword_search(query, candidates, kind, author_id)]
+
+        ranked = self.semantic_ranking(query, top_k=candidates, author_id=author_id)
+        if kind == 'article':
+            semantic = list(dict.fromkeys(article_id for _, article_id, _ in ranked))
+        else:
+            semantic = [chunk_id for chunk_id, _, _ in ranked]
+
+        return reciprocal_rank_fusion([lexical, semantic], k=settings.SEARCH_RRF_K, top_k=top_k)
 
     @staticmethod
     def cosine_similarity(v1, v2):
@@ -0,0 +1,263 @@
+import asyncio
+import json
+import threading
+import time
+import uuid
+import weakref
+
+# Liberta o lock apenas se ainda pertencer a quem o adquiriu
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlightError(RuntimeError):
+    """
+    Erro da chamada partilhada noutro processo, re-levantado em quem esperou
+    por ela. Traz o código HTTP (`status`) e se a chamada foi recusada
+    localmente (`throttled`), para ser classificado como o erro original.
+    """
+
+    def __init__(self, message, status=None, throttled=False):
+        super().__init__(message)
+        self.status = status
+        self.throttled = throttled
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Deduplicação de chamadas idênticas em curso (single-flight):
+    1. No processo: a primeira thread com uma dada chave (o líder) executa a
+       chamada; as restantes esperam e recebem o mesmo resultado (ou erro).
+    2. Entre processos (opcional, Redis): o líder de cada processo disputa o
+       lock `<prefix>:lock:<chave>` (SET NX PX). Quem o obtém chama o Gemini
+       e publica o resultado em `<prefix>:result:<chave>` durante
+       `result_ttl` segundos; os outros processos aguardam esse resultado.
+       Um erro só é entregue a quem já esperava por aquele líder: quem chega
+       depois volta a tentar (as falhas transitórias não ficam em cache).
+    `describe_error(erro)` indica como classificar um erro publicado (ver
+    SingleFlightError; por omissão AIService.describe_error). Os resultados partilhados entre processos têm de
+    ser serializáveis em JSON.
+    Se o líder demorar mais do que `wait_timeout`, quem espera segue sozinho.
+    `do_async` é a versão asyncio (views async): no processo, os pedidos do
+    mesmo event loop esperam num asyncio.Future, sem ocupar threads; entre
+    processos (e com as views síncronas) usa o mesmo lock e resultado no Redis.
+    """
+
+    def __init__(self, redis=None, wait_timeout=30.0, lock_ttl=60.0, result_ttl=5.0,
+                 poll_interval=0.05, prefix='singleflight', describe_error=None):
+        if describe_error is None:
+            # Import tardio: o ai_service importa este módulo
+            from .ai_service import AIService
+            describe_error = AIService.describe_error
+        self.redis = redis
+        self.describe_error = describe_error
+        self.wait_timeout = wait_timeout
+        self.lock_ttl = lock_ttl
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self.prefix = prefix
+        self._calls = {}
+        # Chamadas asyncio em curso: {event loop: {chave: asyncio.Future}}
+        self._async_calls = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.shared = 0
+        self.remote_shared = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            if not call.done.wait(self.wait_timeout):
+                return fn()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._do_shared(key, fn)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    async def do_async(self, key, fn):
+        """Como `do`, com `fn` uma função assíncrona aguardada no event loop de quem chama"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            calls = self._async_calls.setdefault(loop, {})
+            future = calls.get(key)
+            leader = future is None
+            if leader:
+                future = calls[key] = loop.create_future()
+                self.leaders += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), self.wait_timeout)
+            except asyncio.TimeoutError:
+                return await fn()
+            except asyncio.CancelledError:
+                # Líder cancelado (ex.: cliente desligou-se): segue sozinho
+                if not future.cancelled():
+                    raise
+                return await fn()
+
+        try:
+            result = await self._do_shared_async(key, fn)
+        except Exception as e:
+            future.set_exception(e)
+            # Sem ninguém à espera, o asyncio avisaria que o erro nunca foi lido
+            future.exception()
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                calls.pop(key, None)
+
+    @property
+    def shared_enabled(self):
+        return self.redis is not None and getattr(self.redis, 'enabled', True)
+
+    def _keys(self, key):
+        return f"{self.prefix}:lock:{key}", f"{self.prefix}:result:{key}"
+
+    def _shared_result(self, stored, awaited):
+        """
+        (True, resultado) se outro processo já publicou o resultado; re-levanta
+        o erro de um líder por quem se esperou; (False, None) caso contrário
+        """
+        if stored is None:
+            return False, None
+        payload = json.loads(stored)
+        if 'error' not in payload:
+            with self._lock:
+                self.remote_shared += 1
+            return True, payload['result']
+        if payload.get('token') in awaited:
+            with self._lock:
+                self.remote_shared += 1
+            raise SingleFlightError(payload['error'], payload.get('status'), payload.get('throttled', False))
+        return False, None
+
+    def _error_payload(self, error, token):
+        return {'error': str(error), 'token': token, **self.describe_error(error)}
+
+    def _do_shared(self, key, fn):
+        """Deduplicação entre processos; sem Redis (ou com o Redis em baixo) chama diretamente"""
+        if not self.shared_enabled:
+            return fn()
+
+        lock_key, result_key = self._keys(key)
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.wait_timeout
+        # Tokens dos líderes por quem este pedido esperou
+        awaited = set()
+        while True:
+            found, result = self._shared_result(self.redis.get(result_key), awaited)
+            if found:
+                return result
+
+            if self.redis.set(lock_key, token, nx=True, px=int(self.lock_ttl * 1000)):
+                # O resultado é publicado antes de libertar o lock, para que
+                # nenhum processo à espera o volte a pedir ao Gemini
+                try:
+                    try:
+                        result = fn()
+                    except Exception as e:
+                        self._publish(result_key, self._error_payload(e, token))
+                        raise
+                    self._publish(result_key, {'result': result})
+                    return result
+                finally:
+                    self.redis.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+
+            holder = self.redis.get(lock_key)
+            if holder is not None:
+                awaited.add(holder)
+            # pttl devolve None quando o Redis falha (SafeRedisWrapper): não vale a pena esperar
+            if self.redis.pttl(lock_key) is None or time.monotonic() > deadline:
+                return fn()
+            time.sleep(self.poll_interval)
+
+    async def _do_shared_async(self, key, fn):
+        """
+        _do_shared para asyncio: só as operações no Redis (curtas) correm numa
+        thread; a chamada do líder e as esperas ficam no event loop
+        """
+        if not self.shared_enabled:
+            return await fn()
+
+        redis = self.redis
+        lock_key, result_key = self._keys(key)
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.wait_timeout
+        awaited = set()
+        while True:
+            found, result = self._shared_result(await asyncio.to_thread(redis.get, result_key), awaited)
+            if found:
+                return result
+
+            if await asyncio.to_thread(redis.set, lock_key, token, nx=True, px=int(self.lock_ttl * 1000)):
+                try:
+                    try:
+                        result = await fn()
+                    except Exception as e:
+                        await asyncio.to_thread(self._publish, result_key, self._error_payload(e, token))
+                        raise
+                    await asyncio.to_thread(self._publish, result_key, {'result': result})
+                    return result
+                finally:
+                    await asyncio.to_thread(redis.eval, RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+
+            holder = await asyncio.to_thread(redis.get, lock_key)
+            if holder is not None:
+                awaited.add(holder)
+            if await asyncio.to_thread(redis.pttl, lock_key) is None or time.monotonic() > deadline:
+                return await fn()
+            await asyncio.sleep(self.poll_interval)
+
+    def _publish(self, result_key, payload):
+        try:
+            self.redis.set(result_key, json.dumps(payload), px=int(self.result_ttl * 1000))
+        except TypeError:
+            # Resultado não serializável: só é partilhado dentro do processo
+            pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                'leaders': self.leaders,
+                'shared': self.shared,
+                'remote_shared': self.remote_shared,
+                'in_flight': len(self._calls) + sum(len(calls) for calls in self._async_calls.values()),
+            }
@@ -0,0 +1,60 @@
+import re
+import unicodedata
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+MAX_TERM_LENGTH = 64
+
+# Palavras funcionais do português (e algumas do inglês, comum em termos científicos)
+STOPWORDS = frozenset("""
+a à ao aos aquela aquelas aquele aqueles aquilo as às até com como da das de dela delas dele deles
+depois do dos e é ela elas ele eles em entre era eram essa essas esse esses esta está estão estas
+este estes eu foi foram há isso isto já lhe lhes mais mas me mesmo meu minha muito na nas não nem
+no nos nós num numa o os ou para pela pelas pelo pelos por qual quando que quem se sem ser será
+seu seus só sua suas também te tem têm ter um uma umas uns você vocês vos
+the of and to in is are for on with by an be this that
+""".split())
+
+# Plurais: (sufixo, substituição), por ordem de aplicação
+PLURAL_RULES = (
+    ('ões', 'ão'), ('ães', 'ão'), ('ais', 'al'), ('éis', 'el'), ('eis', 'el'),
+    ('óis', 'ol'), ('ns', 'm'), ('res', 'r'), ('les', 'l'), ('zes', 'z'),
+)
+
+
+def fold_accents(text):
+    """Remove diacríticos ('ação' -> 'acao'), para que a pesquisa tolere a falta de acentos"""
+    decomposed = unicodedata.normalize('NFD', text)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def stem(word):
+    """
+    Stemmer leve para português (inspirado no RSLP/Savoy): reduz plurais,
+    o advérbio -mente e a vogal temática final, sem sufixos derivacionais
+    agressivos. 'células' e 'célula' -> 'celul'; 'gravidades' -> 'gravidad'.
+    """
+    if len(word) > 3:
+        for suffix, replacement in PLURAL_RULES:
+            if word.endswith(suffix):
+                word = word[:-len(suffix)] + replacement
+                break
+        else:
+            if word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+                word = word[:-1]
+    if len(word) > 7 and word.endswith('mente'):
+        word = word[:-5]
+    if len(word) > 4 and word[-1] in 'aeo':
+        word = word[:-1]
+    return fold_accents(word)
+
+
+def analyze(text):
+    """Texto -> lista de termos (minúsculas, sem stopwords, stemizados, sem acentos)"""
+    terms = []
+    for token in TOKEN_RE.findall((text or '').lower()):
+        if token in STOPWORDS or fold_accents(token) in STOPWORDS:
+            continue
+        if len(token) < 2 and not token.isdigit():
+            continue
+        terms.append(stem(token)[:MAX_TERM_LENGTH])
+    return terms
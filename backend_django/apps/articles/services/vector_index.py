@@ -0,0 +1,256 @@
+import os
+import threading
+import time
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from ..models import ArticleChunk
+from .embedding_snapshot import current_version, load_snapshot
+
+INDEX_VERSION_KEY = 'search:vector_index:version'
+
+
+class ExactVectorIndex:
+    """
+    Índice vetorial exacto mantido em memória no processo.
+    Guarda uma matriz float32 com os embeddings já normalizados, de modo que a
+    pesquisa se resume a um único produto matriz-vetor seguido de argpartition.
+    """
+
+    def __init__(self, chunk_ids, article_ids, author_ids, matrix, normalized=False):
+        self.chunk_ids = np.asarray(chunk_ids, dtype=np.int64)
+        self.article_ids = np.asarray(article_ids, dtype=np.int64)
+        self.author_ids = np.asarray(author_ids, dtype=np.int64)
+        matrix = np.asarray(matrix, dtype=np.float32)
+        # Matrizes já normalizadas (ex.: snapshot mmap) são usadas sem cópia
+        self.matrix = matrix if normalized else self.normalize(matrix)
+        self._article_matrix = None
+
+    def __len__(self):
+        return len(self.chunk_ids)
+
+    @classmethod
+    def from_database(cls, chunks=None):
+        """Constrói o índice a partir de todos os chunks com embedding (ou só de `chunks`)"""
+        chunks = chunks if chunks is not None else ArticleChunk.objects.all()
+        rows = chunks.exclude(embedding__isnull=True).values_list(
+            'id', 'article_id', 'article__author_id', 'embedding', 'embedding_dtype'
+        )
+        chunk_ids, article_ids, author_ids, vectors = [], [], [], []
+        for chunk_id, article_id, author_id, raw, dtype in rows.iterator(chunk_size=2000):
+            if not raw:
+                continue
+            vector = ArticleChunk.unpack_embedding(raw, dtype)
+            if vectors and vector.shape != vectors[0].shape:
+                continue
+            chunk_ids.append(chunk_id)
+            article_ids.append(article_id)
+            author_ids.append(author_id or 0)
+            vectors.append(vector)
+
+        matrix = np.vstack(vectors).astype(np.float32) if vectors else np.zeros((0, 0), dtype=np.float32)
+        return cls(chunk_ids, article_ids, author_ids, matrix)
+
+    @classmethod
+    def from_snapshot(cls, arrays):
+        """Índice sobre os arrays memory-mapped de um snapshot (ver embedding_snapshot)"""
+        return cls(
+            arrays['chunk_ids'], arrays['article_ids'], arrays['author_ids'],
+            arrays['embeddings'], normalized=True
+        )
+
+    @staticmethod
+    def normalize(matrix):
+        """Normaliza as linhas (L2); vetores nulos ficam a zero em vez de NaN"""
+        if matrix.ndim != 2 or matrix.size == 0:
+            return matrix
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def article_matrix(self):
+        """
+        (article_ids, vetores) com um vetor por artigo: a média dos embeddings
+        dos seus chunks, renormalizada. Calculada uma vez por índice.
+        """
+        if self._article_matrix is None:
+            if len(self) == 0:
+                self._article_matrix = (np.zeros(0, dtype=np.int64), np.zeros((0, 0), dtype=np.float32))
+            else:
+                order = np.argsort(self.article_ids, kind='stable')
+                article_ids = self.article_ids[order]
+                starts = np.flatnonzero(np.r_[True, article_ids[1:] != article_ids[:-1]])
+                sums = np.add.reduceat(self.matrix[order], starts, axis=0)
+                self._article_matrix = (article_ids[starts], self.normalize(sums))
+        return self._article_matrix
+
+    def search(self, query_vec, top_k=5, author_id=None):
+        """
+        Devolve uma lista de (chunk_id, article_id, score) ordenada por
+        similaridade de cosseno decrescente, com no máximo top_k elementos.
+        O article_id vem do próprio índice, sem consultas à base de dados.
+        """
+        if len(self) == 0 or top_k <= 0:
+            return []
+
+        query = np.asarray(query_vec, dtype=np.float32)
+        if query.shape[0] != self.matrix.shape[1]:
+            return []
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return []
+        query = query / norm
+
+        if author_id:
+            candidates = np.flatnonzero(self.author_ids == int(author_id))
+            if candidates.size == 0:
+                return []
+            scores = self.matrix[candidates] @ query
+        else:
+            candidates = None
+            scores = self.matrix @ query
+
+        k = min(top_k, scores.shape[0])
+        if k < scores.shape[0]:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(scores.shape[0])
+        top = top[np.argsort(-scores[top], kind='stable')]
+
+        positions = candidates[top] if candidates is not None else top
+        return [
+            (int(self.chunk_ids[p]), int(self.article_ids[p]), float(scores[t]))
+            for p, t in zip(positions, top)
+        ]
+
+
+_lock = threading.Lock()
+_indexes = {}
+
+
+def get_index_version():
+    """
+    Versão atual do índice: o contador partilhado na cache e, se os snapshots
+    estiverem ativos, a versão apontada pelo ficheiro CURRENT (relido no
+    máximo a cada EMBEDDING_SNAPSHOT_CHECK_INTERVAL segundos). Quando um novo
+    snapshot é publicado, os leitores recarregam-no sem reiniciar o processo.
+    """
+    snapshot_version = current_version() if settings.EMBEDDING_SNAPSHOT_ENABLED else None
+    return cache.get(INDEX_VERSION_KEY, 0), snapshot_version
+
+
+def load_base_index():
+    """Índice exacto a partir do snapshot mmap, ou da base de dados como fallback"""
+    if settings.EMBEDDING_SNAPSHOT_ENABLED:
+        version, arrays = load_snapshot()
+        if arrays is not None:
+            return ExactVectorIndex.from_snapshot(arrays)
+    return ExactVectorIndex.from_database()
+
+
+def get_corpus_fingerprint():
+    """Identifica o estado da tabela de chunks (nº de linhas e último id)"""
+    stats = ArticleChunk.objects.exclude(embedding__isnull=True).aggregate(
+        count=Count('id'), last_id=Max('id')
+    )
+    return f"{stats['count']}:{stats['last_id'] or 0}"
+
+
+def get_ivf_index_path():
+    return os.path.join(settings.SEARCH_INDEX_DIR, 'ivf_index.npz')
+
+
+def ivf_enabled():
+    """Algum consumidor (pesquisa, RAG, recomendações) usa o backend IVF"""
+    return 'ivf' in {settings.SEARCH_INDEX_BACKEND, *settings.SEARCH_INDEX_BACKENDS.values()}
+
+
+def publish_ivf_index(force=False):
+    """
+    Treina o índice IVF sobre os chunks atuais e persiste-o em disco, para
+    que os processos que servem pesquisa só o tenham de carregar. Chamado
+    uma vez pela indexação (tarefa ou comando), nunca por pedido. Se o
+    índice persistido já corresponde aos chunks atuais, não faz nada.
+    Devolve True quando publica um índice novo.
+    """
+    from .ann_index import IVFVectorIndex
+
+    path = get_ivf_index_path()
+    fingerprint = get_corpus_fingerprint()
+    if not force and _read_ivf_fingerprint(path) == fingerprint:
+        return False
+
+    index = IVFVectorIndex.build(
+        ExactVectorIndex.from_database(),
+        nlist=settings.SEARCH_IVF_NLIST,
+        nprobe=settings.SEARCH_IVF_NPROBE,
+    )
+    index.save(path, fingerprint=fingerprint)
+    # Os processos que entretanto caíram no índice exacto passam a carregar este
+    invalidate_vector_index()
+    return True
+
+
+def _read_ivf_fingerprint(path):
+    try:
+        with np.load(path) as data:
+            return str(data['fingerprint'])
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def build_vector_index(backend):
+    """
+    Constrói o índice do backend pedido ('exact' ou 'ivf').
+    O backend IVF só carrega a forma persistida em disco por
+    publish_ivf_index; enquanto esta não corresponder ao estado atual dos
+    chunks, o processo serve o índice exacto em vez de treinar o k-means.
+    """
+    if backend == 'exact':
+        return load_base_index()
+
+    if backend == 'ivf':
+        from .ann_index import IVFVectorIndex
+        path = get_ivf_index_path()
+        if os.path.exists(path):
+            try:
+                index, saved_fingerprint = IVFVectorIndex.load(path, nprobe=settings.SEARCH_IVF_NPROBE)
+                if saved_fingerprint == get_corpus_fingerprint():
+                    return index
+            except (OSError, ValueError, KeyError) as e:
+                print(f"[VectorIndex] Falha ao carregar índice IVF persistido: {e}")
+        print("[VectorIndex] Índice IVF ausente ou desatualizado; a usar o índice exacto até à próxima publicação.")
+        return load_base_index()
+
+    raise ValueError(f"Backend de pesquisa vetorial desconhecido: {backend}")
+
+
+def get_vector_index(backend=None):
+    """
+    Devolve o índice do processo para o backend indicado (por omissão
+    settings.SEARCH_INDEX_BACKEND), reconstruindo-o quando a versão partilhada
+    (guardada na cache do Django) foi incrementada por outro processo.
+    """
+    backend = backend or settings.SEARCH_INDEX_BACKEND
+    version = get_index_version()
+    cached = _indexes.get(backend)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    with _lock:
+        cached = _indexes.get(backend)
+        if cached is None or cached[0] != version:
+            cached = (version, build_vector_index(backend))
+            _indexes[backend] = cached
+        return cached[1]
+
+
+def invalidate_vector_index():
+    """Marca o índice como desatualizado em todos os processos"""
+    try:
+        cache.incr(INDEX_VERSION_KEY)
+    except ValueError:
+        # Chave perdida (cache limpa/reiniciada): recomeçar num valor único, para
+        # nunca repetir uma versão que algum processo ainda tenha em memória
+        cache.set(INDEX_VERSION_KEY, time.time_ns(), None)
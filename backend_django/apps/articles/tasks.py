@@ -1,37 +1,129 @@
 
 from celery import shared_task
-from .models import Article, ArticleChunk
-from .services.ai_service import AIService
+from django.conf import settings
+from django.core.cache import cache
+from .models import Article
+from .services.ai_service import get_ai_service
+from .services.bm25_index import index_article
+from .services.indexing_service import sync_article_chunks
+from .services.vector_index import invalidate_vector_index, ivf_enabled, publish_ivf_index
+from .services.embedding_snapshot import write_snapshot
 from django.utils.text import Truncator
 
 @shared_task
-def index_article_task(article_id):
+def index_article_task(article_id, refresh_snapshot=True, search_only=False):
     """
     Tarefa assíncrona para:
-    1. Limpar chunks antigos
-    2. Segmentar texto (Chunking)
-    3. Gerar Embeddings
+    0. Atualizar o documento BM25 do artigo (retirado se não estiver
+       publicado); com `search_only` fica por aqui
+    1. Segmentar texto (Chunking)
+    2. Reutilizar os embeddings dos chunks inalterados (hash do conteúdo)
+    3. Gerar Embeddings em lote apenas para chunks novos ou alterados
+    4. Invalidar o índice vetorial em memória
+    5. Regenerar o snapshot mmap de embeddings (opcional)
+    6. Retreinar o índice IVF persistido (se algum backend o usar)
+    7. Atualizar os artigos relacionados (embeddings novos)
+    Se o conteúdo não mudou desde a última indexação, não faz nada.
     """
     article = Article.objects.get(id=article_id)
-    ArticleChunk.objects.filter(article=article).delete()
-    
-    ai = AIService()
-    text = article.content
-    
-    # Chunking simples por parágrafos/tamanho (aprox 1000 chars)
-    # Em produção usaríamos RecursiveCharacterTextSplitter
-    chunks = [text[i:i+1000] for i in range(0, len(text), 800)]
+    index_article(article)
+    if search_only:
+        return f"Índice de pesquisa do artigo {article_id} atualizado."
+
+    ai = get_ai_service()
+    stats = sync_article_chunks(article, ai)
+    if not stats['changed']:
+        return f"Artigo {article_id} inalterado desde a última indexação."
     
-    for content in chunks:
-        embedding = ai.generate_embedding(content)
-        ArticleChunk.objects.create(
-            article=article,
-            content=content,
-            token_count=len(content.split()),
-            embedding=embedding
-        )
+    # Forçar a reconstrução do índice vetorial em todos os processos
+    invalidate_vector_index()
+    if refresh_snapshot and settings.EMBEDDING_SNAPSHOT_ENABLED:
+        schedule_embedding_snapshot()
+    if ivf_enabled():
+        build_ivf_index_task.delay()
+    if article.is_published:
+        compute_related_articles_task.delay(article_id)
     
-    return f"Artigo {article_id} indexado com {len(chunks)} chunks."
+    return (f"Artigo {article_id} indexado com {stats['total']} chunks "
+            f"({stats['embedded']} novos, {stats['reused']} reutilizados).")
+
+SNAPSHOT_PENDING_KEY = 'embeddings:snapshot:pending'
+
+def schedule_embedding_snapshot():
+    """
+    Agenda um snapshot para daqui a EMBEDDING_SNAPSHOT_DEBOUNCE segundos, se
+    ainda não houver um pendente: as indexações entretanto juntam-se a ele,
+    em vez de cada uma reescrever todos os chunks.
+    """
+    debounce = settings.EMBEDDING_SNAPSHOT_DEBOUNCE
+    # A chave expira sozinha se a tarefa se perder, para não bloquear os snapshots seguintes
+    if cache.add(SNAPSHOT_PENDING_KEY, True, timeout=debounce + 300):
+        write_embedding_snapshot_task.apply_async(countdown=debounce)
+
+@shared_task
+def write_embedding_snapshot_task():
+    """
+    Publica um novo snapshot dos embeddings (escrita + rename atómico).
+    Os processos que servem pesquisa detetam a nova versão em até
+    EMBEDDING_SNAPSHOT_CHECK_INTERVAL segundos.
+    """
+    # Libertado antes de ler os chunks: uma indexação a partir daqui agenda outro snapshot
+    cache.delete(SNAPSHOT_PENDING_KEY)
+    version = write_snapshot()
+    return f"Snapshot de embeddings {version} publicado."
+
+@shared_task
+def build_ivf_index_task():
+    """
+    Treina e persiste o índice IVF uma única vez, num worker; os processos
+    que servem pesquisa limitam-se a carregá-lo. Tarefas repetidas para o
+    mesmo estado dos chunks não voltam a treinar.
+    """
+    if publish_ivf_index():
+        return "Índice IVF publicado."
+    return "Índice IVF já atualizado."
+
+@shared_task
+def compute_related_articles_task(article_id=None):
+    """
+    Pré-calcula os artigos relacionados (RelatedArticle). Sem `article_id`
+    reconstrói a tabela toda (agendado todas as noites); com `article_id`
+    atualiza só o artigo publicado e os seus vizinhos.
+    """
+    from .services import related_articles
+
+    if article_id is None:
+        count = related_articles.rebuild()
+        return f"{count} ligações entre artigos relacionados recalculadas."
+    count = related_articles.refresh_article(article_id)
+    return f"{count} ligações atualizadas para o artigo {article_id}."
+
+@shared_task
+def prewarm_ai_results_task(article_id):
+    """
+    Pré-gera insight, sumário e glossário do artigo publicado, para que o
+    primeiro leitor já os receba da cache. Resultados existentes são reutilizados.
+    """
+    from .services import ai_result_cache
+
+    article = Article.objects.get(id=article_id)
+    ai = get_ai_service()
+    generators = {
+        'insight': ai.generate_insight,
+        'summary': ai.generate_summary,
+        'glossary': ai.generate_glossary,
+    }
+    for kind, generate in generators.items():
+        ai_result_cache.cached_result(kind, article.content, generate, article=article)
+    return f"Resultados de IA do artigo {article_id} pré-gerados."
+
+@shared_task
+def evict_ai_results_task():
+    """Remove resultados de IA antigos ou em excesso (AI_RESULT_CACHE_MAX_*)"""
+    from .services import ai_result_cache
+
+    deleted = ai_result_cache.evict()
+    return f"{deleted} resultados de IA removidos da cache."
 
 @shared_task
 def generate_editorial_nlp_task(article_id, tool_type):
@@ -39,7 +131,7 @@ def generate_editorial_nlp_task(article_id, tool_type):
     Gera conteúdo editorial (Abstract, Keywords, APA) via IA
     """
     article = Article.objects.get(id=article_id)
-    ai = AIService()
+    ai = get_ai_service()
     
     prompts = {
         'abstract': "Gere um abstract científico formal em Português para o seguinte artigo...",
@@ -48,7 +140,7 @@ def generate_editorial_nlp_task(article_id, tool_type):
     }
     
     prompt = f"{prompts.get(tool_type, 'Analise:')}\n\n{article.content}"
-    response = ai.model.generate_content(prompt)
+    response = ai.generate_content(prompt)
     
     # Log da sugestão para auditoria no Admin
     from .models import AISuggestion
@@ -0,0 +1,686 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import pytest
+from unittest.mock import AsyncMock, patch
+from asgiref.sync import async_to_sync
+from google.api_core import exceptions as api_exceptions
+from django.test import RequestFactory
+from rest_framework.test import APIClient
+from django.core.cache import cache
+from django.contrib.auth.models import User
+from django.utils import timezone
+from apps.articles.async_views import AsyncAIInsightView, AsyncAIRAGChatView
+from apps.articles.models import AIResult, Article, ArticleChunk
+from apps.articles.services import ai_result_cache
+from apps.articles.tasks import index_article_task, prewarm_ai_results_task
+from apps.articles.services.ai_service import AIBusyError, AIService, get_ai_service, reset_ai_service
+from apps.articles.services.async_ai_service import AsyncAIService, close_async_session
+from apps.articles.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from apps.articles.services.embedding_cache import QueryEmbeddingCache, get_query_embedding_cache
+from apps.articles.services.rate_limiter import RateLimitExceeded, TokenBucket
+from apps.articles.services.single_flight import SingleFlight, SingleFlightError
+
+
+@pytest.fixture
+def ai_service(settings):
+    settings.GEMINI_API_KEY = 'test-key'
+    cache.clear()
+    get_query_embedding_cache().clear()
+    reset_ai_service()
+    with patch('apps.articles.services.ai_service.genai.configure'), \
+         patch('apps.articles.services.ai_service.genai.GenerativeModel'):
+        yield get_ai_service()
+    reset_ai_service()
+
+
+class TestQueryEmbeddingCache:
+    def setup_method(self):
+        cache.clear()
+
+    def test_key_normalizes_query_and_includes_model(self):
+        query_cache = QueryEmbeddingCache()
+        assert query_cache.make_key('  Buracos   Negros ', 'm1') == query_cache.make_key('buracos negros', 'm1')
+        assert query_cache.make_key('buracos negros', 'm1') != query_cache.make_key('buracos negros', 'm2')
+
+    def test_lru_eviction(self):
+        query_cache = QueryEmbeddingCache(max_entries=2, shared_ttl=0)
+        for key in ('a', 'b', 'c'):
+            query_cache.set(key, [1.0])
+        assert query_cache.get('a') is None
+        assert query_cache.get('c').tolist() == [1.0]
+        assert query_cache.stats()['size'] == 2
+
+    def test_expired_local_entry_falls_back_to_shared_tier(self):
+        query_cache = QueryEmbeddingCache(ttl=0)
+        query_cache.set('k', [0.5, 0.25])
+        assert query_cache.get('k').tolist() == [0.5, 0.25]
+        stats = query_cache.stats()
+        assert stats['shared_hits'] == 1 and stats['local_hits'] == 0
+
+
+class TestQueryEmbedding:
+    def test_repeated_queries_skip_the_network(self, ai_service):
+        with patch('apps.articles.services.ai_service.genai.embed_content',
+                   return_value={'embedding': [0.1, 0.2]}) as embed:
+            assert ai_service.get_query_embedding('Fotossíntese') == pytest.approx([0.1, 0.2])
+            assert ai_service.get_query_embedding('  fotossíntese ') == pytest.approx([0.1, 0.2])
+        assert embed.call_count == 1
+        assert AIService.query_embedding_cache_stats()['local_hits'] == 1
+
+    def test_errors_are_not_cached(self, ai_service):
+        with patch('apps.articles.services.ai_service.genai.embed_content', side_effect=RuntimeError('boom')) as embed:
+            ai_service.get_query_embedding('quasar')
+            ai_service.get_query_embedding('quasar')
+        assert embed.call_count == 2
+
+
+class TestBatchedEmbeddings:
+    def test_texts_are_sent_in_batches(self, ai_service):
+        def fake_embed(model, content, task_type):
+            return {'embedding': [[float(len(text))] for text in content]}
+
+        with patch('apps.articles.services.ai_service.genai.embed_content', side_effect=fake_embed) as embed:
+            vectors = ai_service.generate_embeddings(['a', 'bb', 'ccc', 'dddd', 'eeeee'], batch_size=2)
+        assert embed.call_count == 3
+        assert vectors == [[1.0], [2.0], [3.0], [4.0], [5.0]]
+
+    def test_own_rate_limiter_replaces_the_shared_quota(self, ai_service):
+        local = TokenBucket.per_minute(6000)
+        with patch('apps.articles.services.ai_service.genai.embed_content',
+                   side_effect=lambda model, content, task_type: {'embedding': [[1.0]] * len(content)}), \
+             patch.object(local, 'acquire', wraps=local.acquire) as own, \
+             patch.object(ai_service.rate_limiters['embed'], 'acquire') as shared:
+            ai_service.generate_embeddings(['a', 'b'], batch_size=1, rate_limiter=local)
+        # Um só limite por pedido: o --rpm do index_corpus é o ritmo efetivo
+        assert own.call_count == 2
+        shared.assert_not_called()
+
+    def test_failed_batch_yields_none(self, ai_service):
+        with patch('apps.articles.services.ai_service.genai.embed_content', side_effect=RuntimeError('429')):
+            assert ai_service.generate_embeddings(['a', 'b'], batch_size=1) == [None, None]
+
+
+class TestAIServiceRegistry:
+    @pytest.fixture(autouse=True)
+    def fresh_registry(self, settings):
+        settings.GEMINI_API_KEY = 'test-key'
+        reset_ai_service()
+        with patch('apps.articles.services.ai_service.genai.configure') as configure, \
+             patch('apps.articles.services.ai_service.genai.GenerativeModel') as model:
+            self.configure, self.model = configure, model
+            yield
+        reset_ai_service()
+
+    def test_client_is_built_once_per_process(self):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            services = list(pool.map(lambda _: get_ai_service(), range(32)))
+        assert all(service is services[0] for service in services)
+        assert self.configure.call_count == 1
+        assert self.model.call_count == 1
+
+    def test_concurrency_limit(self, settings):
+        settings.AI_MAX_CONCURRENT_REQUESTS = 2
+        settings.AI_CONCURRENCY_TIMEOUT = 0.01
+        ai = get_ai_service()
+        with ai.request_slot(), ai.request_slot():
+            with pytest.raises(AIBusyError):
+                with ai.request_slot():
+                    pass
+            # Sem vaga, o leitor recebe a resposta de recurso sem chamar o Gemini
+            assert ai.generate_insight('Texto') == AIService.INSIGHT_ERROR_MESSAGE
+            ai.model.generate_content.assert_not_called()
+
+        ai.model.generate_content.return_value.text = 'Insight'
+        assert ai.generate_insight('Texto') == 'Insight'
+
+
+class FakeRedis:
+    """Subconjunto do cliente Redis usado pelo SingleFlight (sem expiração)"""
+
+    enabled = True
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, nx=False, px=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def pttl(self, key):
+        return 1000 if key in self.data else -2
+
+    def eval(self, script, numkeys, key, token):
+        if self.data.get(key) == token:
+            del self.data[key]
+            return 1
+        return 0
+
+
+class TestSingleFlight:
+    def _concurrent(self, fn, callers=8):
+        """Executa `fn` em `callers` threads; o Gemini falso só responde quando todas esperam"""
+        with ThreadPoolExecutor(max_workers=callers) as pool:
+            futures = [pool.submit(fn) for _ in range(callers)]
+            return [future.result() for future in futures]
+
+    def _blocking_model(self, ai, callers=8, **kwargs):
+        def generate_content(prompt, **_):
+            # O líder só termina quando os restantes pedidos já estão à espera dele
+            while ai.single_flight_stats()['shared'] < callers - 1:
+                time.sleep(0.01)
+            if 'side_effect' in kwargs:
+                raise kwargs['side_effect']
+            return type('Response', (), {'text': kwargs.get('text')})()
+
+        ai.model.generate_content.side_effect = generate_content
+
+    def test_identical_requests_share_one_call(self, ai_service):
+        self._blocking_model(ai_service, text='Insight')
+        results = self._concurrent(lambda: ai_service.generate_insight('Texto'))
+        assert results == ['Insight'] * 8
+        assert ai_service.model.generate_content.call_count == 1
+        assert ai_service.single_flight_stats() == {'leaders': 1, 'shared': 7, 'remote_shared': 0, 'in_flight': 0}
+
+    def test_error_is_shared_not_retried(self, ai_service):
+        self._blocking_model(ai_service, side_effect=RuntimeError('429 Resource exhausted'))
+        results = self._concurrent(lambda: ai_service.generate_insight('Texto'))
+        assert results == [AIService.INSIGHT_ERROR_MESSAGE] * 8
+        assert ai_service.model.generate_content.call_count == 1
+
+    def test_different_prompts_are_not_coalesced(self, ai_service):
+        ai_service.model.generate_content.return_value.text = 'Texto'
+        ai_service.generate_insight('A')
+        ai_service.generate_summary('A')
+        assert ai_service.model.generate_content.call_count == 2
+
+    def test_result_is_shared_across_processes(self):
+        redis = FakeRedis()
+        first, second = SingleFlight(redis=redis), SingleFlight(redis=redis)
+        assert first.do('k', lambda: {'text': 'resposta'}) == {'text': 'resposta'}
+        # Lock libertado, resultado publicado para quem ainda esperava
+        assert 'singleflight:lock:k' not in redis.data
+        assert second.do('k', lambda: pytest.fail('Gemini chamado duas vezes')) == {'text': 'resposta'}
+        assert second.stats()['remote_shared'] == 1
+
+    def test_waits_for_leader_in_other_process(self):
+        redis = FakeRedis()
+        redis.set('singleflight:lock:k', 'outro-processo')
+        waiter = SingleFlight(redis=redis, poll_interval=0.01)
+        error = {'error': '429 Resource exhausted', 'token': 'outro-processo', 'status': 429, 'throttled': False}
+        timer = threading.Timer(0.05, lambda: redis.set('singleflight:result:k', json.dumps(error)))
+        timer.start()
+        with pytest.raises(SingleFlightError) as raised:
+            waiter.do('k', lambda: pytest.fail('Gemini chamado duas vezes'))
+        timer.join()
+        # Classificado como o erro original (quota), não como um erro genérico
+        assert AIService.is_quota_error(raised.value)
+        assert AIService.rag_error_message(raised.value) == AIService.RAG_QUOTA_MESSAGE
+
+    def test_failure_is_not_cached_for_later_callers(self):
+        redis = FakeRedis()
+        leader = SingleFlight(redis=redis)
+
+        def throttled():
+            raise RateLimitExceeded('quota local')
+
+        with pytest.raises(RateLimitExceeded):
+            leader.do('k', throttled)
+        assert json.loads(redis.data['singleflight:result:k'])['throttled'] is True
+        # Lock já libertado: quem chega agora não esperou por aquele líder e tenta de novo
+        assert SingleFlight(redis=redis).do('k', lambda: 'recuperado') == 'recuperado'
+
+    def test_falls_back_to_direct_call_after_timeout(self):
+        redis = FakeRedis()
+        redis.set('singleflight:lock:k', 'outro-processo')
+        waiter = SingleFlight(redis=redis, wait_timeout=0.05, poll_interval=0.01)
+        assert waiter.do('k', lambda: 'direto') == 'direto'
+
+    def test_async_callers_share_one_call_without_threads(self):
+        single_flight, calls = SingleFlight(), []
+
+        async def generate():
+            calls.append(threading.current_thread())
+            await asyncio.sleep(0.05)
+            return 'Insight'
+
+        async def main():
+            return await asyncio.gather(*(single_flight.do_async('k', generate) for _ in range(10)))
+
+        assert asyncio.run(main()) == ['Insight'] * 10
+        # A chamada do líder corre no event loop (thread principal)
+        assert calls == [threading.main_thread()]
+        assert single_flight.stats() == {'leaders': 1, 'shared': 9, 'remote_shared': 0, 'in_flight': 0}
+
+    def test_async_error_reaches_waiters_then_is_forgotten(self):
+        single_flight = SingleFlight()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise RuntimeError('503 Service Unavailable')
+
+        async def recovered():
+            return 'ok'
+
+        async def main():
+            results = await asyncio.gather(*(single_flight.do_async('k', failing) for _ in range(3)),
+                                           return_exceptions=True)
+            return results, await single_flight.do_async('k', recovered)
+
+        results, later = asyncio.run(main())
+        assert [str(result) for result in results] == ['503 Service Unavailable'] * 3
+        assert later == 'ok'
+
+    def test_async_result_is_shared_with_sync_callers_across_processes(self):
+        redis = FakeRedis()
+
+        async def generate():
+            return {'text': 'resposta'}
+
+        assert asyncio.run(SingleFlight(redis=redis).do_async('k', generate)) == {'text': 'resposta'}
+        assert 'singleflight:lock:k' not in redis.data
+        assert SingleFlight(redis=redis).do('k', lambda: pytest.fail('Gemini chamado duas vezes')) == {'text': 'resposta'}
+
+    def test_async_waits_for_leader_in_other_process(self):
+        redis = FakeRedis()
+        redis.set('singleflight:lock:k', 'outro-processo')
+        waiter = SingleFlight(redis=redis, poll_interval=0.01)
+
+        async def main():
+            asyncio.get_running_loop().call_later(
+                0.05, redis.set, 'singleflight:result:k', json.dumps({'result': 'partilhado'})
+            )
+            return await waiter.do_async('k', pytest.fail)
+
+        assert asyncio.run(main()) == 'partilhado'
+        assert waiter.stats()['remote_shared'] == 1
+
+
+class TestCircuitBreaker:
+    def test_opens_after_consecutive_failures_then_probes(self):
+        now = [0.0]
+        breaker = CircuitBreaker('gemini', failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+        for _ in range(2):
+            breaker.before_call()
+            breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+        now[0] = 10
+        breaker.before_call()  # pedido de teste
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+
+        now[0] = 20
+        breaker.before_call()
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert breaker.stats()['opened'] == 2 and breaker.stats()['rejected'] == 2
+
+    def test_open_state_is_shared_through_redis(self):
+        redis = FakeRedis()
+        first = CircuitBreaker('gemini', failure_threshold=1, redis=redis)
+        second = CircuitBreaker('gemini', failure_threshold=1, redis=redis)
+        first.record_failure()
+        with pytest.raises(CircuitOpenError):
+            second.before_call()
+        assert second.stats()['state'] == CircuitBreaker.OPEN
+
+
+class TestGeminiGuards:
+    @pytest.fixture(autouse=True)
+    def guarded(self, settings, ai_service):
+        settings.AI_CIRCUIT_FAILURE_THRESHOLD = 2
+        settings.AI_RATE_LIMIT_WAIT = 0
+        reset_ai_service()
+        self.ai = get_ai_service()
+        self.ai.model.generate_content.side_effect = api_exceptions.ServiceUnavailable('Service Unavailable')
+
+    def test_open_circuit_serves_fallback_without_calling_gemini(self):
+        for _ in range(2):
+            assert self.ai.generate_insight('Texto') == AIService.INSIGHT_ERROR_MESSAGE
+        assert self.ai.circuit_breakers['generate'].state == CircuitBreaker.OPEN
+
+        assert self.ai.generate_summary('Texto') == AIService.SUMMARY_ERROR_MESSAGE
+        assert self.ai.rag_chat('Pergunta', [])['text'] == AIService.RAG_QUOTA_MESSAGE
+        assert self.ai.model.generate_content.call_count == 2
+        # A quota de embeddings tem o seu próprio circuito
+        assert self.ai.circuit_breakers['embed'].state == CircuitBreaker.CLOSED
+
+    def test_invalid_requests_do_not_open_the_circuit(self):
+        self.ai.model.generate_content.side_effect = api_exceptions.InvalidArgument('Invalid argument')
+        for _ in range(3):
+            self.ai.generate_insight('Texto')
+        assert self.ai.circuit_breakers['generate'].state == CircuitBreaker.CLOSED
+
+    def test_quota_error_drains_the_bucket(self):
+        self.ai.model.generate_content.side_effect = api_exceptions.ResourceExhausted('Resource exhausted')
+        with patch('time.sleep') as sleep:
+            assert self.ai.rag_chat('Pergunta', [])['text'] == AIService.RAG_QUOTA_MESSAGE
+        sleep.assert_not_called()
+        assert self.ai.model.generate_content.call_count == 1
+        # Sem tokens, o pedido seguinte é recusado localmente
+        assert self.ai.generate_insight('Outro texto') == AIService.INSIGHT_ERROR_MESSAGE
+        assert self.ai.model.generate_content.call_count == 1
+        assert self.ai.status()['rate_limiters']['generate']['throttled'] == 1
+
+    @pytest.mark.django_db
+    def test_status_endpoint_is_staff_only(self):
+        client = APIClient()
+        assert client.get('/api/ai/status/').status_code in (401, 403)
+        client.force_authenticate(User.objects.create_user('staff', password='pw', is_staff=True))
+        with patch('apps.articles.views.get_ai_service', return_value=self.ai):
+            data = client.get('/api/ai/status/').json()
+        assert set(data) == {'circuit_breakers', 'rate_limiters', 'single_flight'}
+        assert data['circuit_breakers']['generate']['state'] == CircuitBreaker.CLOSED
+
+
+def fake_embed(model, content, task_type):
+    return {'embedding': [[1.0, 0.0] for _ in content]}
+
+
+@pytest.mark.django_db
+class TestIndexArticleTask:
+    @pytest.fixture(autouse=True)
+    def article(self, settings, tmp_path):
+        settings.EMBEDDING_SNAPSHOT_DIR = str(tmp_path)
+        settings.CHUNKER = 'fixed'
+        user = User.objects.create_user(username='indexer', password='password')
+        self.article = Article.objects.create(title='Longo', content='palavra ' * 1000, author=user)
+
+    def index(self):
+        with patch('apps.articles.services.ai_service.genai.embed_content', side_effect=fake_embed) as embed:
+            index_article_task(self.article.id)
+        return embed
+
+    def test_chunks_are_embedded_in_one_request(self, ai_service):
+        assert self.index().call_count == 1
+        chunks = ArticleChunk.objects.filter(article=self.article)
+        assert chunks.count() == 10
+        assert all(chunk.vector.tolist() == [1.0, 0.0] for chunk in chunks)
+
+    def test_unchanged_content_is_skipped(self, ai_service):
+        self.index()
+        assert self.index().call_count == 0
+
+    def test_only_changed_chunks_are_embedded(self, ai_service):
+        self.index()
+        original_ids = set(ArticleChunk.objects.filter(article=self.article).values_list('id', flat=True))
+
+        self.article.content = 'palavra ' * 1000 + 'nova frase no fim'
+        self.article.save()
+        embed = self.index()
+
+        assert embed.call_count == 1
+        # O último chunk mudou e surgiu um novo; os restantes 9 são reutilizados
+        assert len(embed.call_args.kwargs['content']) == 2
+        chunks = list(ArticleChunk.objects.filter(article=self.article).order_by('position'))
+        assert [chunk.position for chunk in chunks] == list(range(11))
+        assert len(original_ids & {chunk.id for chunk in chunks}) == 9
+
+
+@pytest.mark.django_db
+class TestAIResultCache:
+    def setup_method(self):
+        cache.clear()
+
+    def post_insight(self, content, reply='Um insight.'):
+        with patch('apps.articles.views.get_ai_service') as service:
+            service.return_value.generate_insight.return_value = reply
+            response = APIClient().post('/api/ai/insight/', {'content': content}, format='json')
+        return response, service.return_value.generate_insight
+
+    def test_repeated_requests_skip_gemini(self):
+        first, generate = self.post_insight('Texto do artigo')
+        assert first.data == {'insight': 'Um insight.'}
+        assert generate.call_count == 1
+
+        second, generate = self.post_insight('Texto do artigo')
+        assert second.data == {'insight': 'Um insight.'}
+        assert generate.call_count == 0
+
+        stats = ai_result_cache.stats()
+        assert stats['entries'] == 1
+        assert stats['insight'] == {'hits': 1, 'misses': 1, 'hit_rate': 0.5}
+
+    def test_database_tier_survives_a_cache_flush(self):
+        self.post_insight('Texto do artigo')
+        cache.clear()
+        response, generate = self.post_insight('Texto do artigo')
+        assert response.data == {'insight': 'Um insight.'}
+        assert generate.call_count == 0
+        assert AIResult.objects.get().hits == 1
+
+    def test_fallback_results_are_not_cached(self):
+        self.post_insight('Texto do artigo', reply=AIService.INSIGHT_ERROR_MESSAGE)
+        _, generate = self.post_insight('Texto do artigo')
+        assert generate.call_count == 1
+        assert AIResult.objects.get().result == 'Um insight.'
+
+    def test_key_covers_sent_content_prompt_version_and_model(self):
+        limit = AIService.PROMPT_CONTENT_LIMITS['glossary']
+        key = ai_result_cache.result_key('glossary', 'a' * limit)
+        # Só o texto enviado ao modelo conta
+        assert ai_result_cache.result_key('glossary', 'a' * limit + 'resto') == key
+        assert ai_result_cache.result_key('insight', 'a' * limit) != key
+        with patch.dict(AIService.PROMPT_VERSIONS, {'glossary': 99}):
+            assert ai_result_cache.result_key('glossary', 'a' * limit) != key
+        with patch.object(AIService, 'GENERATION_MODEL', 'outro-modelo'):
+            assert ai_result_cache.result_key('glossary', 'a' * limit) != key
+
+    def test_prewarm_and_invalidate_article(self):
+        user = User.objects.create_user(username='curador', password='password')
+        article = Article.objects.create(title='Luz', content='A luz é uma onda.', author=user, status='published')
+        with patch('apps.articles.tasks.get_ai_service') as service:
+            service.return_value.generate_insight.return_value = 'Insight'
+            service.return_value.generate_summary.return_value = 'Sumário'
+            service.return_value.generate_glossary.return_value = [{'term': 'Luz', 'definition': 'Onda'}]
+            prewarm_ai_results_task(article.id)
+
+        assert set(article.ai_results.values_list('kind', flat=True)) == {'insight', 'summary', 'glossary'}
+        assert ai_result_cache.lookup('summary', article.content) == 'Sumário'
+
+        assert ai_result_cache.invalidate_article(article) == 3
+        assert ai_result_cache.lookup('summary', article.content) is None
+
+    def test_evict_least_recently_used(self):
+        for position, content in enumerate(['a', 'b', 'c']):
+            ai_result_cache.store('insight', content, f'insight {content}')
+            AIResult.objects.filter(key=ai_result_cache.result_key('insight', content)).update(
+                last_used_at=timezone.now() - timedelta(days=3 - position)
+            )
+
+        assert ai_result_cache.evict(max_entries=2, max_age_days=30) == 1
+        assert sorted(AIResult.objects.values_list('result', flat=True)) == ['insight b', 'insight c']
+        assert ai_result_cache.evict(max_entries=10, max_age_days=2) == 1
+
+
+class FakeStreamPart:
+    def __init__(self, text):
+        self.text = text
+
+
+@pytest.mark.django_db
+class TestRAGChatStreaming:
+    @pytest.fixture(autouse=True)
+    def chunks(self, ai_service):
+        self.ai_service = ai_service
+        user = User.objects.create_user(username='rag', password='password')
+        article = Article.objects.create(title='Luz', content='A luz é uma onda.', author=user, status='published')
+        self.chunk = ArticleChunk.objects.create(article=article, content='A luz é uma onda.')
+
+    def post(self, **extra):
+        client = APIClient()
+        with patch('apps.articles.services.search_service.SearchService.semantic_search', return_value=[self.chunk]):
+            return client.post('/api/ai/chat/', {'message': 'O que é a luz?'}, format='json', **extra)
+
+    @staticmethod
+    def events(response):
+        body = b''.join(response.streaming_content).decode()
+        return [
+            (block.split('\n')[0][len('event: '):], json.loads(block.split('\n')[1][len('data: '):]))
+            for block in body.strip().split('\n\n')
+        ]
+
+    def test_tokens_then_citations(self):
+        self.ai_service.model.generate_content.return_value = [FakeStreamPart('A luz '), FakeStreamPart('é uma onda.')]
+        with patch('apps.articles.views.get_ai_service', return_value=self.ai_service):
+            response = self.post(HTTP_ACCEPT='text/event-stream')
+
+        assert response['Content-Type'] == 'text/event-stream'
+        events = self.events(response)
+        assert events[:2] == [('token', {'text': 'A luz '}), ('token', {'text': 'é uma onda.'})]
+        assert events[-1][0] == 'citations'
+        assert events[-1][1]['citations'] == [{'article_id': self.chunk.article_id, 'chunk_id': self.chunk.id}]
+        self.ai_service.model.generate_content.assert_called_once()
+        assert self.ai_service.model.generate_content.call_args.kwargs == {'stream': True}
+
+    def test_quota_error_is_reported_without_retrying(self):
+        self.ai_service.model.generate_content.side_effect = RuntimeError('429 Resource exhausted')
+        with patch('apps.articles.views.get_ai_service', return_value=self.ai_service), \
+             patch('time.sleep') as sleep:
+            events = self.events(self.post(QUERY_STRING='stream=1'))
+
+        assert events == [('error', {'text': AIService.RAG_QUOTA_MESSAGE})]
+        sleep.assert_not_called()
+
+
+@pytest.fixture
+def fake_gemini(settings):
+    """Servidor Gemini falso (aiohttp.web) no event loop do teste"""
+    from aiohttp import web
+
+    async def handler(request):
+        model, _, method = request.match_info['name'].partition(':')
+        request.app['calls'].append((method, await request.json()))
+        await asyncio.sleep(request.app['delay'])
+        if method == 'embedContent':
+            return web.json_response({"embedding": {"values": [0.5, 0.5]}})
+        candidate = lambda text: {"candidates": [{"content": {"parts": [{"text": text}]}}]}
+        if method == 'streamGenerateContent':
+            response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+            await response.prepare(request)
+            for text in ('A luz ', 'é uma onda.'):
+                await response.write(f"data: {json.dumps(candidate(text))}\r\n\r\n".encode())
+            return response
+        return web.json_response(candidate(request.app['reply']))
+
+    async def start(reply='Insight.', delay=0):
+        app = web.Application()
+        app['calls'], app['reply'], app['delay'] = [], reply, delay
+        app.router.add_post('/v1beta/models/{name}', handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        settings.GEMINI_API_BASE_URL = f"http://127.0.0.1:{runner.addresses[0][1]}/v1beta"
+        return app, runner
+
+    settings.GEMINI_API_KEY = 'test-key'
+    # Quotas folgadas: o servidor falso não tem limites
+    settings.AI_GENERATION_RPM = settings.AI_EMBEDDING_RPM = 60000
+    reset_ai_service()
+    yield start
+    reset_ai_service()
+
+
+class TestAsyncAIService:
+    def run(self, fake_gemini, scenario, reply='Insight.', delay=0):
+        async def main():
+            app, runner = await fake_gemini(reply, delay)
+            try:
+                return app['calls'], await scenario(AsyncAIService())
+            finally:
+                await close_async_session()
+                await runner.cleanup()
+
+        return asyncio.run(main())
+
+    def test_concurrent_generation_shares_the_event_loop(self, fake_gemini):
+        async def scenario(ai):
+            return await asyncio.gather(*(ai.generate_insight(f"Artigo {i}") for i in range(20)))
+
+        calls, insights = self.run(fake_gemini, scenario)
+        assert insights == ['Insight.'] * 20
+        assert len(calls) == 20 and all(method == 'generateContent' for method, _ in calls)
+
+    def test_identical_generations_share_one_call(self, fake_gemini):
+        async def scenario(ai):
+            return await asyncio.gather(*(ai.generate_insight('Artigo') for _ in range(10)))
+
+        calls, insights = self.run(fake_gemini, scenario, delay=0.2)
+        assert insights == ['Insight.'] * 10
+        assert len(calls) == 1
+        assert get_ai_service().single_flight_stats()['shared'] == 9
+
+    def test_glossary_requests_json(self, fake_gemini):
+        async def scenario(ai):
+            return await ai.generate_glossary('Fotossíntese')
+
+        calls, terms = self.run(fake_gemini, scenario, reply='[{"term": "Clorofila", "definition": "Pigmento"}]')
+        assert terms == [{'term': 'Clorofila', 'definition': 'Pigmento'}]
+        assert calls[0][1]['generationConfig'] == {'responseMimeType': 'application/json'}
+
+    def test_rag_stream_yields_tokens_then_citations(self, fake_gemini):
+        chunk = ArticleChunk(id=7, article_id=3, content='A luz é uma onda.')
+
+        async def scenario(ai):
+            return [event async for event in ai.rag_chat_stream('O que é a luz?', [chunk])]
+
+        calls, events = self.run(fake_gemini, scenario)
+        assert events[:2] == [('token', {'text': 'A luz '}), ('token', {'text': 'é uma onda.'})]
+        assert events[2] == ('citations', {'citations': [{'article_id': 3, 'chunk_id': 7}], 'confidence': 0.95})
+        assert calls[0][0] == 'streamGenerateContent'
+
+    def test_errors_fall_back_to_the_sync_messages(self, settings):
+        settings.GEMINI_API_KEY = 'test-key'
+        settings.GEMINI_API_BASE_URL = 'http://127.0.0.1:9/v1beta'
+
+        async def main():
+            try:
+                return await AsyncAIService().generate_summary('Texto')
+            finally:
+                await close_async_session()
+
+        assert asyncio.run(main()) == AIService.SUMMARY_ERROR_MESSAGE
+
+
+class TestAsyncAIViews:
+    def test_rag_chat_json_contract(self):
+        ai = AsyncMock()
+        ai.get_query_embedding.return_value = [0.1, 0.2]
+        ai.rag_chat.return_value = {'text': 'Resposta', 'citations': [], 'confidence': 0.95}
+        request = RequestFactory().post('/api/ai/chat/', {'message': 'Olá'}, content_type='application/json')
+        with patch('apps.articles.async_views.AsyncAIService', return_value=ai), \
+             patch.object(AsyncAIRAGChatView, 'retrieve', return_value=[]) as retrieve:
+            response = async_to_sync(AsyncAIRAGChatView.as_view())(request)
+
+        assert response.status_code == 200
+        assert json.loads(response.content) == {'text': 'Resposta', 'citations': [], 'confidence': 0.95}
+        retrieve.assert_called_once_with([0.1, 0.2])
+
+    def test_applies_the_sync_view_authentication(self):
+        request = RequestFactory().post(
+            '/api/ai/insight/', {'content': 'Texto'}, content_type='application/json',
+            HTTP_AUTHORIZATION='Bearer token-invalido'
+        )
+        with patch('apps.articles.async_views.AsyncAIService') as ai:
+            response = async_to_sync(AsyncAIInsightView.as_view())(request)
+        assert response.status_code == 401
+        ai.assert_not_called()
+
+    def test_missing_message_is_rejected(self):
+        request = RequestFactory().post('/api/ai/chat/', {}, content_type='application/json')
+        response = async_to_sync(AsyncAIRAGChatView.as_view())(request)
+        assert response.status_code == 400
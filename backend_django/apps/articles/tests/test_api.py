@@ -1,7 +1,19 @@
+import json
+import uuid
+from decimal import Decimal
 import pytest
-from rest_framework.test import APIClient
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
 from django.contrib.auth.models import User
-from apps.articles.models import Article, Category
+from datetime import timedelta
+from django.core.cache import cache
+from django.utils import timezone
+from apps.articles.models import Article, Bookmark, Category, Comment, UserLike
+from apps.articles.renderers import ORJSONRenderer
+from apps.articles.serializers import ArticleListRowSerializer, ArticleListSerializer
+from apps.articles.services import response_cache
+from apps.articles.services.bm25_index import index_article
 
 @pytest.mark.django_db
 class TestArticleAPI:
@@ -38,3 +50,294 @@ class TestArticleAPI:
         response = self.client.post(url, data, format='json')
         assert response.status_code == 201
         assert response.data['message'] == 'Great article!'
+
+
+@pytest.mark.django_db
+class TestUserArticleFlags:
+    def setup_method(self):
+        self.client = APIClient()
+        self.reader = User.objects.create_user(username='leitor', password='password')
+        self.author = User.objects.create_user(username='autora', password='password')
+        self.category = Category.objects.create(name='Tech', slug='tech')
+        self.articles = [self.create_article(i) for i in range(3)]
+        Bookmark.objects.create(user=self.reader, article=self.articles[0])
+        UserLike.objects.create(user=self.reader, article=self.articles[1])
+        self.client.force_authenticate(self.reader)
+
+    def create_article(self, i):
+        return Article.objects.create(
+            title=f'Artigo {i}', content='Conteúdo', author=self.author, category=self.category, status='published'
+        )
+
+    def flags(self, results):
+        return {item['id']: (item['is_bookmarked'], item['is_liked']) for item in results}
+
+    def test_list_flags(self):
+        response = self.client.get('/api/articles/')
+        assert self.flags(response.data['results']) == {
+            self.articles[0].id: (True, False),
+            self.articles[1].id: (False, True),
+            self.articles[2].id: (False, False),
+        }
+
+    def test_list_query_count_does_not_grow_with_page_size(self, django_assert_num_queries):
+        with django_assert_num_queries(5):
+            self.client.get('/api/articles/')
+        for i in range(3, 12):
+            self.create_article(i)
+        # Contagem, página, tags, bookmarks e likes
+        with django_assert_num_queries(5):
+            response = self.client.get('/api/articles/')
+        assert len(response.data['results']) == 12
+
+    def test_detail_flags(self):
+        response = self.client.get(f'/api/articles/{self.articles[1].slug}/')
+        assert (response.data['is_bookmarked'], response.data['is_liked']) == (False, True)
+
+    def test_anonymous_flags_are_false_without_queries(self, django_assert_num_queries):
+        self.client.force_authenticate(None)
+        with django_assert_num_queries(3):
+            response = self.client.get('/api/articles/')
+        assert set(self.flags(response.data['results']).values()) == {(False, False)}
+
+    def test_bookmark_list_query_count_is_constant(self, django_assert_max_num_queries):
+        for article in self.articles[1:]:
+            Bookmark.objects.create(user=self.reader, article=article)
+        with django_assert_max_num_queries(5):
+            response = self.client.get('/api/bookmarks/')
+        items = response.data['results'] if isinstance(response.data, dict) else response.data
+        assert {item['article']['id']: (item['article']['is_bookmarked'], item['article']['is_liked']) for item in items} == {
+            self.articles[0].id: (True, False),
+            self.articles[1].id: (True, True),
+            self.articles[2].id: (True, False),
+        }
+
+
+@pytest.mark.django_db
+class TestArticleResponseCache:
+    def setup_method(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='autora', password='password')
+        self.category = Category.objects.create(name='Tech', slug='tech')
+        self.article = Article.objects.create(
+            title='Original', content='Conteúdo', author=self.user, category=self.category, status='published'
+        )
+        self.detail_url = f'/api/articles/{self.article.slug}/'
+
+    def test_anonymous_hits_do_not_touch_the_database(self, django_assert_num_queries):
+        first = self.client.get('/api/articles/')
+        with django_assert_num_queries(0):
+            second = self.client.get('/api/articles/')
+        assert second.data == first.data
+        self.client.get(self.detail_url)
+        with django_assert_num_queries(0):
+            assert self.client.get(self.detail_url).data['title'] == 'Original'
+
+    def test_conditional_requests(self):
+        response = self.client.get(self.detail_url)
+        assert response['ETag'] and response['Last-Modified']
+        assert self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=response['ETag']).status_code == 304
+        assert self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code == 304
+
+        self.article.title = 'Revisto'
+        self.article.save()
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=response['ETag'])
+        assert response.status_code == 200 and response.data['title'] == 'Revisto'
+
+    def test_article_save_invalidates_list_and_detail(self):
+        self.client.get('/api/articles/')
+        self.client.get(self.detail_url)
+        self.article.title = 'Revisto'
+        self.article.save()
+        assert self.client.get('/api/articles/').data['results'][0]['title'] == 'Revisto'
+        assert self.client.get(self.detail_url).data['title'] == 'Revisto'
+
+    def test_counter_updates_keep_the_cache(self):
+        self.client.get(self.detail_url)
+        versions = response_cache.versions(self.article.id)
+        self.article.views = 99
+        self.article.save(update_fields=['views'])
+        assert response_cache.versions(self.article.id) == versions
+
+    def test_tag_changes_invalidate(self):
+        self.client.get(self.detail_url)
+        self.article.tags.add('física')
+        assert self.client.get(self.detail_url).data['tags'] == ['física']
+
+    def test_comment_approval_bumps_article_version(self):
+        before = response_cache.versions(self.article.id)
+        comment = Comment.objects.create(article=self.article, author_name='Ana', author_email='ana@x.pt', content='Olá')
+        assert response_cache.versions(self.article.id) == before
+        comment.status = 'approved'
+        comment.save()
+        assert response_cache.versions(self.article.id)[1] != before[1]
+
+    def test_user_flags_are_merged_after_the_cache(self, django_assert_num_queries):
+        reader = User.objects.create_user(username='leitor', password='password')
+        Bookmark.objects.create(user=reader, article=self.article)
+        self.client.force_authenticate(reader)
+        assert self.client.get('/api/articles/').data['results'][0]['is_bookmarked'] is True
+        # Hit: só as duas consultas dos flags
+        with django_assert_num_queries(2):
+            assert self.client.get('/api/articles/').data['results'][0]['is_bookmarked'] is True
+        assert 'ETag' not in self.client.get(self.detail_url)
+
+        self.client.force_authenticate(None)
+        assert self.client.get('/api/articles/').data['results'][0]['is_bookmarked'] is False
+
+
+@pytest.mark.django_db
+class TestFeedPagination:
+    def setup_method(self):
+        cache.clear()
+        self.client = APIClient()
+        user = User.objects.create_user(username='autora', password='password')
+        now = timezone.now()
+        self.articles = [
+            Article.objects.create(
+                title=f'Artigo {i}', content='Conteúdo', author=user, status='published',
+                # Dois artigos com a mesma data na fronteira entre páginas: o cursor
+                # desempata sem repetir nem saltar
+                published_at=now - timedelta(hours=i - (i == 20)),
+            )
+            for i in range(45)
+        ]
+
+    def walk(self, url):
+        ids, pages = [], 0
+        while url:
+            data = self.client.get(url).data
+            ids += [item['id'] for item in data['results']]
+            url, pages = data['next'], pages + 1
+        return ids, pages
+
+    def test_page_numbers_remain_the_default(self):
+        data = self.client.get('/api/articles/').data
+        assert data['count'] == 45 and len(data['results']) == 20
+
+    def test_cursor_walks_the_feed_in_order(self):
+        ids, pages = self.walk('/api/articles/?pagination=cursor')
+        expected = list(Article.objects.filter(status='published').values_list('id', flat=True))
+        assert ids == expected and pages == 3
+
+    def test_cursor_page_is_a_keyset_query(self, django_assert_num_queries):
+        data = self.client.get('/api/articles/?pagination=cursor').data
+        assert 'count' not in data and data['previous'] is None
+        with django_assert_num_queries(2) as captured:
+            self.client.get(data['next'])
+        # WHERE published_at <(=) posição + LIMIT (OFFSET só dentro de empates)
+        sql = captured.captured_queries[0]['sql']
+        assert 'COUNT(' not in sql and '"published_at" <' in sql
+
+    def test_approximate_count_is_opt_in(self):
+        data = self.client.get('/api/articles/?pagination=cursor&count=approx').data
+        assert data['count'] == 45
+        assert list(data)[:2] == ['count', 'next']
+
+    def test_search_keeps_relevance_order_in_cursor_mode(self):
+        oldest, newest = self.articles[-1], self.articles[0]
+        oldest.content = 'quasar quasar quasar'
+        oldest.save()
+        newest.content = 'quasar e outras coisas'
+        newest.save()
+        # Normalmente em index_article_task, depois do commit
+        index_article(oldest)
+        index_article(newest)
+        data = self.client.get('/api/articles/?search=quasar&pagination=cursor').data
+        # Por página, pela ordem do BM25 e não pela data
+        assert data['count'] == 2
+        assert [item['id'] for item in data['results']] == [oldest.id, newest.id]
+
+    def test_comments_cursor(self):
+        for i in range(25):
+            Comment.objects.create(
+                article=self.articles[0], author_name='Ana', author_email='ana@x.pt', content=str(i), status='approved'
+            )
+        ids, pages = self.walk(f'/api/comments/?article={self.articles[0].slug}&pagination=cursor')
+        assert len(set(ids)) == 25 and pages == 2
+
+
+@pytest.mark.django_db
+class TestArticleListRowSerializer:
+    def setup_method(self):
+        self.author = User.objects.create_user(username='autora', password='password', first_name='Ana', last_name='Lima')
+        self.author.profile.photo = 'profiles/ana lima.jpg'
+        self.author.profile.badges = ['revisora']
+        self.author.profile.save()
+        plain = User.objects.create_user(username='anonimo', password='password')
+        category = Category.objects.create(name='Física', slug='fisica')
+
+        with_image = Article.objects.create(
+            title='Ondas', excerpt='Resumo', content='texto ' * 600, author=self.author, category=category,
+            status='published', cover_image='articles/covers/ondas ç.png', doi='10.1/x',
+        )
+        with_image.tags.add('física', 'ondas')
+        Article.objects.create(title='Sem categoria', content='texto', author=plain, status='published')
+        Article.objects.create(title='Rascunho', content='texto', author=plain, status='draft')
+
+        self.reader = User.objects.create_user(username='leitor', password='password')
+        Bookmark.objects.create(user=self.reader, article=with_image)
+        UserLike.objects.create(user=self.reader, article=with_image)
+
+    def context(self, user=None):
+        request = Request(APIRequestFactory().get('/api/articles/'))
+        if user is not None:
+            request.user = user
+        return {'request': request}
+
+    def render_both(self, context):
+        queryset = Article.objects.select_related(
+            'author', 'author__profile', 'category'
+        ).prefetch_related('tags').order_by('id')
+        drf = ArticleListSerializer(queryset, many=True, context=context).data
+        fast = ArticleListRowSerializer(ArticleListRowSerializer.values(queryset), context=context).data
+        return json.loads(JSONRenderer().render(drf)), json.loads(ORJSONRenderer().render(fast))
+
+    @pytest.mark.parametrize('authenticated', [False, True])
+    def test_same_output_as_article_list_serializer(self, authenticated):
+        drf, fast = self.render_both(self.context(self.reader if authenticated else None))
+        assert [list(item) for item in fast] == [list(item) for item in drf]
+        assert fast == drf
+        assert fast[0]['imageUrl'].startswith('http://testserver/media/')
+        assert fast[0]['is_bookmarked'] is authenticated
+
+    def test_list_endpoint_uses_the_fast_path(self, settings, django_assert_num_queries):
+        settings.ARTICLE_RESPONSE_CACHE_TTL = 0
+        # Contagem, página e tags: sem consultas por artigo
+        with django_assert_num_queries(3):
+            response = APIClient().get('/api/articles/')
+        assert [item['title'] for item in response.json()['results']] == ['Sem categoria', 'Ondas']
+
+
+@pytest.mark.django_db
+class TestArticleRenderers:
+    def setup_method(self):
+        cache.clear()
+        user = User.objects.create_user(username='autora', password='password')
+        self.article = Article.objects.create(title='Ondas', content='texto', author=user, status='published')
+
+    def test_list_is_rendered_with_orjson(self):
+        response = APIClient().get('/api/articles/')
+        assert isinstance(response.accepted_renderer, ORJSONRenderer)
+
+    def test_other_endpoints_stay_json_only(self):
+        response = APIClient().get(f'/api/articles/{self.article.slug}/')
+        assert type(response.accepted_renderer) is JSONRenderer
+        assert APIClient().get('/api/categories/', HTTP_ACCEPT='text/html').status_code == 406
+
+    def test_list_has_no_browsable_api(self):
+        assert APIClient().get('/api/articles/', HTTP_ACCEPT='text/html').status_code == 406
+
+
+class TestORJSONRenderer:
+    def test_same_bytes_as_json_renderer(self):
+        data = {
+            'text': 'Olá — ç \u2028 fim', 'number': 1.5, 'decimal': Decimal('2.50'), 'id': uuid.UUID(int=7),
+            'when': timezone.now(), 'day': timezone.now().date(), 'nested': [{'a': None, 'b': True}], 1: 'int key',
+        }
+        assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+
+    def test_indent_falls_back_to_json_renderer(self):
+        rendered = ORJSONRenderer().render({'a': 1}, 'application/json; indent=2', {})
+        assert rendered == b'{\n  "a": 1\n}'
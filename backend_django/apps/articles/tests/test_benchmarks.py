@@ -0,0 +1,91 @@
+import json
+import pytest
+from django.core.management import call_command
+from apps.articles.models import Article, UserEvent
+from apps.articles.services.ai_service import reset_ai_service
+from apps.articles.services.evaluation import SyntheticCorpus, measure, ndcg_at_k, recall_at_k
+
+
+class TestRankingMetrics:
+    def test_recall_at_k(self):
+        assert recall_at_k([1, 2, 3, 4], {2, 4}, k=2) == 0.5
+        assert recall_at_k([1, 2, 3, 4], {2, 4}, k=4) == 1.0
+        assert recall_at_k([1, 2], set(), k=2) == 0.0
+
+    def test_ndcg_rewards_higher_ranks(self):
+        assert ndcg_at_k([7, 1, 2], {7}, k=3) == pytest.approx(1.0)
+        assert ndcg_at_k([1, 7, 2], {7}, k=3) == pytest.approx(1 / 1.58496, rel=1e-4)
+        assert ndcg_at_k([1, 2, 3], {7}, k=3) == 0.0
+
+
+@pytest.mark.django_db
+class TestEvaluationHarness:
+    def test_measure_counts_queries_per_call(self):
+        stats = measure(lambda i: list(Article.objects.all()) + list(Article.objects.all()), repeat=3)
+        assert stats['calls'] == 3
+        assert stats['queries_per_call'] == 2
+        assert stats['p50_ms'] <= stats['p95_ms']
+
+    def test_synthetic_corpus_holds_out_latest_interactions(self):
+        corpus = SyntheticCorpus(articles=40, topics=4, sessions=5, events_per_session=4, holdout=2, seed=1).create()
+        assert Article.objects.filter(slug__startswith=f'bench-{corpus.token}').count() == 40
+        for session_id, held_out in corpus.session_holdout.items():
+            seen = set(UserEvent.objects.filter(session_id=session_id).values_list('article_id', flat=True))
+            assert len(seen) == 4 and len(held_out) == 2
+            assert not seen & held_out
+
+
+@pytest.mark.django_db
+class TestBenchSuite:
+    @pytest.fixture
+    def results(self, settings, tmp_path):
+        settings.EMBEDDING_SNAPSHOT_DIR = str(tmp_path / 'embeddings')
+        output = tmp_path / 'bench.json'
+        call_command(
+            'bench_suite', '--articles', '120', '--topics', '6', '--sessions', '20', '--queries', '20',
+            '--repeat', '3', '--k', '10', '--output', str(output),
+        )
+        yield json.loads(output.read_text())
+        # A SearchService do comando criou o AIService do processo (sem chave de API)
+        reset_ai_service()
+
+    def test_writes_comparable_json(self, results):
+        assert set(results) == {'meta', 'latency', 'quality'}
+        assert results['meta']['corpus']['articles'] == 120
+        assert set(results['latency']) == {
+            'semantic_search', 'recommendations', 'article_list', 'article_detail', 'trending',
+            'article_list_uncached', 'serialize_page_drf', 'serialize_page_fast',
+        }
+        assert set(results['quality']['search']) == {'recall@10', 'ndcg@10'}
+
+    def test_synthetic_corpus_is_rolled_back(self, results):
+        assert not Article.objects.filter(slug__startswith='bench-').exists()
+        assert not UserEvent.objects.filter(session_id__startswith='bench-').exists()
+
+    def test_query_budgets(self, results):
+        latency = results['latency']
+        # Índice em memória: só a hidratação dos chunks
+        assert latency['semantic_search']['queries_per_call'] <= 1
+        # Histórico, candidatos, artigos e tags
+        assert latency['recommendations']['queries_per_call'] <= 4
+        assert latency['article_list']['queries_per_call'] <= 10
+        assert latency['article_detail']['queries_per_call'] <= 10
+        assert latency['trending']['queries_per_call'] <= 5
+        # Página de artigos sem cache: contagem, página e tags
+        assert latency['article_list_uncached']['queries_per_call'] <= 3
+        assert latency['serialize_page_fast']['queries_per_call'] <= 2
+
+    def test_quality(self, results):
+        quality = results['quality']
+        assert quality['search']['recall@10'] >= 0.9
+        # As sessões preferem 1 ou 2 temas: o perfil tem de bater a popularidade
+        assert quality['recommendations']['recall@10'] > quality['recommendations_baseline']['recall@10']
+
+    def test_compare_prints_deltas(self, results, tmp_path, capsys):
+        baseline = tmp_path / 'baseline.json'
+        baseline.write_text(json.dumps(results))
+        call_command('bench_suite', '--articles', '30', '--topics', '3', '--sessions', '5', '--queries', '5',
+                     '--repeat', '1', '--compare', str(baseline))
+        output = capsys.readouterr().out
+        assert 'Comparação com' in output
+        assert 'semantic_search' in output
@@ -0,0 +1,70 @@
+import pytest
+from apps.articles.services.chunking import (FixedWindowChunker, MarkdownChunker,
+                                             count_tokens, get_chunker)
+
+ARTICLE = """# Buracos Negros
+
+Um buraco negro é uma região do espaço-tempo. Nada escapa à sua gravidade. Nem mesmo a luz.
+
+## Formação
+
+As estrelas massivas colapsam no fim da vida. O núcleo implode e forma uma singularidade.
+
+```python
+def raio(m):
+
+    return 2 * G * m / c ** 2
+```
+
+## Observação
+
+Em 2019 foi publicada a primeira imagem de um buraco negro.
+"""
+
+
+class TestCountTokens:
+    def test_counts_words_and_punctuation(self):
+        assert count_tokens('Olá, mundo!') == 4
+
+    def test_long_words_count_as_several_tokens(self):
+        assert count_tokens('anticonstitucionalissimamente') > 1
+        assert count_tokens('') == 0
+
+
+class TestMarkdownChunker:
+    def test_sections_are_not_mixed(self):
+        chunks = MarkdownChunker(max_tokens=200, overlap_tokens=10).split(ARTICLE)
+        assert [chunk.content.split('\n')[0] for chunk in chunks] == [
+            '# Buracos Negros', '## Formação', '## Observação'
+        ]
+
+    def test_code_blocks_stay_whole(self):
+        chunks = MarkdownChunker(max_tokens=200, overlap_tokens=10).split(ARTICLE)
+        assert any('def raio(m):\n\n    return' in chunk.content for chunk in chunks)
+
+    def test_long_paragraph_splits_on_sentences_with_overlap(self):
+        sentences = [f"A frase número {i} descreve uma observação." for i in range(40)]
+        chunks = MarkdownChunker(max_tokens=60, overlap_tokens=15).split(' '.join(sentences))
+
+        assert len(chunks) > 1
+        for chunk in chunks:
+            assert chunk.token_count <= 60
+            assert chunk.token_count == count_tokens(chunk.content)
+            # Nenhuma frase é cortada a meio
+            assert chunk.content.endswith('.')
+        # O início de cada chunk repete a última frase do anterior
+        for previous, following in zip(chunks, chunks[1:]):
+            assert following.content.startswith(previous.content.rsplit('. ', 1)[-1])
+
+    def test_rejects_overlap_larger_than_budget(self):
+        with pytest.raises(ValueError):
+            MarkdownChunker(max_tokens=10, overlap_tokens=10)
+
+
+class TestGetChunker:
+    def test_uses_settings(self, settings):
+        settings.CHUNKER = 'fixed'
+        assert isinstance(get_chunker(), FixedWindowChunker)
+        settings.CHUNKER = 'markdown'
+        settings.CHUNK_MAX_TOKENS = 128
+        assert get_chunker().max_tokens == 128
@@ -0,0 +1,158 @@
+import pytest
+from io import StringIO
+from unittest.mock import patch
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from apps.articles.models import Article, ArticleChunk, IndexingRun
+from apps.articles.services.rate_limiter import RateLimitExceeded, SharedTokenBucket, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestTokenBucket:
+    def test_burst_then_throttle(self):
+        clock = FakeClock()
+        bucket = TokenBucket.per_minute(60, burst=2)
+        bucket._clock, bucket._sleep, bucket._updated_at = clock, clock.sleep, clock()
+
+        assert bucket.acquire() == 0.0
+        assert bucket.acquire() == 0.0
+        assert bucket.try_acquire() is False
+        assert bucket.acquire() == pytest.approx(1.0)
+
+    def test_rejects_non_positive_rate(self):
+        with pytest.raises(ValueError):
+            TokenBucket(0)
+
+
+class ScriptedRedis:
+    """Devolve respostas pré-definidas do script Lua do bucket partilhado"""
+
+    enabled = True
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.calls = []
+
+    def eval(self, script, numkeys, key, rate, capacity, requested):
+        self.calls.append(requested)
+        return self.replies.pop(0)
+
+
+class TestSharedTokenBucket:
+    def local_bucket(self, clock, **kwargs):
+        bucket = SharedTokenBucket.per_minute('ai:quota:test', 60, burst=2, **kwargs)
+        bucket._sleep = bucket.local._sleep = clock.sleep
+        bucket.local._clock, bucket.local._updated_at = clock, clock()
+        return bucket
+
+    def test_local_fallback_throttles_after_timeout(self):
+        clock = FakeClock()
+        bucket = self.local_bucket(clock)
+        assert bucket.acquire(timeout=0) == 0.0
+        assert bucket.acquire(timeout=0) == 0.0
+        with pytest.raises(RateLimitExceeded):
+            bucket.acquire(timeout=0.5)
+        # Sem limite de espera, aguarda a recarga
+        assert bucket.acquire() == pytest.approx(1.0)
+        stats = bucket.stats()
+        assert (stats['shared'], stats['granted'], stats['throttled']) == (False, 3, 1)
+
+    def test_drain_after_quota_error(self):
+        clock = FakeClock()
+        bucket = self.local_bucket(clock)
+        bucket.drain()
+        assert bucket.stats()['tokens'] == 0
+        with pytest.raises(RateLimitExceeded):
+            bucket.acquire(timeout=0)
+
+    def test_uses_redis_replies(self):
+        clock = FakeClock()
+        redis = ScriptedRedis([500, '0'], [0, '0.5'])
+        bucket = self.local_bucket(clock, redis=redis)
+        assert bucket.acquire(timeout=1) == pytest.approx(0.5)
+        assert redis.calls == [1, 1]
+        assert bucket.local.tokens == 2  # o bucket local não foi usado
+
+
+def fake_embed(model, content, task_type):
+    return {'embedding': [[1.0, 0.0] for _ in content]}
+
+
+@pytest.mark.django_db
+class TestIndexCorpusCommand:
+    @pytest.fixture(autouse=True)
+    def corpus(self, settings, tmp_path):
+        settings.GEMINI_API_KEY = 'test-key'
+        settings.EMBEDDING_SNAPSHOT_DIR = str(tmp_path)
+        user = User.objects.create_user(username='corpus', password='password')
+        self.articles = [
+            Article.objects.create(title=f'Artigo {i}', content='texto ' * 300, author=user, status='published')
+            for i in range(5)
+        ]
+        Article.objects.create(title='Rascunho', content='rascunho', author=user, status='draft')
+
+    def run_command(self, *args, embed=fake_embed):
+        out = StringIO()
+        with patch('apps.articles.services.ai_service.genai.configure'), \
+             patch('apps.articles.services.ai_service.genai.GenerativeModel'), \
+             patch('apps.articles.services.ai_service.genai.embed_content', side_effect=embed) as embed:
+            call_command('index_corpus', '--workers', '2', '--rpm', '6000', *args, stdout=out)
+        return embed, out.getvalue()
+
+    def test_indexes_published_articles_and_reports_progress(self):
+        embed, output = self.run_command()
+        assert embed.call_count == 5
+        assert ArticleChunk.objects.values('article').distinct().count() == 5
+        run = IndexingRun.objects.get()
+        assert run.status == 'completed'
+        assert run.articles_done == 5 and run.last_article_id == self.articles[-1].id
+        assert 'artigos/s' in output and 'ETA' in output
+
+    def test_resumes_from_checkpoint(self):
+        IndexingRun.objects.create(articles_total=5, articles_done=3, last_article_id=self.articles[2].id)
+        embed, output = self.run_command()
+        assert embed.call_count == 2
+        assert 'A retomar' in output
+        run = IndexingRun.objects.get()
+        assert run.status == 'completed' and run.articles_done == 5
+
+    def test_restart_ignores_checkpoint(self):
+        IndexingRun.objects.create(articles_total=5, articles_done=3, last_article_id=self.articles[2].id)
+        embed, _ = self.run_command('--restart')
+        assert embed.call_count == 5
+        assert list(IndexingRun.objects.order_by('id').values_list('status', flat=True)) == ['failed', 'completed']
+
+
+    def test_failed_articles_are_retried_on_resume(self):
+        failing = self.articles[1]
+        failing.content = 'falha ' * 300
+        failing.save()
+
+        def flaky_embed(model, content, task_type):
+            if content[0].startswith('falha'):
+                raise RuntimeError('quota')
+            return fake_embed(model, content, task_type)
+
+        self.run_command(embed=flaky_embed)
+        run = IndexingRun.objects.get()
+        assert run.status == 'running' and run.last_article_id == self.articles[-1].id
+        assert run.failed_article_ids == [failing.id] and run.articles_done == 4
+        assert not ArticleChunk.objects.filter(article=failing).exists()
+
+        embed, output = self.run_command()
+        assert embed.call_count == 1
+        assert '1 com erro a repetir' in output
+        run.refresh_from_db()
+        assert run.status == 'completed' and run.articles_done == 5
+        assert run.failed_article_ids == [] and run.articles_failed == 0
+        assert ArticleChunk.objects.filter(article=failing, embedding__isnull=False).exists()
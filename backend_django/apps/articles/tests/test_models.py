@@ -1,6 +1,6 @@
 import pytest
 from django.contrib.auth.models import User
-from apps.articles.models import Article, Category, AuthorMessage
+from apps.articles.models import Article, ArticleChunk, Category, AuthorMessage
 from django.utils import timezone
 
 @pytest.mark.django_db
@@ -32,3 +32,19 @@ class TestAuthorMessageModel:
         assert message.author == user
         assert message.is_read is False
         assert str(message) == f"Mensagem de Sender Name para {user.get_full_name() or user.username}"
+
+@pytest.mark.django_db
+class TestArticleChunkEmbedding:
+    def test_binary_roundtrip(self):
+        user = User.objects.create_user(username='chunker', password='password')
+        article = Article.objects.create(title='Chunk', content='Texto', author=user)
+        for dtype, size in [('float32', 4), ('float16', 2)]:
+            chunk = ArticleChunk(article=article, content='Texto')
+            chunk.set_embedding([0.5, -0.25, 1.0], dtype=dtype)
+            chunk.save()
+            chunk.refresh_from_db()
+            assert len(chunk.embedding) == 3 * size
+            assert chunk.vector.tolist() == [0.5, -0.25, 1.0]
+
+    def test_missing_embedding(self):
+        assert ArticleChunk(content='Sem vetor').vector is None
@@ -0,0 +1,503 @@
+import os
+import pytest
+import numpy as np
+from unittest.mock import patch
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APIClient
+from datetime import timedelta
+from django.utils import timezone
+from apps.articles.models import Article, ArticleChunk, Category, RelatedArticle, SearchDocument, UserEvent
+from apps.articles.services.recommender_service import RecommenderService
+from apps.articles.tasks import index_article_task, schedule_embedding_snapshot, write_embedding_snapshot_task
+from apps.articles.services.search_service import SearchService
+from apps.articles.services.ann_index import IVFVectorIndex
+from apps.articles.services.bm25_index import index_article, rebuild_index, reciprocal_rank_fusion
+from apps.articles.services import related_articles
+from apps.articles.services.text_analysis import analyze
+from apps.articles.services.embedding_snapshot import (load_snapshot,
+                                                       read_current_version,
+                                                       write_snapshot)
+from apps.articles.services.vector_index import (ExactVectorIndex,
+                                                 get_index_version,
+                                                 get_vector_index,
+                                                 invalidate_vector_index,
+                                                 publish_ivf_index)
+
+
+class TestExactVectorIndex:
+    def setup_method(self):
+        self.index = ExactVectorIndex(
+            chunk_ids=[10, 11, 12, 13],
+            article_ids=[1, 1, 2, 3],
+            author_ids=[7, 7, 8, 8],
+            matrix=[[1, 0, 0], [0.9, 0.1, 0], [0, 1, 0], [0, 0, 0]],
+        )
+
+    def test_search_orders_by_cosine(self):
+        results = self.index.search([1, 0, 0], top_k=2)
+        assert [chunk_id for chunk_id, _, _ in results] == [10, 11]
+        assert results[0][1:] == (1, pytest.approx(1.0))
+
+    def test_search_matches_brute_force(self):
+        rng = np.random.default_rng(0)
+        matrix = rng.normal(size=(200, 16))
+        index = ExactVectorIndex(range(200), range(200), [0] * 200, matrix)
+        query = rng.normal(size=16)
+
+        expected = sorted(
+            range(200),
+            key=lambda i: SearchService.cosine_similarity(query, matrix[i]),
+            reverse=True
+        )[:5]
+        assert [chunk_id for chunk_id, _, _ in index.search(query, top_k=5)] == expected
+
+    def test_search_filters_by_author(self):
+        results = self.index.search([1, 0, 0], top_k=5, author_id=8)
+        assert [chunk_id for chunk_id, _, _ in results][0] == 12
+        assert {chunk_id for chunk_id, _, _ in results} <= {12, 13}
+
+    def test_zero_query_returns_nothing(self):
+        assert self.index.search([0, 0, 0]) == []
+
+
+@pytest.fixture
+def snapshot_dir(settings, tmp_path):
+    settings.EMBEDDING_SNAPSHOT_DIR = str(tmp_path / 'embeddings')
+    return settings.EMBEDDING_SNAPSHOT_DIR
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('snapshot_dir')
+class TestSemanticSearch:
+    def setup_method(self):
+        user = User.objects.create_user(username='searcher', password='password')
+        category = Category.objects.create(name='Física', slug='fisica')
+        self.article = Article.objects.create(
+            title='Ondas', content='Conteúdo', author=user, category=category, status='published'
+        )
+        self.near = ArticleChunk.objects.create(article=self.article, content='perto', embedding=ArticleChunk.pack_embedding([1.0, 0.0]))
+        self.far = ArticleChunk.objects.create(article=self.article, content='longe', embedding=ArticleChunk.pack_embedding([0.0, 1.0]))
+        ArticleChunk.objects.create(article=self.article, content='sem embedding', embedding=None)
+        invalidate_vector_index()
+
+    def test_returns_chunks_in_rank_order(self):
+        with patch('apps.articles.services.ai_service.AIService.get_query_embedding', return_value=[1.0, 0.1]):
+            results = SearchService().semantic_search('ondas', top_k=2)
+        assert results == [self.near, self.far]
+
+    def test_index_rebuilds_after_invalidation(self):
+        assert len(get_vector_index()) == 2
+        ArticleChunk.objects.create(article=self.article, content='novo', embedding=ArticleChunk.pack_embedding([0.5, 0.5]))
+        invalidate_vector_index()
+        assert len(get_vector_index()) == 3
+
+
+class TestIVFVectorIndex:
+    def setup_method(self):
+        rng = np.random.default_rng(1)
+        centers = rng.normal(size=(8, 32))
+        self.matrix = np.repeat(centers, 50, axis=0) + rng.normal(scale=0.1, size=(400, 32))
+        self.exact = ExactVectorIndex(range(400), range(400), [1] * 400, self.matrix)
+        self.ivf = IVFVectorIndex.build(self.exact, nlist=8, nprobe=2)
+
+    def test_recall_against_exact(self):
+        hits = 0
+        for query in self.matrix[::20]:
+            expected = {chunk_id for chunk_id, _, _ in self.exact.search(query, top_k=10)}
+            hits += len(expected & {chunk_id for chunk_id, _, _ in self.ivf.search(query, top_k=10)})
+        assert hits / (20 * 10) >= 0.9
+
+    def test_full_probe_equals_exact(self):
+        query = self.matrix[3]
+        approx = self.ivf.search(query, top_k=5, nprobe=8)
+        exact = self.exact.search(query, top_k=5)
+        assert [chunk_id for chunk_id, _, _ in approx] == [chunk_id for chunk_id, _, _ in exact]
+        assert [score for _, _, score in approx] == pytest.approx([score for _, _, score in exact], abs=1e-5)
+
+    def test_save_and_load_roundtrip(self, tmp_path):
+        path = str(tmp_path / 'ivf.npz')
+        self.ivf.save(path, fingerprint='400:400')
+        loaded, fingerprint = IVFVectorIndex.load(path, nprobe=2)
+        assert fingerprint == '400:400'
+        query = self.matrix[7]
+        assert loaded.search(query, top_k=5) == self.ivf.search(query, top_k=5)
+        assert os.listdir(tmp_path) == ['ivf.npz']
+
+    def test_build_shares_the_normalized_matrix(self):
+        assert self.ivf.matrix is self.exact.matrix
+
+
+@pytest.mark.django_db
+class TestIVFPublishing:
+    @pytest.fixture(autouse=True)
+    def ivf_backend(self, settings, tmp_path):
+        settings.SEARCH_INDEX_BACKEND = 'ivf'
+        settings.SEARCH_INDEX_DIR = str(tmp_path / 'search')
+        settings.EMBEDDING_SNAPSHOT_ENABLED = False
+        user = User.objects.create_user(username='ivf', password='password')
+        article = Article.objects.create(title='IVF', content='Texto', author=user)
+        rng = np.random.default_rng(2)
+        for vector in rng.normal(size=(20, 8)):
+            ArticleChunk.objects.create(article=article, content='c', embedding=ArticleChunk.pack_embedding(vector))
+        invalidate_vector_index()
+        yield
+        invalidate_vector_index()
+
+    def test_worker_serves_exact_index_without_training(self):
+        with patch.object(IVFVectorIndex, 'build') as build:
+            index = get_vector_index()
+        build.assert_not_called()
+        assert type(index) is ExactVectorIndex and len(index) == 20
+
+    def test_workers_load_the_published_index(self):
+        assert publish_ivf_index()
+        index = get_vector_index()
+        assert isinstance(index, IVFVectorIndex) and len(index) == 20
+        # Mesmo estado dos chunks: nada a retreinar
+        assert not publish_ivf_index()
+
+
+@pytest.mark.django_db
+class TestEmbeddingSnapshot:
+    def setup_method(self):
+        user = User.objects.create_user(username='snap', password='password')
+        self.article = Article.objects.create(title='Snapshot', content='Texto', author=user)
+        ArticleChunk.objects.create(article=self.article, content='a', embedding=ArticleChunk.pack_embedding([3.0, 4.0]))
+
+    def test_write_and_mmap_load(self, snapshot_dir):
+        version = write_snapshot()
+        assert read_current_version() == version
+
+        loaded_version, arrays = load_snapshot()
+        assert loaded_version == version
+        assert isinstance(arrays['embeddings'], np.memmap)
+        assert arrays['embeddings'][0].tolist() == pytest.approx([0.6, 0.8])
+        assert arrays['article_ids'].tolist() == [self.article.id]
+
+    def test_readers_pick_up_new_version(self, snapshot_dir):
+        write_snapshot()
+        assert len(get_vector_index('exact')) == 1
+
+        ArticleChunk.objects.create(article=self.article, content='b', embedding=ArticleChunk.pack_embedding([1.0, 0.0]))
+        write_snapshot()
+        index = get_vector_index('exact')
+        assert len(index) == 2
+        # Vista sobre o mmap só de leitura, sem cópia para a memória do processo
+        assert not index.matrix.flags.owndata and not index.matrix.flags.writeable
+
+    def test_current_pointer_is_read_on_an_interval(self, settings, snapshot_dir):
+        settings.EMBEDDING_SNAPSHOT_CHECK_INTERVAL = 60
+        version = write_snapshot()
+        # Outro processo publica uma versão: só é vista no fim do intervalo
+        with open(os.path.join(snapshot_dir, 'CURRENT'), 'w') as f:
+            f.write('outra')
+        with patch('apps.articles.services.embedding_snapshot.read_current_version') as read:
+            assert get_index_version()[1] == version
+        read.assert_not_called()
+        settings.EMBEDDING_SNAPSHOT_CHECK_INTERVAL = 0
+        assert get_index_version()[1] == 'outra'
+
+    def test_indexing_bursts_share_one_snapshot(self, settings, snapshot_dir):
+        cache.clear()
+        with patch('apps.articles.tasks.write_embedding_snapshot_task.apply_async') as queued:
+            for _ in range(3):
+                schedule_embedding_snapshot()
+            assert queued.call_count == 1
+            assert queued.call_args.kwargs == {'countdown': settings.EMBEDDING_SNAPSHOT_DEBOUNCE}
+            # Depois de escrito, a próxima indexação agenda outro
+            write_embedding_snapshot_task()
+            schedule_embedding_snapshot()
+            assert queued.call_count == 2
+
+    def test_old_versions_are_pruned(self, snapshot_dir):
+        for _ in range(4):
+            write_snapshot(keep=2)
+        versions = [entry for entry in os.listdir(snapshot_dir) if entry.startswith('v')]
+        assert len(versions) == 2
+
+
+class TestTextAnalysis:
+    def test_plural_and_accents_share_a_stem(self):
+        assert analyze('Células') == analyze('celula')
+        assert analyze('as gravidades') == analyze('gravidade')
+
+    def test_stopwords_are_dropped(self):
+        assert analyze('a formação das estrelas') == analyze('formação estrelas')
+
+
+@pytest.mark.django_db
+class TestBM25Search:
+    def setup_method(self):
+        cache.clear()
+        user = User.objects.create_user(username='bm25', password='password')
+        self.other = User.objects.create_user(username='outro', password='password')
+        self.stars = Article.objects.create(
+            title='A vida das estrelas', content='As estrelas nascem em nebulosas de gás.', author=user, status='published'
+        )
+        self.cells = Article.objects.create(
+            title='Biologia celular', content='As células dividem-se. A estrela do mar regenera células.',
+            author=user, status='published'
+        )
+        self.draft = Article.objects.create(title='Estrelas em rascunho', content='estrelas', author=user)
+        # O índice é atualizado por index_article_task (on_commit), como num worker
+        for article in (self.stars, self.cells, self.draft):
+            index_article(article)
+        self.service = SearchService()
+
+    def save_and_index(self, article, django_capture_on_commit_callbacks, **kwargs):
+        """Grava o artigo e corre a tarefa de indexação que a gravação agendou"""
+        with patch('apps.articles.tasks.index_article_task.delay') as delay, \
+                override_settings(AI_RESULT_PREWARM=False), django_capture_on_commit_callbacks(execute=True):
+            article.save(**kwargs)
+        delay.assert_called_once()
+        index_article_task(*delay.call_args.args, **delay.call_args.kwargs)
+        return delay.call_args.kwargs
+
+    def test_ranks_by_relevance_and_skips_drafts(self):
+        results = self.service.keyword_search('estrela')
+        assert [article_id for article_id, _ in results] == [self.stars.id, self.cells.id]
+
+    def test_index_is_updated_by_the_indexing_task(self, django_capture_on_commit_callbacks):
+        self.cells.content = 'Mitocôndrias e ribossomas.'
+        # Os embeddings não interessam aqui (ver TestIndexArticleTask)
+        with patch('apps.articles.tasks.sync_article_chunks', return_value={'changed': False}):
+            assert self.save_and_index(self.cells, django_capture_on_commit_callbacks) == {'search_only': False}
+        assert [article_id for article_id, _ in self.service.keyword_search('ribossoma')] == [self.cells.id]
+        assert [article_id for article_id, _ in self.service.keyword_search('estrela')] == [self.stars.id]
+
+    def test_unpublished_article_leaves_the_index(self, django_capture_on_commit_callbacks):
+        self.stars.status = 'archived'
+        # Artigo não publicado: só o índice BM25, sem chunks nem embeddings
+        with patch('apps.articles.tasks.sync_article_chunks') as sync:
+            kwargs = self.save_and_index(self.stars, django_capture_on_commit_callbacks, update_fields=['status'])
+        assert kwargs == {'search_only': True}
+        sync.assert_not_called()
+        assert self.stars.id not in [article_id for article_id, _ in self.service.keyword_search('estrelas')]
+
+    def test_save_does_not_index_synchronously(self):
+        self.cells.content = 'Mitocôndrias e ribossomas.'
+        self.cells.save()
+        assert self.service.keyword_search('ribossoma') == []
+
+    def test_rebuild_matches_incremental_index(self):
+        incremental = self.service.keyword_search('estrelas células')
+        rebuild_index()
+        assert self.service.keyword_search('estrelas células') == pytest.approx(incremental)
+
+    def test_hybrid_search_fuses_lexical_and_semantic_rankings(self, settings, tmp_path):
+        settings.EMBEDDING_SNAPSHOT_DIR = str(tmp_path)
+        ArticleChunk.objects.create(article=self.stars, content='x', embedding=ArticleChunk.pack_embedding([0.0, 1.0]))
+        ArticleChunk.objects.create(article=self.cells, content='y', embedding=ArticleChunk.pack_embedding([1.0, 0.0]))
+        invalidate_vector_index()
+        with patch('apps.articles.services.ai_service.AIService.get_query_embedding', return_value=[1.0, 0.0]):
+            results = self.service.hybrid_search('estrela', top_k=2)
+        # Biologia celular é 2.º no BM25 mas 1.º no cosseno; as duas listas empatam no RRF
+        assert {article_id for article_id, _ in results} == {self.stars.id, self.cells.id}
+        assert results[0][1] == pytest.approx(results[1][1])
+
+    def test_list_endpoint_uses_bm25(self):
+        response = APIClient().get('/api/articles/', {'search': 'células'})
+        assert [article['id'] for article in response.data['results']] == [self.cells.id]
+
+    def test_list_endpoint_falls_back_while_index_is_empty(self):
+        SearchDocument.objects.all().delete()
+        cache.clear()
+        response = APIClient().get('/api/articles/', {'search': 'Biologia'})
+        assert [article['id'] for article in response.data['results']] == [self.cells.id]
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1, 4]], k=60)
+    assert [item for item, _ in fused][:2] == [1, 3]
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('snapshot_dir')
+class TestSemanticSearchQueries:
+    def setup_method(self):
+        category = Category.objects.create(name='Astronomia', slug='astronomia')
+        user = User.objects.create_user(username='autor', password='password')
+        self.articles = []
+        for i in range(6):
+            article = Article.objects.create(
+                title=f'Artigo {i}', content='texto', author=user, category=category, status='published'
+            )
+            article.tags.add('ciência', f'tema{i}')
+            for j in range(2):
+                ArticleChunk.objects.create(
+                    article=article, content=f'chunk {j}',
+                    embedding=ArticleChunk.pack_embedding([1.0, i / 10 + j / 100])
+                )
+            self.articles.append(article)
+        invalidate_vector_index()
+        get_vector_index()
+
+    def test_article_search_keeps_rank_order_and_dedupes(self):
+        with patch('apps.articles.services.ai_service.AIService.get_query_embedding', return_value=[1.0, 0.0]):
+            articles = SearchService().semantic_article_search('estrelas', top_k=6)
+        assert articles == self.articles[:3]
+
+    def test_endpoint_query_count_does_not_grow_with_hits(self, django_assert_max_num_queries):
+        client = APIClient()
+        with patch('apps.articles.services.ai_service.AIService.get_query_embedding', return_value=[1.0, 0.0]):
+            # artigos + tags (prefetch); o resto vem de select_related
+            with django_assert_max_num_queries(2):
+                response = client.post('/api/search/semantic/', {'query': 'estrelas'}, format='json')
+        assert response.status_code == 200
+        assert len(response.data) == 3
+
+
+@pytest.mark.django_db
+class TestRelatedArticles:
+    def setup_method(self):
+        self.user = User.objects.create_user(username='relacionados', password='password')
+        self.physics = Category.objects.create(name='Física', slug='fisica')
+        self.biology = Category.objects.create(name='Biologia', slug='biologia')
+        self.waves = self.article('Ondas', self.physics, [[1.0, 0.0, 0.0], [0.8, 0.2, 0.0]], tags=['luz'])
+        self.optics = self.article('Ótica', self.biology, [[0.9, 0.1, 0.0]], tags=['luz'])
+        self.gravity = self.article('Gravidade', self.physics, [[0.0, 0.0, 1.0]])
+        self.cells = self.article('Células', self.biology, [[0.0, 1.0, 0.0]])
+        self.draft = self.article('Rascunho', self.physics, [[1.0, 0.0, 0.0]], status='draft')
+        invalidate_vector_index()
+
+    def article(self, title, category, vectors, tags=(), status='published'):
+        article = Article.objects.create(title=title, content='texto', author=self.user, category=category, status=status)
+        article.tags.add(*tags)
+        for vector in vectors:
+            ArticleChunk.objects.create(article=article, content=title, embedding=ArticleChunk.pack_embedding(vector))
+        return article
+
+    def related(self, article):
+        return list(RelatedArticle.objects.filter(article=article).values_list('related_id', flat=True))
+
+    def test_rebuild_ranks_by_embeddings_tags_and_category(self):
+        related_articles.rebuild(top_n=2)
+        # Embedding próximo + tag partilhada vence a mesma categoria
+        assert self.related(self.waves) == [self.optics.id, self.gravity.id]
+        # Sem nada em comum (score 0), Gravidade nunca é vizinho de Células
+        assert self.related(self.cells) == [self.optics.id, self.waves.id]
+        assert not RelatedArticle.objects.filter(related=self.draft).exists()
+
+    def test_mean_pooled_vectors_match_manual_average(self):
+        similarity = related_articles.ArticleSimilarity.from_database()
+        vector = similarity.vectors[similarity.position(self.waves.id)]
+        expected = np.array([1.0, 0.0, 0.0]) + np.array([0.8, 0.2, 0.0]) / np.linalg.norm([0.8, 0.2, 0.0])
+        assert vector == pytest.approx(expected / np.linalg.norm(expected), abs=1e-6)
+
+    def test_refresh_on_publish_updates_neighbours(self):
+        related_articles.rebuild(top_n=2)
+        light = self.article('Luz', self.physics, [[1.0, 0.05, 0.0]], tags=['luz'])
+        related_articles.refresh_article(light.id, top_n=2)
+        assert self.related(light) == [self.waves.id, self.optics.id]
+        assert self.related(self.waves)[0] == light.id
+
+    def test_refresh_reuses_the_process_index(self):
+        related_articles.rebuild(top_n=2)
+        light = self.article('Luz', self.physics, [[1.0, 0.05, 0.0]], tags=['luz'])
+        # O índice do processo ainda não tem Luz: só os seus chunks são relidos
+        with patch.object(ExactVectorIndex, 'from_database', wraps=ExactVectorIndex.from_database) as reads, \
+             patch.object(related_articles.ArticleSimilarity, 'from_database') as full_corpus:
+            related_articles.refresh_article(light.id, top_n=2)
+        full_corpus.assert_not_called()
+        assert reads.call_count == 1
+        assert set(reads.call_args.args[0].values_list('article_id', flat=True)) == {light.id}
+        assert self.related(light) == [self.waves.id, self.optics.id]
+        # Ótica tinha Ondas e Gravidade; Luz entra à frente e Gravidade sai
+        assert self.related(self.optics) == [self.waves.id, light.id]
+
+    def test_single_row_matches_the_full_similarity(self):
+        similarity = related_articles.ArticleSimilarity.from_database()
+        for article in (self.waves, self.optics, self.gravity, self.cells):
+            ids, scores = related_articles.score_article(article.id, article.category_id)
+            expected = similarity.scores([similarity.position(article.id)])[0]
+            for other_id, score in zip(similarity.article_ids, expected):
+                if other_id != article.id:
+                    assert scores[ids == other_id][0] == pytest.approx(score, abs=1e-6)
+
+    def test_sparse_tags_match_dense_jaccard(self):
+        similarity = related_articles.ArticleSimilarity(
+            [1, 2, 3], np.zeros((3, 1)), [[10, 20], [20, 30, 40], []], [-1, -1, -1]
+        )
+        shared = similarity.shared_tags([0, 1, 2])
+        assert shared.tolist() == [[2, 1, 0], [1, 3, 0], [0, 0, 0]]
+        assert similarity.scores([0])[0][1] == pytest.approx(related_articles.TAG_WEIGHT * 1 / 4)
+
+    def test_endpoint_is_one_indexed_lookup(self, django_assert_max_num_queries):
+        related_articles.rebuild()
+        client = APIClient()
+        # artigo (get_object) + relacionados + tags (prefetch)
+        with django_assert_max_num_queries(3):
+            response = client.get(f'/api/articles/{self.waves.slug}/recommendations/')
+        assert [item['id'] for item in response.data] == [self.optics.id, self.gravity.id, self.cells.id]
+
+    def test_falls_back_to_category_before_first_computation(self):
+        response = APIClient().get(f'/api/articles/{self.waves.slug}/recommendations/')
+        assert [item['id'] for item in response.data] == [self.gravity.id]
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('snapshot_dir')
+class TestRecommenderService:
+    def setup_method(self):
+        user = User.objects.create_user(username='leitor', password='password')
+        self.articles = {}
+        for name, vector, views in [
+            ('ondas', [1.0, 0.0, 0.0], 10), ('luz', [0.9, 0.1, 0.0], 5),
+            ('celulas', [0.0, 1.0, 0.0], 10), ('genes', [0.1, 0.9, 0.0], 5),
+            ('popular', [0.0, 0.0, 1.0], 5000),
+        ]:
+            article = Article.objects.create(title=name, content='texto', author=user, status='published', views=views)
+            ArticleChunk.objects.create(article=article, content=name, embedding=ArticleChunk.pack_embedding(vector))
+            self.articles[name] = article
+        invalidate_vector_index()
+        get_vector_index()
+
+    def interact(self, name, hours_ago=0, event_type='view'):
+        event = UserEvent.objects.create(session_id='s1', article=self.articles[name], event_type=event_type)
+        UserEvent.objects.filter(id=event.id).update(created_at=timezone.now() - timedelta(hours=hours_ago))
+
+    def recommend(self, top_k=2):
+        with patch('apps.articles.services.ai_service.AIService.get_query_embedding',
+                   side_effect=AssertionError('chamada à rede')):
+            return [a.title for a in RecommenderService().get_recommendations_for_user(session_id='s1', top_k=top_k)]
+
+    def test_profile_follows_recent_interactions(self):
+        self.interact('ondas', hours_ago=24 * 30)
+        self.interact('celulas', hours_ago=1)
+        assert self.recommend(top_k=1) == ['genes']
+
+    def test_reading_outweighs_a_view(self):
+        self.interact('ondas', event_type='read_finish')
+        self.interact('celulas')
+        assert self.recommend(top_k=1) == ['luz']
+
+    def test_cold_start_uses_popularity_prior(self):
+        assert self.recommend(top_k=1) == ['popular']
+
+    def test_profile_vector_is_weighted_mean(self):
+        ids, vectors = np.array([1, 2]), np.array([[1.0, 0.0], [0.0, 1.0]], dtype=np.float32)
+        now = timezone.now()
+        events = [(1, 'view', now), (2, 'view', now - timedelta(hours=72))]
+        profile = RecommenderService.profile_vector(events, ids, vectors, now=now)
+        assert profile == pytest.approx(np.array([1.0, 0.5]) / np.linalg.norm([1.0, 0.5]))
+
+    def test_endpoint_query_count_is_constant(self, django_assert_max_num_queries):
+        for name in ('ondas', 'luz', 'celulas'):
+            self.interact(name)
+        # eventos + candidatos + artigos + tags
+        with django_assert_max_num_queries(4):
+            response = APIClient().get('/api/recommendations/', {'session_id': 's1'})
+        assert [item['title'] for item in response.data][:2] == ['genes', 'popular']
+
+    def test_candidates_are_cached_until_an_article_changes(self, django_assert_num_queries):
+        self.interact('ondas')
+        self.recommend()
+        # Só os eventos e a hidratação: candidatos e priors vêm da cache do processo
+        with django_assert_num_queries(3):
+            assert self.recommend() == ['luz', 'popular']
+
+        self.articles['luz'].status = 'draft'
+        self.articles['luz'].save()
+        assert self.recommend() == ['popular', 'genes']
@@ -1,10 +1,20 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (ArticleViewSet, CategoryViewSet, CommentViewSet, 
                     FootnoteViewSet, TagListView, SubscriberViewSet,
                     AIInsightView, AISummaryView, AIGlossaryView, AIChatView,
                     AIIndexerInsightsView, AuthorViewSet, BookmarkViewSet,
-                    SemanticSearchView, RecommendationView)
+                    SemanticSearchView, RecommendationView, AIResultCacheStatsView,
+                    AIStatusView)
+
+if settings.AI_ASYNC_VIEWS:
+    # Chamadas ao Gemini sem bloquear o worker (requer servidor ASGI, ex.: uvicorn)
+    from .async_views import (AsyncAIInsightView as AIInsightView,
+                              AsyncAISummaryView as AISummaryView,
+                              AsyncAIGlossaryView as AIGlossaryView,
+                              AsyncAIRAGChatView as AIChatView,
+                              AsyncSemanticSearchView as SemanticSearchView)
 
 
 router = DefaultRouter()
@@ -24,6 +34,8 @@ urlpatterns = [
     path('ai/glossary/', AIGlossaryView.as_view(), name='ai-glossary'),
     path('ai/chat/', AIChatView.as_view(), name='ai-chat'),
     path('ai/indexer/', AIIndexerInsightsView.as_view(), name='ai-indexer'),
+    path('ai/cache-stats/', AIResultCacheStatsView.as_view(), name='ai-cache-stats'),
+    path('ai/status/', AIStatusView.as_view(), name='ai-status'),
     path('search/semantic/', SemanticSearchView.as_view(), name='semantic-search'),
     path('recommendations/', RecommendationView.as_view(), name='recommendations'),
 ]
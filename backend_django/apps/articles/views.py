@@ -1,10 +1,16 @@
 from rest_framework import viewsets, filters, status, permissions, authentication
 from rest_framework.decorators import action, permission_classes, authentication_classes
 from rest_framework.response import Response
+import json
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import Article, Category, Comment, Footnote, Subscriber, AuthorMessage, AuthorFollower, Bookmark, UserLike
 from .serializers import (ArticleListSerializer, 
+                            ArticleListRowSerializer,
                             ArticleDetailSerializer, 
                             CategorySerializer, 
                             CommentSerializer,
@@ -14,11 +20,88 @@ from .serializers import (ArticleListSerializer,
                             AuthorFollowerSerializer,
                             BookmarkSerializer,
                             AuthorSerializer)
+from .filters import BM25SearchFilter
+from .pagination import ArticleFeedPagination, FeedPagination
+from .renderers import ORJSONRenderer
 from .services.search_service import SearchService
-from .services.ai_service import AIService
+from .services.ai_service import get_ai_service
+from .services import ai_result_cache, related_articles, response_cache
 from .services.recommender_service import RecommenderService
 
-class ArticleViewSet(viewsets.ReadOnlyModelViewSet):
+class VersionedResponseCacheMixin:
+    """
+    Cache das respostas de list/retrieve (ver services/response_cache.py):
+    - as entradas ficam na forma anónima e são validadas pelas versões de
+      conteúdo (a global na lista; global e do artigo no detalhe), incrementadas
+      pelos sinais de Article, Comment e tags;
+    - um hit anónimo não toca na base de dados e leva ETag/Last-Modified
+      (304 com If-None-Match/If-Modified-Since);
+    - para utilizadores autenticados, is_bookmarked/is_liked são preenchidos
+      depois da cache (duas consultas).
+    Os contadores (views, likes) mudam com .update(), sem sinais: ficam
+    desatualizados no máximo ARTICLE_RESPONSE_CACHE_TTL segundos (0 desliga a cache).
+    """
+
+    def list(self, request, *args, **kwargs):
+        ttl = settings.ARTICLE_RESPONSE_CACHE_TTL
+        if not ttl:
+            return super().list(request, *args, **kwargs)
+
+        key = response_cache.request_key(request)
+        current = response_cache.versions()
+        entry_key = response_cache.entry_key('list', key, current)
+        entry = response_cache.get(entry_key)
+        if entry is not None:
+            return self.cached_response(request, key, current, data=entry['data'])
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code != 200:
+            return response
+        response_cache.store(entry_key, {'data': response_cache.anonymous(response.data)}, ttl)
+        return self.cached_response(request, key, current, response=response)
+
+    def retrieve(self, request, *args, **kwargs):
+        ttl = settings.ARTICLE_RESPONSE_CACHE_TTL
+        if not ttl:
+            return super().retrieve(request, *args, **kwargs)
+
+        # O slug/id do URL só dá o artigo depois da consulta: a entrada guarda o
+        # id e as versões com que foi gerada, comparadas a cada hit
+        key = response_cache.request_key(request)
+        entry_key = response_cache.entry_key('detail', key)
+        entry = response_cache.get(entry_key)
+        if entry is not None:
+            current = response_cache.versions(entry['article_id'])
+            if current == entry['versions']:
+                return self.cached_response(request, key, current, data=entry['data'])
+
+        # Versão global lida antes da consulta: qualquer gravação do artigo entretanto invalida a entrada
+        global_version, = response_cache.versions()
+        response = super().retrieve(request, *args, **kwargs)
+        if response.status_code != 200:
+            return response
+        article_id = response.data['id']
+        current = (global_version, response_cache.versions(article_id)[1])
+        response_cache.store(entry_key, {
+            'article_id': article_id, 'versions': current, 'data': response_cache.anonymous(response.data),
+        }, ttl)
+        return self.cached_response(request, key, current, response=response)
+
+    def cached_response(self, request, key, current, data=None, response=None):
+        """Resposta a partir da cache (`data`) ou acabada de gerar (`response`)"""
+        if request.user.is_authenticated:
+            return response or Response(response_cache.merge_user_flags(data, request.user))
+
+        etag = response_cache.etag(key, current)
+        last_modified = response_cache.last_modified(current)
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        response = not_modified or response or Response(data)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+
+
+class ArticleViewSet(VersionedResponseCacheMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet para listar e visualizar detalhes de artigos publicados.
     Inclui filtros por categoria e tags, além de busca por texto.
@@ -26,13 +109,17 @@ class ArticleViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Article.objects.filter(status='published').select_related(
         'author', 'author__profile', 'category'
     ).prefetch_related('tags')
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, BM25SearchFilter, filters.OrderingFilter]
     filterset_fields = ['category__slug']
+    pagination_class = ArticleFeedPagination
 
+    # Índice BM25 (título, resumo e conteúdo), ver services/bm25_index.py
     search_fields = ['title', 'excerpt', 'content']
     ordering_fields = ['published_at', 'views', 'likes']
     lookup_field = 'slug'
     permission_classes = [permissions.AllowAny]
+    # Só a listagem (a resposta mais pesada) é serializada com o orjson
+    list_renderer_classes = [ORJSONRenderer]
     
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -96,15 +183,24 @@ class ArticleViewSet(viewsets.ReadOnlyModelViewSet):
         self.check_object_permissions(self.request, obj)
         return obj
 
+    def get_renderers(self):
+        if self.action == 'list':
+            return [renderer() for renderer in self.list_renderer_classes]
+        return super().get_renderers()
+
     def get_serializer_class(self):
         if self.action == 'retrieve':
             return ArticleDetailSerializer
+        if self.action == 'list':
+            return ArticleListRowSerializer
         return ArticleListSerializer
+
+    def paginate_queryset(self, queryset):
+        # A listagem pagina linhas .values() (ArticleListRowSerializer), não instâncias
+        if self.action == 'list':
+            queryset = ArticleListRowSerializer.values(queryset)
+        return super().paginate_queryset(queryset)
     
-    def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
     
     @action(detail=True, methods=['get', 'post'])
     def like(self, request, slug=None):
@@ -164,11 +260,8 @@ class ArticleViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=True, methods=['get'])
     def recommendations(self, request, slug=None):
         article = self.get_object()
-        # Lógica simples de recomendação por categoria
-        recommendations = Article.objects.filter(
-            category=article.category,
-            status='published'
-        ).exclude(id=article.id)[:3]
+        # Vizinhos pré-calculados (RelatedArticle): uma leitura indexada
+        recommendations = related_articles.related_to(article, limit=3)
         serializer = ArticleListSerializer(recommendations, many=True)
         return Response(serializer.data)
 
@@ -214,6 +307,7 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
 class CommentViewSet(viewsets.ModelViewSet):
     queryset = Comment.objects.filter(status='approved').select_related('article')
     serializer_class = CommentSerializer
+    pagination_class = FeedPagination
     permission_classes = [permissions.AllowAny]
     authentication_classes = []
     
@@ -254,24 +348,36 @@ class TagListView(APIView):
 class AIInsightView(APIView):
     def post(self, request):
         content = request.data.get('content')
-        ai_service = AIService()
-        insight = ai_service.generate_insight(content)
+        # O Gemini só é chamado se este conteúdo ainda não tiver resultado em cache
+        insight = ai_result_cache.cached_result('insight', content, lambda text: get_ai_service().generate_insight(text))
         return Response({'insight': insight})
 
 class AISummaryView(APIView):
     def post(self, request):
         content = request.data.get('content')
-        ai_service = AIService()
-        summary = ai_service.generate_summary(content)
+        summary = ai_result_cache.cached_result('summary', content, lambda text: get_ai_service().generate_summary(text))
         return Response({'summary': summary})
 
 class AIGlossaryView(APIView):
     def post(self, request):
         content = request.data.get('content')
-        ai_service = AIService()
-        terms = ai_service.generate_glossary(content)
+        terms = ai_result_cache.cached_result('glossary', content, lambda text: get_ai_service().generate_glossary(text))
         return Response(terms)
 
+class AIResultCacheStatsView(APIView):
+    """Hit rate da cache de resultados de IA (apenas staff)"""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(ai_result_cache.stats())
+
+class AIStatusView(APIView):
+    """Estado do cliente Gemini: circuit breakers, quotas e deduplicação (apenas staff)"""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(get_ai_service().status())
+
 class SemanticSearchView(APIView):
     permission_classes = [permissions.AllowAny]
     
@@ -281,15 +387,10 @@ class SemanticSearchView(APIView):
             return Response({'error': 'Query is required'}, status=400)
             
         search_service = SearchService()
-        relevant_chunks = search_service.semantic_search(query)
-        
-        # Get unique articles from chunks
-        articles = []
-        seen = set()
-        for chunk in relevant_chunks:
-            if chunk.article.id not in seen:
-                articles.append(chunk.article)
-                seen.add(chunk.article.id)
+        # Artigos distintos por ordem de relevância, carregados de uma só vez
+        articles = search_service.semantic_article_search(
+            query, queryset=Article.objects.filter(status='published')
+        )
                 
         serializer = ArticleListSerializer(articles, many=True)
         return Response(serializer.data)
@@ -303,17 +404,48 @@ class AIRAGChatView(APIView):
         if not message:
             return Response({'error': 'Message is required'}, status=400)
             
-        search_service = SearchService()
-        ai_service = AIService()
+        search_service = SearchService(consumer='rag')
+        ai_service = get_ai_service()
         
         # 1. Retrieval
         relevant_chunks = search_service.semantic_search(message, top_k=3)
         
         # 2. Generation (RAG)
+        if self.wants_stream(request):
+            return self.stream_response(ai_service.rag_chat_stream(message, relevant_chunks))
         response_data = ai_service.rag_chat(message, relevant_chunks)
         
         return Response(response_data)
 
+    def perform_content_negotiation(self, request, force=False):
+        # Accept: text/event-stream não corresponde a nenhum renderer DRF; a resposta
+        # em streaming é construída diretamente, por isso não deve dar 406
+        force = force or 'text/event-stream' in request.headers.get('Accept', '')
+        return super().perform_content_negotiation(request, force=force)
+
+    @staticmethod
+    def wants_stream(request):
+        """Streaming com {"stream": true}, ?stream=1 ou Accept: text/event-stream"""
+        flag = request.data.get('stream') if hasattr(request.data, 'get') else None
+        flag = flag or request.query_params.get('stream')
+        return str(flag).lower() in ('1', 'true') or 'text/event-stream' in request.headers.get('Accept', '')
+
+    @staticmethod
+    def stream_response(events):
+        """
+        Server-Sent Events: cada fragmento gerado segue para o cliente assim que
+        chega do Gemini; as citações vão num evento final ('citations').
+        """
+        def encode():
+            for event, data in events:
+                yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+        response = StreamingHttpResponse(encode(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Impede o nginx de acumular a resposta antes de a enviar
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
 class RecommendationView(APIView):
     permission_classes = [permissions.AllowAny]
     
@@ -351,7 +483,7 @@ class AuthorViewSet(viewsets.ReadOnlyModelViewSet):
     ViewSet para visualizar perfis de autores/investigadores.
     Lookup por username.
     """
-    queryset = User.objects.filter(is_active=True)
+    queryset = User.objects.filter(is_active=True).select_related('profile', 'author_stats')
     serializer_class = AuthorSerializer
     lookup_field = 'username'
     permission_classes = [permissions.AllowAny]
@@ -458,7 +590,9 @@ class BookmarkViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Bookmark.objects.filter(user=self.request.user).select_related('article')
+        return Bookmark.objects.filter(user=self.request.user).select_related(
+            'article__author', 'article__author__profile', 'article__category'
+        ).prefetch_related('article__tags')
 
     def create(self, request, *args, **kwargs):
         article_id = request.data.get('article_id')
@@ -112,6 +112,9 @@ class Publication(models.Model):
         verbose_name = "Publicação"
         verbose_name_plural = "Publicações"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='publications_created_at'),
+        ]
 
     def __str__(self):
         return self.title
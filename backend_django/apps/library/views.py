@@ -3,6 +3,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import F
+from apps.articles.pagination import FeedPagination
 from .models import Author, Institution, Collection, Publication
 from .serializers import (
     AuthorSerializer, InstitutionSerializer, 
@@ -35,6 +36,7 @@ class PublicationViewSet(viewsets.ModelViewSet):
     filterset_fields = ['type', 'year', 'institution', 'country', 'language', 'access_level', 'is_verified']
     search_fields = ['title', 'abstract', 'doi_internal']
     ordering_fields = ['created_at', 'views_count', 'downloads_count', 'year']
+    pagination_class = FeedPagination
 
     def get_serializer_class(self):
         if self.action == 'list':
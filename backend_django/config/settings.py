@@ -19,6 +19,7 @@ from pathlib import Path
 from django.templatetags.static import static
 from django.utils.translation import gettext_lazy as _
 from django.urls import reverse_lazy
+from celery.schedules import crontab
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -335,12 +336,137 @@ else:
     CELERY_BROKER_URL = REDIS_URL or 'redis://localhost:6379/1'
     CELERY_RESULT_BACKEND = REDIS_URL or 'redis://localhost:6379/1'
 
+# Cache partilhada entre processos (gunicorn/celery) quando o Redis está disponível
+if REDIS_URL and CELERY_BROKER_URL == REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 minutes
+# Tarefas periódicas (celery -A config beat)
+CELERY_BEAT_SCHEDULE = {
+    'evict-ai-results': {
+        'task': 'apps.articles.tasks.evict_ai_results_task',
+        'schedule': 24 * 60 * 60,
+    },
+    'compute-related-articles': {
+        'task': 'apps.articles.tasks.compute_related_articles_task',
+        'schedule': crontab(hour=3, minute=30),
+    },
+    'reconcile-author-stats': {
+        'task': 'apps.analytics.tasks.reconcile_author_stats',
+        'schedule': crontab(hour=4, minute=0),
+    },
+}
+
+# Nº de vizinhos guardados por artigo na tabela de artigos relacionados
+RELATED_ARTICLES_TOP_N = env.int('RELATED_ARTICLES_TOP_N', default=10)
+
+# Recomendações por perfil: nº de interações recentes consideradas
+RECOMMENDER_HISTORY_SIZE = env.int('RECOMMENDER_HISTORY_SIZE', default=20)
+# Meia-vida (horas) do peso de uma interação no perfil
+RECOMMENDER_EVENT_HALF_LIFE_HOURS = env.float('RECOMMENDER_EVENT_HALF_LIFE_HOURS', default=72.0)
+# Meia-vida (dias) do prior de frescura dos artigos
+RECOMMENDER_FRESHNESS_HALF_LIFE_DAYS = env.float('RECOMMENDER_FRESHNESS_HALF_LIFE_DAYS', default=30.0)
+# Validade (s) dos candidatos e priors em cache em cada processo (atraso máximo das visualizações)
+RECOMMENDER_CANDIDATES_TTL = env.int('RECOMMENDER_CANDIDATES_TTL', default=300)
+
+# Cache das respostas de lista/detalhe de artigos (s); limita o atraso dos contadores, 0 desliga
+ARTICLE_RESPONSE_CACHE_TTL = env.int('ARTICLE_RESPONSE_CACHE_TTL', default=300)
+
+# Nº de textos enviados por pedido de embedding em lote (limite da API Gemini: 100)
+AI_EMBEDDING_BATCH_SIZE = env.int('AI_EMBEDDING_BATCH_SIZE', default=100)
+# Quota de pedidos de embedding por minuto (token bucket partilhado e do comando index_corpus)
+AI_EMBEDDING_RPM = env.int('AI_EMBEDDING_RPM', default=100)
+# Nº de pedidos de embedding em paralelo no comando index_corpus
+AI_INDEXING_WORKERS = env.int('AI_INDEXING_WORKERS', default=4)
+
+# Pedidos ao Gemini em simultâneo por processo (cliente AIService partilhado)
+AI_MAX_CONCURRENT_REQUESTS = env.int('AI_MAX_CONCURRENT_REQUESTS', default=16)
+# Espera máxima (segundos) por uma vaga antes de devolver a resposta de recurso
+AI_CONCURRENCY_TIMEOUT = env.float('AI_CONCURRENCY_TIMEOUT', default=30.0)
+# Single-flight: pedidos idênticos em curso partilham uma chamada ao Gemini.
+# Com AI_SINGLE_FLIGHT_REDIS, também entre processos (lock + resultado no Redis)
+AI_SINGLE_FLIGHT_REDIS = env.bool('AI_SINGLE_FLIGHT_REDIS', default=True)
+# Espera máxima (segundos) pelo pedido líder antes de chamar o Gemini diretamente
+AI_SINGLE_FLIGHT_TIMEOUT = env.float('AI_SINGLE_FLIGHT_TIMEOUT', default=30.0)
+# Tempo (segundos) que o resultado do líder fica no Redis para quem ainda espera
+AI_SINGLE_FLIGHT_RESULT_TTL = env.float('AI_SINGLE_FLIGHT_RESULT_TTL', default=5.0)
+# Quota de pedidos de geração por minuto da conta Gemini (token bucket partilhado no Redis)
+AI_GENERATION_RPM = env.int('AI_GENERATION_RPM', default=60)
+# Rajada máxima de cada token bucket, em segundos de quota
+AI_RATE_LIMIT_BURST_SECONDS = env.float('AI_RATE_LIMIT_BURST_SECONDS', default=10.0)
+# Espera máxima (segundos) de um pedido online por quota antes da resposta de recurso
+AI_RATE_LIMIT_WAIT = env.float('AI_RATE_LIMIT_WAIT', default=2.0)
+# Circuit breaker: falhas seguidas do Gemini (429, 5xx, timeouts) que abrem o circuito
+AI_CIRCUIT_FAILURE_THRESHOLD = env.int('AI_CIRCUIT_FAILURE_THRESHOLD', default=5)
+# Segundos com o circuito aberto (respostas de recurso/cache) antes de um pedido de teste
+AI_CIRCUIT_RESET_TIMEOUT = env.float('AI_CIRCUIT_RESET_TIMEOUT', default=30.0)
+
+# Views de IA assíncronas (aiohttp): servir com ASGI, ex.:
+#   gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker
+AI_ASYNC_VIEWS = env.bool('AI_ASYNC_VIEWS', default=False)
+GEMINI_API_BASE_URL = env('GEMINI_API_BASE_URL', default='https://generativelanguage.googleapis.com/v1beta')
+# Ligações HTTP simultâneas ao Gemini por worker (e por event loop)
+AI_ASYNC_MAX_CONNECTIONS = env.int('AI_ASYNC_MAX_CONNECTIONS', default=200)
+AI_ASYNC_TIMEOUT = env.float('AI_ASYNC_TIMEOUT', default=60.0)
+
+# Cache persistente dos insights/sumários/glossários gerados (tabela AIResult + cache do Django)
+AI_RESULT_CACHE_TTL = env.int('AI_RESULT_CACHE_TTL', default=24 * 60 * 60)  # cópia na cache do Django
+AI_RESULT_CACHE_MAX_ENTRIES = env.int('AI_RESULT_CACHE_MAX_ENTRIES', default=20000)
+AI_RESULT_CACHE_MAX_AGE_DAYS = env.int('AI_RESULT_CACHE_MAX_AGE_DAYS', default=90)
+# Gerar os resultados quando um artigo é publicado (antes do primeiro leitor)
+AI_RESULT_PREWARM = env.bool('AI_RESULT_PREWARM', default=True)
+
+# Segmentação dos artigos em chunks: 'markdown' (cabeçalhos/parágrafos/frases) ou 'fixed' (janelas de 1000 chars)
+# Mudar de chunker altera todas as fronteiras: os hashes guardados deixam de bater e a
+# reindexação seguinte volta a gerar os embeddings de todo o corpus (planear a migração)
+CHUNKER = env('CHUNKER', default='fixed')
+CHUNK_MAX_TOKENS = env.int('CHUNK_MAX_TOKENS', default=300)
+CHUNK_OVERLAP_TOKENS = env.int('CHUNK_OVERLAP_TOKENS', default=40)
+
+# Cache de embeddings de pesquisa (LRU por processo + cache partilhada)
+AI_QUERY_EMBEDDING_CACHE_SIZE = env.int('AI_QUERY_EMBEDDING_CACHE_SIZE', default=2048)
+AI_QUERY_EMBEDDING_CACHE_TTL = env.int('AI_QUERY_EMBEDDING_CACHE_TTL', default=60 * 60)  # 1h
+AI_QUERY_EMBEDDING_SHARED_TTL = env.int('AI_QUERY_EMBEDDING_SHARED_TTL', default=24 * 60 * 60)  # 24h (0 desativa)
+
+# Pesquisa Semântica (índice vetorial)
+# 'exact' = produto matriz-vetor sobre todos os chunks; 'ivf' = aproximado (k-means + nprobe)
+SEARCH_INDEX_BACKEND = env('SEARCH_INDEX_BACKEND', default='exact')
+SEARCH_INDEX_BACKENDS = {
+    'rag': env('SEARCH_INDEX_BACKEND_RAG', default=SEARCH_INDEX_BACKEND),
+    'recommender': env('SEARCH_INDEX_BACKEND_RECOMMENDER', default=SEARCH_INDEX_BACKEND),
+}
+SEARCH_INDEX_DIR = env('SEARCH_INDEX_DIR', default=str(BASE_DIR / 'var' / 'search'))
+SEARCH_IVF_NLIST = env.int('SEARCH_IVF_NLIST', default=0) or None  # None = 4 * sqrt(N)
+SEARCH_IVF_NPROBE = env.int('SEARCH_IVF_NPROBE', default=8)
+# Pesquisa por palavras-chave na listagem de artigos (?search=): 'bm25' ou 'hybrid' (BM25 + embeddings, RRF)
+SEARCH_LIST_MODE = env('SEARCH_LIST_MODE', default='bm25')
+SEARCH_MAX_RESULTS = env.int('SEARCH_MAX_RESULTS', default=200)
+SEARCH_RRF_K = env.int('SEARCH_RRF_K', default=60)
+# Formato binário dos embeddings guardados em ArticleChunk ('float32' ou 'float16')
+EMBEDDING_STORAGE_DTYPE = env('EMBEDDING_STORAGE_DTYPE', default='float32')
+# Snapshot mmap partilhado pelos workers (deve ser um volume comum a backend e worker)
+EMBEDDING_SNAPSHOT_ENABLED = env.bool('EMBEDDING_SNAPSHOT_ENABLED', default=True)
+EMBEDDING_SNAPSHOT_DIR = env('EMBEDDING_SNAPSHOT_DIR', default=str(BASE_DIR / 'var' / 'embeddings'))
+# Edições dentro desta janela (segundos) juntam-se num único snapshot (cada um reescreve todos os chunks)
+EMBEDDING_SNAPSHOT_DEBOUNCE = env.int('EMBEDDING_SNAPSHOT_DEBOUNCE', default=30)
+# Intervalo (segundos) entre leituras do ponteiro CURRENT em cada processo que serve pesquisa
+EMBEDDING_SNAPSHOT_CHECK_INTERVAL = env.float('EMBEDDING_SNAPSHOT_CHECK_INTERVAL', default=5.0)
 
 # Site settings
 SITE_ID = 1
@@ -0,0 +1,205 @@
+"""
+Teste de carga das chamadas ao LLM: cliente bloqueante vs AsyncAIService.
+
+Arranca um servidor Gemini falso (generateContent com latência configurável)
+e envia N pedidos com C em simultâneo:
+
+  * blocking: requests num pool de `--threads` threads, como um worker
+    WSGI síncrono (gunicorn --threads), que só tem `threads` pedidos em voo;
+  * async: AsyncAIService.generate_insight num único event loop, como um
+    worker ASGI (uvicorn) com as views AI_ASYNC_VIEWS.
+
+Cada pedido leva um texto diferente (`article_text`): com textos iguais o
+single-flight e a cache de resultados juntariam as chamadas e o modo async
+faria muito menos pedidos ao LLM do que o bloqueante.
+
+    python scripts/ai_load_test.py --requests 500 --concurrency 200 --delay 0.5
+
+Com --url, mede antes um endpoint real (ex.: o backend a correr com gunicorn
+ou uvicorn, apontado para o stub via GEMINI_API_BASE_URL):
+
+    python scripts/ai_load_test.py --url http://localhost:8000/api/ai/insight/
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import django
+
+STUB_HOST = '127.0.0.1'
+
+
+async def _handle_stub(reader, writer, delay):
+    """Um pedido HTTP/1.1 de cada vez por ligação (keep-alive), como a API do Gemini"""
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            length = 0
+            while True:
+                header = await reader.readline()
+                if header in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = header.decode('latin-1').partition(':')
+                if name.strip().lower() == 'content-length':
+                    length = int(value.strip())
+            if length:
+                await reader.readexactly(length)
+
+            await asyncio.sleep(delay)
+            body = json.dumps({
+                "candidates": [{"content": {"role": "model", "parts": [{"text": "Insight de teste."}]}}]
+            }).encode()
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body
+            )
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+def _serve_stub(delay, port, queue):
+    async def serve():
+        server = await asyncio.start_server(
+            lambda r, w: _handle_stub(r, w, delay), STUB_HOST, port, backlog=4096
+        )
+        queue.put(server.sockets[0].getsockname()[1])
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(serve())
+
+
+def start_stub_server(delay, port=0):
+    """
+    Servidor falso noutro processo (como a API real: não disputa o GIL com
+    o cliente medido); devolve a porta
+    """
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_serve_stub, args=(delay, port, queue), daemon=True)
+    process.start()
+    return queue.get(timeout=10)
+
+
+def article_text(i):
+    """Conteúdo único por pedido: todos os modos fazem uma chamada real ao LLM por pedido"""
+    return f"Artigo de teste {i}."
+
+
+def report(name, latencies, elapsed, errors):
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies) if latencies else 0.0
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else 0.0
+    print(f"{name:<10}{len(latencies) / elapsed:>10.1f}{p50 * 1000:>10.0f}{p99 * 1000:>10.0f}"
+          f"{elapsed:>10.2f}{errors:>8}")
+
+
+def run_blocking(base_url, total, threads):
+    import requests
+
+    session = requests.Session()
+    session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=threads))
+    url = f"{base_url}/models/gemini-1.5-flash:generateContent"
+    def call(i):
+        body = {"contents": [{"role": "user", "parts": [{"text": article_text(i)}]}]}
+        started = time.perf_counter()
+        response = session.post(url, params={'key': 'stub'}, json=body, timeout=60)
+        response.raise_for_status()
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = list(pool.map(call, range(total)))
+    return latencies, time.perf_counter() - started, 0
+
+
+async def run_async(total, concurrency):
+    from apps.articles.services.ai_service import AIService
+    from apps.articles.services.async_ai_service import AsyncAIService, close_async_session
+
+    ai = AsyncAIService()
+    semaphore = asyncio.Semaphore(concurrency)
+    errors = 0
+
+    async def call(i):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            insight = await ai.generate_insight(article_text(i))
+            if insight == AIService.INSIGHT_ERROR_MESSAGE:
+                errors += 1
+            return time.perf_counter() - started
+
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(call(i) for i in range(total)))
+    elapsed = time.perf_counter() - started
+    await close_async_session()
+    return latencies, elapsed, errors
+
+
+async def run_endpoint(url, total, concurrency):
+    import aiohttp
+
+    semaphore = asyncio.Semaphore(concurrency)
+    errors = 0
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=120)) as session:
+        async def call(i):
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                async with session.post(url, json={'content': article_text(i)}) as response:
+                    await response.read()
+                    if response.status != 200:
+                        errors += 1
+                return time.perf_counter() - started
+
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*(call(i) for i in range(total)))
+    return latencies, time.perf_counter() - started, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga: LLM bloqueante vs assíncrono")
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--concurrency', type=int, default=200, help="Pedidos em voo no modo async")
+    parser.add_argument('--threads', type=int, default=8, help="Threads do cliente bloqueante (worker WSGI)")
+    parser.add_argument('--delay', type=float, default=0.5, help="Latência do LLM falso, em segundos")
+    parser.add_argument('--port', type=int, default=0, help="Porta do stub (0 = livre)")
+    parser.add_argument('--url', help="Endpoint real a testar (ex.: http://localhost:8000/api/ai/insight/)")
+    args = parser.parse_args()
+
+    port = start_stub_server(args.delay, args.port)
+    base_url = f"http://{STUB_HOST}:{port}"
+    print(f"Stub Gemini em {base_url} (latência {args.delay}s); "
+          f"{args.requests} pedidos, {args.concurrency} em simultâneo\n")
+
+    # Setup Django (pasta backend_django, relativa a este script), apontado para o stub
+    sys.path.append(str(Path(__file__).resolve().parent.parent))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    os.environ['GEMINI_API_BASE_URL'] = base_url
+    os.environ['GEMINI_API_KEY'] = 'stub'
+    # O stub não tem quota: mede-se o cliente, não o token bucket
+    os.environ['AI_GENERATION_RPM'] = os.environ['AI_EMBEDDING_RPM'] = str(10 ** 9)
+    django.setup()
+
+    print(f"{'modo':<10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'total s':>10}{'erros':>8}")
+    if args.url:
+        report('endpoint', *asyncio.run(run_endpoint(args.url, args.requests, args.concurrency)))
+    report('blocking', *run_blocking(base_url, args.requests, args.threads))
+    report('async', *asyncio.run(run_async(args.requests, args.concurrency)))
+
+
+if __name__ == "__main__":
+    main()
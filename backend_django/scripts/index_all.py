@@ -1,31 +1,20 @@
+"""
+Atalho para o comando de gestão `index_corpus`:
 
+    python manage.py index_corpus [--workers N] [--rpm N] [--restart]
+"""
 import os
-import django
 import sys
+from pathlib import Path
+
+import django
 
-# Setup Django
-sys.path.append('d:/Aprendendo a progranmar em Python/sussurros-do-saber/backend_django')
+# Setup Django (pasta backend_django, relativa a este script)
+sys.path.append(str(Path(__file__).resolve().parent.parent))
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 django.setup()
 
-from apps.articles.models import Article, ArticleChunk
-from apps.articles.tasks import index_article_task
-
-def run_indexing():
-    articles = Article.objects.filter(status='published')
-    total = articles.count()
-    print(f"Iniciando indexação de {total} artigos...")
-    
-    for i, article in enumerate(articles):
-        print(f"[{i+1}/{total}] Indexando: {article.title} (Autor: {article.author.get_full_name()})")
-        try:
-            # Chamamos a lógica da task diretamente de forma síncrona para simplificar
-            result = index_article_task(article.id)
-            print(f"   Success: {result}")
-        except Exception as e:
-            print(f"   Error indexando {article.id}: {e}")
-
-    print("\nIndexação concluída!")
+from django.core.management import call_command
 
 if __name__ == "__main__":
-    run_indexing()
+    call_command('index_corpus', *sys.argv[1:])
@@ -82,23 +82,59 @@ const ChatWidget: React.FC = () => {
     try {
       const response = await fetch(`http://127.0.0.1:8000/api/ai/chat/`, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: { 'Content-Type': 'application/json', 'Accept': 'text/event-stream' },
         body: JSON.stringify({
           message: text,
-          history: messages
+          history: messages,
+          stream: true
         })
       });
 
-      if (!response.ok) {
+      if (!response.ok || !response.body) {
         throw new Error('Falha na comunicação com o servidor AI');
       }
 
-      const data = await response.json();
-      const modelMessage: Message = {
-        role: 'model',
-        text: data.text || 'Peço desculpa, tive uma pequena falha no processamento NLP.'
+      // Resposta em streaming (SSE): o texto vai aparecendo à medida que é gerado
+      setMessages(prev => [...prev, { role: 'model', text: '' }]);
+      setIsLoading(false);
+
+      const appendToReply = (chunk: string, replace = false) => {
+        setMessages(prev => {
+          const updated = [...prev];
+          const last = updated[updated.length - 1];
+          updated[updated.length - 1] = { ...last, text: replace ? chunk : last.text + chunk };
+          return updated;
+        });
       };
-      setMessages(prev => [...prev, modelMessage]);
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let received = false;
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split('\n\n');
+        buffer = events.pop() || '';
+        for (const rawEvent of events) {
+          const eventName = rawEvent.match(/^event: (.*)$/m)?.[1];
+          const data = rawEvent.match(/^data: (.*)$/m)?.[1];
+          if (!eventName || !data) continue;
+          const payload = JSON.parse(data);
+          if (eventName === 'token') {
+            received = true;
+            appendToReply(payload.text);
+          } else if (eventName === 'error') {
+            appendToReply(received ? `\n\n${payload.text}` : payload.text, !received);
+            received = true;
+          }
+        }
+      }
+
+      if (!received) {
+        appendToReply('Peço desculpa, tive uma pequena falha no processamento NLP.', true);
+      }
     } catch (error) {
       console.error("Chat Error:", error);
       setMessages(prev => [...prev, { role: 'model', text: 'Ocorreu um erro no processamento de linguagem. Verifique se o servidor backend está ativo.' }]);